@@ -0,0 +1,155 @@
+"""
+Sync vs. async query view throughput against a slow weather API.
+
+Starts the local weather stand-in with ``--weather-delay-ms`` of latency and
+posts ``--requests`` queries to each view, every one for a different city so
+that none is served from the weather cache:
+
+* ``sync``: ``/query/`` through the WSGI handler from ``--threads`` threads,
+  like one sync worker with that many threads;
+* ``async``: ``/query/async/`` through the ASGI handler on one event loop with
+  up to ``--concurrency`` requests in flight, like one ASGI worker.
+
+Usage (from the ``essay`` directory)::
+
+    python benchmarks/async_query.py
+    python benchmarks/async_query.py --requests 400 --concurrency 100 --weather-delay-ms 200 --threads 8
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RECOMMENDED = b'Recommended Clothing'
+
+
+def setup(items):
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'clothing_project.test_settings')
+    import django
+    django.setup()
+
+    from django.db import connection
+    from ocr_app.models import ClothingImage
+
+    # 不调用 setup_test_environment()：它给模板渲染加上的记录（response.context）会成为主要开销。
+    # 共享缓存的内存数据库，所有线程看到同一份数据
+    connection.creation.create_test_db(verbosity=0)
+    ClothingImage.objects.bulk_create([
+        ClothingImage(
+            image=f'clothing_images/item_{i}.jpg',
+            label_image=f'label_images/label_{i}.jpg',
+            category=('tshirt', 'pant', 'longsleeve', 'shortpant')[i % 4],
+            materials=['綿'],
+        )
+        for i in range(items)
+    ], batch_size=500)
+
+
+def summarize(name, durations, wall):
+    return {
+        'view': name,
+        'requests': len(durations),
+        'throughput_rps': len(durations) / wall,
+        'p50_ms': statistics.median(durations) * 1000,
+        'p99_ms': sorted(durations)[max(0, int(len(durations) * 0.99) - 1)] * 1000,
+    }
+
+
+def run_sync(requests, threads):
+    import threading
+
+    from django.test import Client
+    from django.urls import reverse
+
+    url = reverse('query')
+    local = threading.local()
+
+    def one(index):
+        if not hasattr(local, 'client'):
+            local.client = Client()
+        start = time.perf_counter()
+        response = local.client.post(url, {'city': f'sync-{index}'})
+        assert response.status_code == 200 and RECOMMENDED in response.content, response.status_code
+        return time.perf_counter() - start
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        durations = list(executor.map(one, range(requests)))
+    return summarize('sync', durations, time.perf_counter() - started)
+
+
+def run_async(requests, concurrency):
+    from django.test import AsyncClient
+    from django.urls import reverse
+
+    url = reverse('query_async')
+
+    async def main():
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(index):
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(url, {'city': f'async-{index}'})
+                assert response.status_code == 200 and RECOMMENDED in response.content, response.status_code
+                return time.perf_counter() - start
+
+        started = time.perf_counter()
+        durations = await asyncio.gather(*(one(i) for i in range(requests)))
+        return summarize('async', durations, time.perf_counter() - started)
+
+    return asyncio.run(main())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=8, help='threads of the sync worker')
+    parser.add_argument('--concurrency', type=int, default=100, help='requests in flight on the event loop')
+    parser.add_argument('--weather-delay-ms', type=float, default=200.0)
+    parser.add_argument('--weather-port', type=int, default=8765)
+    parser.add_argument('--items', type=int, default=500, help='wardrobe size')
+    parser.add_argument('--max-items', type=int, default=20, help='RECOMMENDATION_MAX_ITEMS for both views')
+    args = parser.parse_args(argv)
+
+    # 每个请求都访问天气接口，不使用缓存
+    os.environ.update(WEATHER_CACHE_TTL='0', WEATHER_STALE_TTL='0', LOG_LEVEL='WARNING',
+                      WEATHER_POOL_SIZE=str(max(args.threads, args.concurrency)))
+    setup(args.items)
+    from django.test import override_settings
+    from ocr_app.services import weather_service
+
+    # 天气接口替身在单独的进程中运行，不和被测的视图争用GIL
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'ocr_app.services.stub_weather', '--port', str(args.weather_port),
+         '--delay-ms', str(args.weather_delay_ms)],
+        cwd=PROJECT_DIR, stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        server.stdout.readline()  # 'Serving stub weather on ...'
+        url = f'http://127.0.0.1:{args.weather_port}/data/2.5/weather'
+        client = 'httpx' if weather_service.httpx is not None else 'thread pool (httpx not installed)'
+        print(f"{args.requests} queries, weather latency {args.weather_delay_ms:.0f} ms, "
+              f"{args.max_items} items per page, async weather client: {client}")
+        print(f"{'view':<6} {'in flight':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        with override_settings(WEATHER_API_URL=url, ALLOWED_HOSTS=['testserver'],
+                               RECOMMENDATION_MAX_ITEMS=args.max_items):
+            for result, in_flight in ((run_sync(args.requests, args.threads), args.threads),
+                                      (run_async(args.requests, args.concurrency), args.concurrency)):
+                print(f"{result['view']:<6} {in_flight:>9} {result['throughput_rps']:>8.1f} "
+                      f"{result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f}")
+    finally:
+        server.terminate()
+        server.wait()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Import-time benchmark for Django startup.
+
+Runs ``python -X importtime`` in a fresh interpreter that sets up Django and
+imports the URLconf (what ``manage.py`` commands and the first request do),
+then reports the slowest imports. Exits with status 1 when a heavy ML module
+is loaded at startup or the total exceeds ``--budget-ms``.
+
+Usage (from the ``essay`` directory)::
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --budget-ms 1500 --top 30
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 这些模块只能在第一次OCR/分类时加载
+HEAVY_MODULES = ('tensorflow', 'keras', 'paddle', 'paddleocr', 'cv2', 'sklearn', 'tools.infer')
+
+STARTUP_CODE = (
+    "import django; django.setup(); "
+    "from django.urls import get_resolver; get_resolver().url_patterns"
+)
+
+
+def measure(settings_module='clothing_project.settings'):
+    """返回 [(模块名, 自身耗时us, 累计耗时us), ...]，按导入顺序排列；嵌套导入的模块名带缩进"""
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP_CODE],
+        cwd=PROJECT_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"startup failed:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        rows.append((name[1:].rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def heavy_imports(rows):
+    names = {name.strip() for name, _, _ in rows}
+    return sorted(
+        name for name in names
+        if any(name == heavy or name.startswith(heavy + '.') for heavy in HEAVY_MODULES)
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--settings', default='clothing_project.settings')
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help='fail when total import time exceeds this many milliseconds')
+    parser.add_argument('--top', type=int, default=20, help='number of slowest imports to show')
+    args = parser.parse_args(argv)
+
+    rows = measure(args.settings)
+    # 顶层导入（名称前没有缩进）的累计耗时之和就是总导入时间
+    total_ms = sum(cumulative for name, _, cumulative in rows if not name.startswith(' ')) / 1000
+    rows = [(name.strip(), self_us, cumulative) for name, self_us, cumulative in rows]
+
+    print(f"{len(rows)} modules imported, {total_ms:.0f} ms total")
+    print(f"{'cumulative ms':>14}  {'self ms':>8}  module")
+    for name, self_us, cumulative in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"{cumulative / 1000:14.1f}  {self_us / 1000:8.1f}  {name}")
+
+    failed = False
+    heavy = heavy_imports(rows)
+    if heavy:
+        print(f"\nFAIL: heavy modules imported at startup: {', '.join(heavy)}")
+        failed = True
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"\nFAIL: startup imports took {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
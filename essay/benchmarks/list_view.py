@@ -0,0 +1,102 @@
+"""
+Clothing list view benchmark.
+
+Fills an in-memory database with ``--items`` clothing records and times
+``GET /clothing_list/`` once per log level, each in a fresh interpreter
+(``LOG_LEVEL`` is read when settings are imported). ``DEBUG`` emits the
+per-record debug lines that used to be printed unconditionally; ``INFO`` is
+the production default, where they are skipped before any formatting.
+
+Usage (from the ``essay`` directory)::
+
+    python benchmarks/list_view.py
+    python benchmarks/list_view.py --items 2000 --repeat 5 --levels DEBUG,INFO
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_child(items, repeat):
+    """在当前进程中建库、填充数据并计时，返回每次请求的耗时（秒）"""
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'clothing_project.test_settings')
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+    from django.urls import reverse
+    from ocr_app.models import ClothingImage
+
+    setup_test_environment()
+    call_command('migrate', verbosity=0)
+    # bulk_create 不经过 ClothingImage.save()，不需要真实的图片文件
+    ClothingImage.objects.bulk_create([
+        ClothingImage(
+            image=f'clothing_images/item_{i}.jpg',
+            label_image=f'label_images/label_{i}.jpg',
+            category=('tshirt', 'pant', 'longsleeve', 'shortpant')[i % 4],
+            recognized_text='綿 100% ポリエステル',
+            materials=['綿', 'ポリエステル'],
+        )
+        for i in range(items)
+    ], batch_size=500)
+
+    client = Client()
+    url = reverse('clothing_list')
+    client.get(url)  # 预热模板加载
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = client.get(url)
+        durations.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.status_code
+    return durations
+
+
+def measure(level, items, repeat):
+    """在新的解释器中以给定日志级别运行，返回耗时列表（秒）"""
+    env = dict(os.environ, LOG_LEVEL=level, PYTHONPATH=PROJECT_DIR)
+    # 日志文件 debug.log 写到临时目录，控制台输出丢弃（写入本身仍计入耗时）
+    with tempfile.TemporaryDirectory() as workdir:
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child',
+             '--items', str(items), '--repeat', str(repeat)],
+            cwd=workdir, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        )
+    if proc.returncode != 0:
+        raise RuntimeError(f"benchmark run at {level} failed with status {proc.returncode}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--levels', default='DEBUG,INFO', help='comma-separated LOG_LEVEL values')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_child(args.items, args.repeat)))
+        return 0
+
+    print(f"GET /clothing_list/ with {args.items} items, {args.repeat} requests per level")
+    print(f"{'LOG_LEVEL':>10}  {'median ms':>10}  {'min ms':>8}")
+    for level in args.levels.split(','):
+        durations = measure(level.strip().upper(), args.items, args.repeat)
+        print(f"{level:>10}  {statistics.median(durations) * 1000:10.1f}  {min(durations) * 1000:8.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
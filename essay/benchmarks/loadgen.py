@@ -0,0 +1,199 @@
+"""
+Load generator for the upload and query endpoints.
+
+Drives a running server at a fixed concurrency for ``--duration`` seconds (or
+``--requests`` requests) and reports throughput and latency percentiles per
+endpoint. With ``--wait`` an upload is only complete once its ingest batch is
+finished, so the reported latency covers classification and OCR as well.
+
+To load-test offline, start the stand-in weather API and the server with the
+stand-in inference backends::
+
+    python -m ocr_app.services.stub_weather --port 8001 --delay-ms 150 &
+    WEATHER_API_URL=http://127.0.0.1:8001/data/2.5/weather \\
+    OCR_BACKEND=ocr_app.services.stub_backends.StubOCRProcessor \\
+    CLASSIFIER_BACKEND=ocr_app.services.stub_backends.StubImageClassifier \\
+    STUB_OCR_LATENCY_MS=80 STUB_CLASSIFIER_LATENCY_MS=30 INGEST_INLINE=1 \\
+    python manage.py runserver --noreload
+
+Usage (from the ``essay`` directory)::
+
+    python benchmarks/loadgen.py --url http://127.0.0.1:8000 --concurrency 8 --duration 30
+    python benchmarks/loadgen.py --scenario upload --pairs 4 --wait --requests 200
+    python benchmarks/loadgen.py --scenario query --city Tokyo --json results.json
+"""
+import argparse
+import io
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from PIL import Image, ImageDraw
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(q / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def png(size, color, text=None):
+    image = Image.new('RGB', size, color)
+    if text:
+        ImageDraw.Draw(image).text((4, 4), text, fill='black')
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class Client:
+    """每个线程一个会话；POST 前先 GET 页面取得 CSRF cookie"""
+
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.csrf_token = None
+
+    def url(self, path):
+        return self.base_url + path
+
+    def ensure_csrf(self, path):
+        if self.csrf_token is None:
+            self.session.get(self.url(path), timeout=self.timeout)
+            self.csrf_token = self.session.cookies.get('csrftoken', '')
+
+    def post(self, path, **kwargs):
+        self.ensure_csrf(path)
+        headers = kwargs.pop('headers', {})
+        headers.update({'X-CSRFToken': self.csrf_token, 'Referer': self.url(path)})
+        return self.session.post(self.url(path), headers=headers, timeout=self.timeout, **kwargs)
+
+
+def upload(client, options, rng):
+    files = []
+    for i in range(options.pairs):
+        # 每次上传不同的图片，避免全部命中特征库和OCR缓存
+        color = tuple(rng.randrange(256) for _ in range(3))
+        files.append(('clothing_images[]', (f'clothing_{i}.png', png((224, 224), color), 'image/png')))
+        files.append(('label_images[]', (f'label_{i}.png',
+                                         png((320, 120), 'white', f'COTTON {rng.randint(1, 100)}%'),
+                                         'image/png')))
+    response = client.post('/upload/', files=files, headers={'Accept': 'application/json'})
+    if response.status_code != 202:
+        return False
+    if options.wait:
+        status_url = response.json()['status_url']
+        deadline = time.monotonic() + options.timeout
+        while time.monotonic() < deadline:
+            status = client.session.get(client.url(status_url), timeout=client.timeout).json()
+            if status['finished']:
+                return status['counts'].get('failed', 0) == 0
+            time.sleep(options.poll_interval)
+        return False
+    return True
+
+
+def query(client, options, rng):
+    response = client.post('/query/', data={'city': options.city})
+    return response.status_code == 200
+
+
+SCENARIOS = {'upload': upload, 'query': query}
+
+
+def run(options):
+    names = list(SCENARIOS) if options.scenario == 'mixed' else [options.scenario]
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+    issued = [0]
+    stop_at = time.monotonic() + options.duration
+
+    def next_request():
+        with lock:
+            if options.requests is not None:
+                if issued[0] >= options.requests:
+                    return False
+            elif time.monotonic() >= stop_at:
+                return False
+            issued[0] += 1
+            return True
+
+    def worker(index):
+        rng = random.Random(index)
+        client = Client(options.url, options.timeout)
+        while next_request():
+            name = names[rng.randrange(len(names))]
+            start = time.perf_counter()
+            try:
+                ok = SCENARIOS[name](client, options, rng)
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies[name].append(elapsed * 1000)
+                if not ok:
+                    errors[name] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=options.concurrency) as executor:
+        list(executor.map(worker, range(options.concurrency)))
+    wall = time.perf_counter() - started
+
+    report = {'concurrency': options.concurrency, 'wall_seconds': round(wall, 3), 'endpoints': {}}
+    for name in names:
+        values = latencies[name]
+        report['endpoints'][name] = {
+            'requests': len(values),
+            'errors': errors[name],
+            'throughput_rps': round(len(values) / wall, 2) if wall else None,
+            'mean_ms': round(statistics.fmean(values), 2) if values else None,
+            'p50_ms': percentile(values, 50),
+            'p90_ms': percentile(values, 90),
+            'p99_ms': percentile(values, 99),
+            'max_ms': max(values) if values else None,
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--scenario', choices=['upload', 'query', 'mixed'], default='mixed')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds to run (ignored with --requests)')
+    parser.add_argument('--requests', type=int, default=None, help='stop after this many requests')
+    parser.add_argument('--pairs', type=int, default=2, help='image pairs per upload')
+    parser.add_argument('--wait', action='store_true', help='count an upload as done when its batch is processed')
+    parser.add_argument('--poll-interval', type=float, default=0.2)
+    parser.add_argument('--city', default='Tokyo')
+    parser.add_argument('--timeout', type=float, default=120.0, help='per-request timeout in seconds')
+    parser.add_argument('--json', default=None, help='also write the report to this file')
+    options = parser.parse_args(argv)
+
+    report = run(options)
+    print(f"concurrency {report['concurrency']}, {report['wall_seconds']:.1f} s")
+    print(f"{'endpoint':<8} {'requests':>8} {'errors':>6} {'req/s':>7} "
+          f"{'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, stats in report['endpoints'].items():
+        if not stats['requests']:
+            print(f"{name:<8} {0:>8}")
+            continue
+        print(f"{name:<8} {stats['requests']:>8} {stats['errors']:>6} {stats['throughput_rps']:>7.2f} "
+              f"{stats['p50_ms']:>8.1f} {stats['p90_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['max_ms']:>8.1f}")
+    if options.json:
+        with open(options.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 1 if any(stats['errors'] for stats in report['endpoints'].values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
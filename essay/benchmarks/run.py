@@ -0,0 +1,400 @@
+"""
+Offline benchmark suite for the OCR, classification, recommendation and view hot paths.
+
+Every benchmark runs against an in-memory database (``clothing_project.test_settings``)
+with generated data, so no network, uploaded media or OCR models are needed.
+Cases whose optional dependency is missing (e.g. TensorFlow for the classifier)
+are reported as skipped.
+
+Results are written as JSON (``--output``); ``--baseline`` compares the medians
+against a stored result file and exits with status 1 when a case got slower than
+``--threshold`` (default 25%). ``--save-baseline`` overwrites the baseline with
+the current run.
+
+Usage (from the ``essay`` directory)::
+
+    python benchmarks/run.py
+    python benchmarks/run.py --filter materials --repeat 10
+    python benchmarks/run.py --sizes 100,10000 --baseline benchmarks/baseline.json
+    python benchmarks/run.py --save-baseline
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(PROJECT_DIR, 'benchmarks', 'baseline.json')
+CATEGORIES = ('tshirt', 'pant', 'longsleeve', 'shortpant')
+
+BENCHMARKS = []
+
+
+class Skip(Exception):
+    """基准的可选依赖不可用"""
+
+
+def benchmark(group):
+    """注册一个基准；被装饰的函数完成准备工作后返回 [(用例名, 可调用对象), ...]"""
+    def register(func):
+        BENCHMARKS.append((group, func))
+        return func
+    return register
+
+
+# ---- 数据生成 ----
+
+def label_corpus(count, seed=0):
+    """合成的标签文本：材料名 + 百分比，混入部位、洗涤说明和OCR常见的错字"""
+    from ocr_app.services import material_lexicon
+
+    rng = random.Random(seed)
+    surfaces = list(material_lexicon.SURFACE_FORMS)
+    noise = ['表地', '裏地', '本体', 'MADE IN JAPAN', '洗濯ネット使用', '手洗い', '日本製', 'LOT-2031', '中国製']
+    texts = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(1, 4)):
+            name = rng.choice(surfaces)
+            if rng.random() < 0.15 and len(name) > 2:
+                # 模拟OCR漏字
+                cut = rng.randrange(len(name))
+                name = name[:cut] + name[cut + 1:]
+            parts.append(f"{name} {rng.choice([5, 10, 20, 35, 50, 65, 80, 100])}%")
+        parts.insert(rng.randrange(len(parts) + 1), rng.choice(noise))
+        texts.append(' '.join(parts))
+    return texts
+
+
+def label_image(width, height, seed=0):
+    """白底黑字的合成标签图片（RGB数组）"""
+    import numpy as np
+    from PIL import Image, ImageDraw
+
+    image = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(image)
+    rng = random.Random(seed)
+    line_height = max(12, height // 12)
+    for y in range(line_height, height - line_height, line_height * 2):
+        draw.text((width // 20, y), f"COTTON {rng.randint(10, 100)}% POLYESTER", fill='black')
+    return np.asarray(image)
+
+
+def populate_wardrobe(size):
+    """清空并生成 size 件衣物（bulk_create 不经过 ClothingImage.save，不需要图片文件）"""
+    from ocr_app.models import ClothingImage
+
+    rng = random.Random(size)
+    materials = [['綿'], ['綿', 'ポリエステル'], ['ウール'], ['麻'], ['ナイロン', 'ポリウレタン'], []]
+    ClothingImage.objects.all().delete()
+    ClothingImage.objects.bulk_create([
+        ClothingImage(
+            image=f'clothing_images/item_{i}.jpg',
+            label_image=f'label_images/label_{i}.jpg',
+            category=CATEGORIES[i % len(CATEGORIES)],
+            classification_confidence=rng.random(),
+            recognized_text='綿 100%',
+            materials=rng.choice(materials),
+        )
+        for i in range(size)
+    ], batch_size=1000)
+
+
+def ocr_processor_without_engine():
+    """材料匹配和预处理不需要PaddleOCR，使用不加载模型的替身（这两部分与真实引擎的代码相同）"""
+    from ocr_app.services.stub_backends import StubOCRProcessor
+
+    return StubOCRProcessor()
+
+
+# ---- 基准 ----
+
+@benchmark('materials')
+def materials_cases(options):
+    processor = ocr_processor_without_engine()
+    texts = label_corpus(500)
+    lines = [line for text in texts[:100] for line in text.split()]
+
+    def extract_all():
+        for text in texts:
+            processor.extract_material_and_percentage(text)
+
+    def potential_lines():
+        processor.potential_materials(lines)
+
+    return [
+        (f'materials.extract[{len(texts)} labels]', extract_all),
+        (f'materials.is_potential[{len(lines)} lines]', potential_lines),
+    ]
+
+
+@benchmark('ocr')
+def ocr_preprocess_cases(options):
+    processor = ocr_processor_without_engine()
+    cases = []
+    for width, height in [(320, 240), (1280, 960), (3024, 4032)]:
+        array = label_image(width, height)
+        cases.append((f'ocr.preprocess[{width}x{height}]',
+                      lambda array=array: processor.preprocess_image(array)))
+    png = io.BytesIO()
+    from PIL import Image
+    Image.fromarray(label_image(1280, 960)).save(png, format='PNG')
+    data = png.getvalue()
+    cases.append(('ocr.decode[1280x960 png]', lambda: processor.load_image(data)))
+    return cases
+
+
+@benchmark('classifier')
+def classifier_cases(options):
+    from importlib.util import find_spec
+
+    if find_spec('tensorflow') is None:
+        raise Skip('tensorflow is not installed')
+    import numpy as np
+    from ocr_app.services.image_classifier import ImageClassifier
+
+    try:
+        classifier = ImageClassifier()
+    except Exception as e:
+        raise Skip(f'classifier could not be loaded: {e}')
+    rng = np.random.default_rng(0)
+    arrays = [rng.integers(0, 255, (224, 224, 3)).astype(np.float32) for _ in range(16)]
+    classifier.extract_features(arrays[:1], batch_size=1)  # 构建计算图
+
+    def single():
+        for array in arrays:
+            features = classifier.extract_features([array], batch_size=1)
+            classifier.classify_features(features)
+
+    def batched():
+        classifier.classify_features(classifier.extract_features(arrays))
+
+    return [
+        (f'classifier.single[{len(arrays)} images]', single),
+        (f'classifier.batched[{len(arrays)} images]', batched),
+    ]
+
+
+@benchmark('recommender')
+def recommender_cases(options):
+    from ocr_app.models import ClothingImage
+    from ocr_app.services import suitability
+    from ocr_app.services.recommender import ClothingRecommender
+
+    recommender = ClothingRecommender()
+    weather = {'temperature': 18, 'humidity': 60, 'condition': 'Clouds'}
+    cases = []
+    for size in options.sizes:
+        def recommend(size=size):
+            # 大衣柜的数据在第一次调用（预热）前生成，之后的计时只包含推荐本身
+            if ClothingImage.objects.count() != size:
+                populate_wardrobe(size)
+            recommender.get_recommendation(ClothingImage.objects.all(), weather)
+        cases.append((f'recommender.get_recommendation[{size} items]', recommend))
+
+        def top_k(size=size, matrices={}):
+            # 衣柜特征矩阵在预热时构建，计时只包含整个衣柜的一次打分和每个类别的前 k 件
+            if size not in matrices:
+                if ClothingImage.objects.count() != size:
+                    populate_wardrobe(size)
+                matrices[size] = suitability.WardrobeMatrix.from_queryset(ClothingImage.objects.all())
+            matrices[size].top_k(weather, 10, ['longsleeve', 'pant'])
+        cases.append((f'recommender.suitability_top_k[{size} items]', top_k))
+    return cases
+
+
+@benchmark('views')
+def view_cases(options):
+    from unittest import mock
+
+    from django.conf import settings
+    from django.test import Client, override_settings
+    from django.urls import reverse
+    from ocr_app.models import ClothingImage
+    from ocr_app.services.pagination import encode_cursor, page_size
+    from ocr_app.services.weather_service import WeatherService
+
+    size = options.view_items
+    client = Client()
+    weather = {'weather': {'temperature': 18, 'humidity': 60, 'condition': 'Clouds'}}
+
+    def ensure_wardrobe():
+        if ClothingImage.objects.count() != size:
+            populate_wardrobe(size)
+
+    def clothing_list():
+        ensure_wardrobe()
+        assert client.get(reverse('clothing_list')).status_code == 200
+
+    def clothing_list_json_last_page():
+        ensure_wardrobe()
+        # 取最后一页：游标分页的耗时不随页码增长
+        cursor = encode_cursor(ClothingImage.objects.order_by('created_at', 'id')[page_size()])
+        assert client.get(reverse('clothing_list_json'), {'cursor': cursor}).status_code == 200
+
+    def query():
+        ensure_wardrobe()
+        # 天气接口替换为固定数据，基准不访问网络
+        with mock.patch.object(WeatherService, 'get_weather_by_city', return_value=weather):
+            assert client.post(reverse('query'), {'city': 'Tokyo'}).status_code == 200
+
+    def query_cached():
+        # 测试设置中推荐结果不缓存；这里打开进程内缓存，除第一次外都命中
+        with override_settings(CACHES={**settings.CACHES, 'recommendations': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'}}):
+            query()
+
+    return [
+        (f'views.clothing_list[{size} items]', clothing_list),
+        (f'views.clothing_list_json_last_page[{size} items]', clothing_list_json_last_page),
+        (f'views.query[{size} items]', query),
+        (f'views.query_cached[{size} items]', query_cached),
+    ]
+
+
+# ---- 运行与比较 ----
+
+# 每轮至少运行这么久，很快的用例在一轮中调用多次，减少计时噪声
+MIN_ROUND_SECONDS = 0.05
+
+
+def time_case(func, repeat):
+    func()  # 预热（也完成用例自己的数据准备）
+    start = time.perf_counter()
+    func()
+    number = max(1, int(MIN_ROUND_SECONDS / max(time.perf_counter() - start, 1e-9)))
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number * 1000)
+    return {
+        'median_ms': round(statistics.median(samples), 4),
+        'min_ms': round(min(samples), 4),
+        'mean_ms': round(statistics.fmean(samples), 4),
+        'stdev_ms': round(statistics.stdev(samples), 4) if len(samples) > 1 else 0.0,
+        'repeat': repeat,
+        'number': number,
+    }
+
+
+def setup_django():
+    sys.path.insert(0, PROJECT_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'clothing_project.test_settings')
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    call_command('migrate', verbosity=0)
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(options):
+    results = {}
+    skipped = {}
+    for group, func in BENCHMARKS:
+        if options.filter and not any(f in group for f in options.filter):
+            continue
+        try:
+            cases = func(options)
+        except Skip as e:
+            skipped[group] = str(e)
+            print(f"{group:<12} skipped: {e}")
+            continue
+        for name, case in cases:
+            results[name] = time_case(case, options.repeat)
+            print(f"{name:<52} {results[name]['median_ms']:12.3f} ms")
+    return {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': options.repeat,
+        },
+        'results': results,
+        'skipped': skipped,
+    }
+
+
+def compare(current, baseline, threshold):
+    """返回 [(用例名, 基线ms, 当前ms, 比值), ...] 和变慢超过阈值的用例名"""
+    rows = []
+    regressions = []
+    for name, result in current['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if base is None:
+            continue
+        ratio = result['median_ms'] / base['median_ms'] if base['median_ms'] else float('inf')
+        rows.append((name, base['median_ms'], result['median_ms'], ratio))
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--filter', action='append', default=[],
+                        help='only run groups containing this text (materials, ocr, classifier, recommender, views)')
+    parser.add_argument('--repeat', type=int, default=5, help='timed rounds per case')
+    parser.add_argument('--sizes', default='100,10000,100000',
+                        type=lambda value: [int(size) for size in value.split(',')],
+                        help='wardrobe sizes for the recommender benchmark')
+    parser.add_argument('--view-items', type=int, default=500, help='wardrobe size for the view benchmarks')
+    parser.add_argument('--output', default='benchmark-results.json', help='where to write the results')
+    parser.add_argument('--baseline', default=None, help='result file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='allowed slowdown against the baseline (0.25 = 25%%)')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help=f'write the results to --baseline (default {os.path.relpath(DEFAULT_BASELINE)})')
+    options = parser.parse_args(argv)
+
+    setup_django()
+    current = run(options)
+    with open(options.output, 'w', encoding='utf-8') as f:
+        json.dump(current, f, indent=2, ensure_ascii=False)
+    print(f"\nResults written to {options.output}")
+
+    baseline_path = options.baseline or DEFAULT_BASELINE
+    if options.save_baseline:
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(current, f, indent=2, ensure_ascii=False)
+        print(f"Baseline saved to {baseline_path}")
+        return 0
+    if not options.baseline:
+        return 0
+
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    rows, regressions = compare(current, baseline, options.threshold)
+    print(f"\nCompared with {baseline_path} ({baseline['meta'].get('revision')}):")
+    print(f"{'case':<52} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}")
+    for name, base_ms, current_ms, ratio in rows:
+        flag = '  SLOWER' if name in regressions else ''
+        print(f"{name:<52} {base_ms:12.3f} {current_ms:12.3f} {ratio:7.2f}{flag}")
+    if regressions:
+        print(f"\nFAIL: {len(regressions)} cases slower than the baseline by more than {options.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
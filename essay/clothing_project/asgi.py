@@ -0,0 +1,26 @@
+"""
+ASGI config for clothing_project project.
+
+It exposes the ASGI callable as a module-level variable named 'application'.
+Run it with any ASGI server, e.g. ``uvicorn clothing_project.asgi:application --workers 2``.
+The async query view (/query/async/) only frees the worker while waiting on the
+weather API when served this way.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'clothing_project.settings')
+
+application = get_asgi_application()
+
+# 与 wsgi.py 相同：worker启动时在后台加载并预热OCR和分类模型
+from django.conf import settings
+
+if getattr(settings, 'PRELOAD_MODELS', False):
+    from ocr_app.services.engine_registry import preload_engines
+    preload_engines()
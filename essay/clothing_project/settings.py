@@ -27,6 +27,7 @@ INSTALLED_APPS = [
 
 # 中间件配置
 MIDDLEWARE = [
+    'ocr_app.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,6 +57,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'clothing_project.wsgi.application'
+ASGI_APPLICATION = 'clothing_project.asgi.application'
 
 # 数据库配置
 DATABASES = {
@@ -103,33 +105,127 @@ TEST_RUNNER = 'django.test.runner.DiscoverRunner'
 
 # 默认主键字段类型
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# 模型引擎设置：每个worker进程内保留的OCR实例数（并发请求数较多时可适当调大）
+OCR_ENGINE_POOL_SIZE = int(os.environ.get('OCR_ENGINE_POOL_SIZE', 1))
+# 每个worker进程内保留的分类器实例数
+CLASSIFIER_POOL_SIZE = int(os.environ.get('CLASSIFIER_POOL_SIZE', 1))
+# 推理后端（实现类的点分路径）；离线测试和压测可换成 ocr_app.services.stub_backends 中不加载模型的替身
+OCR_BACKEND = os.environ.get('OCR_BACKEND', 'ocr_app.services.ocr_processor.OCRProcessor')
+CLASSIFIER_BACKEND = os.environ.get('CLASSIFIER_BACKEND', 'ocr_app.services.image_classifier.ImageClassifier')
+# 替身后端：每张图片模拟的推理耗时（毫秒）和固定输出（OCR文本行用 | 分隔，类别为空时由图片内容决定）
+STUB_OCR_LATENCY_MS = float(os.environ.get('STUB_OCR_LATENCY_MS', 0))
+STUB_CLASSIFIER_LATENCY_MS = float(os.environ.get('STUB_CLASSIFIER_LATENCY_MS', 0))
+STUB_OCR_TEXTS = os.environ.get('STUB_OCR_TEXTS', '表地|綿 80%|ポリエステル 20%').split('|')
+STUB_CLASSIFIER_CATEGORY = os.environ.get('STUB_CLASSIFIER_CATEGORY', '')
+# 天气推荐页面最多显示的衣物数（最新的在前），0 表示不限制；限制后查询耗时不随衣柜大小增长
+RECOMMENDATION_MAX_ITEMS = int(os.environ.get('RECOMMENDATION_MAX_ITEMS', 100))
+# 多城市推荐接口（query/batch/）一次最多接受的城市数
+BATCH_QUERY_MAX_CITIES = int(os.environ.get('BATCH_QUERY_MAX_CITIES', 20))
+# 推荐页面挑选衣物的方式：newest（推荐类别中最新的）或 suitability（按材料对天气的适合程度打分，
+# 每个类别取前 RECOMMENDATION_TOP_K 件）
+RECOMMENDATION_RANKING = os.environ.get('RECOMMENDATION_RANKING', 'newest')
+RECOMMENDATION_TOP_K = int(os.environ.get('RECOMMENDATION_TOP_K', 10))
+# 材料打分用的衣柜特征矩阵在每个进程中缓存；衣柜版本变化后立即重建，不经过信号的修改最多延迟这么久（秒）
+SUITABILITY_MATRIX_TTL = int(os.environ.get('SUITABILITY_MATRIX_TTL', 300))
+# 推荐结果缓存：按天气分档（1℃、5%湿度、天气类型）和衣柜版本缓存推荐的衣物，LRU 最多保留 MAX_ENTRIES 条。
+# 衣柜版本保存在数据库中，其他进程（run_ingest_workers、管理命令）的修改提交后立即失效；进程内只缓存条目
+RECOMMENDATION_CACHE_TTL = int(os.environ.get('RECOMMENDATION_CACHE_TTL', 600))
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'recommendations': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'recommendations',
+        'TIMEOUT': RECOMMENDATION_CACHE_TTL,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('RECOMMENDATION_CACHE_MAX_ENTRIES', 1000)),
+        },
+    },
+}
+# 衣物列表每页条数（按创建时间倒序的游标分页，翻页耗时与衣柜大小无关）
+CLOTHING_PAGE_SIZE = int(os.environ.get('CLOTHING_PAGE_SIZE', 24))
+# 缩略图（128/512px WebP）的压缩质量
+THUMBNAIL_QUALITY = int(os.environ.get('THUMBNAIL_QUALITY', 80))
+# 天气接口地址（测试和离线压测时可以指向本地的 stub_weather 服务）
+WEATHER_API_URL = os.environ.get('WEATHER_API_URL', 'http://api.openweathermap.org/data/2.5/weather')
+# 天气接口的连接和读取超时（秒）
+WEATHER_CONNECT_TIMEOUT = float(os.environ.get('WEATHER_CONNECT_TIMEOUT', 3.05))
+WEATHER_READ_TIMEOUT = float(os.environ.get('WEATHER_READ_TIMEOUT', 5))
+# 共享连接池的大小（每个进程）
+WEATHER_POOL_SIZE = int(os.environ.get('WEATHER_POOL_SIZE', 10))
+# 天气结果的缓存时间（秒）；过期后 WEATHER_STALE_TTL 秒内先返回旧结果并在后台刷新
+WEATHER_CACHE_TTL = int(os.environ.get('WEATHER_CACHE_TTL', 600))
+WEATHER_STALE_TTL = int(os.environ.get('WEATHER_STALE_TTL', 3600))
+# 进程内最多缓存的城市数
+WEATHER_CACHE_MAX_ENTRIES = int(os.environ.get('WEATHER_CACHE_MAX_ENTRIES', 1000))
+# worker启动时（wsgi加载时）在后台预加载并预热模型
+PRELOAD_MODELS = os.environ.get('PRELOAD_MODELS', '1') == '1'
+# 上传队列处理时每次合并识别的标签数（一批任务的标签按这个大小分块OCR）
+OCR_BATCH_SIZE = int(os.environ.get('OCR_BATCH_SIZE', 16))
+# OCR结果缓存表的最大条目数，超出后淘汰最久未使用的结果
+OCR_CACHE_MAX_ENTRIES = int(os.environ.get('OCR_CACHE_MAX_ENTRIES', 5000))
+# 图片分类时每次VGG16前向计算的图片数
+CLASSIFIER_BATCH_SIZE = int(os.environ.get('CLASSIFIER_BATCH_SIZE', 16))
+# 批量分类时并行解码/缩放图片的线程数
+CLASSIFIER_DECODE_WORKERS = int(os.environ.get('CLASSIFIER_DECODE_WORKERS', 4))
+# 保存VGG16特征向量的精度（float32 或 float16）
+FEATURE_STORE_DTYPE = os.environ.get('FEATURE_STORE_DTYPE', 'float32')
+# 上传队列：run_ingest_workers 的线程数和每次领取的任务数
+INGEST_WORKER_CONCURRENCY = int(os.environ.get('INGEST_WORKER_CONCURRENCY', 1))
+INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', 8))
+# 每个worker的流水线线程数：分类与OCR并行，同时预先读取和解码下一批
+INGEST_PIPELINE_WORKERS = int(os.environ.get('INGEST_PIPELINE_WORKERS', 2))
+# 任务运行超过这个秒数视为worker已退出，重新排队；最多尝试次数
+INGEST_JOB_TIMEOUT = int(os.environ.get('INGEST_JOB_TIMEOUT', 600))
+INGEST_MAX_ATTEMPTS = int(os.environ.get('INGEST_MAX_ATTEMPTS', 3))
+# 不运行worker时（开发环境）在上传请求内直接处理队列
+INGEST_INLINE = os.environ.get('INGEST_INLINE', '0') == '1'
+# /metrics/：多进程部署（gunicorn 多个worker、run_ingest_workers）时各进程把指标快照写到这个共享目录，
+# 为空时只输出本进程的指标；快照写入间隔（秒）
+METRICS_MULTIPROCESS_DIR = os.environ.get('METRICS_MULTIPROCESS_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 2.0))
 # settings.py
 
+# 日志级别（DEBUG/INFO/WARNING...）；默认 INFO，调试输出的字符串格式化在生产环境中完全跳过
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+# DEBUG 级别日志的抽样比例（0~1），逐条记录的调试输出很多时可以调低
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', 1.0))
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'formatters': {
+        'structured': {
+            'format': '%(asctime)s %(levelname)s %(name)s pid=%(process)d thread=%(threadName)s %(message)s',
+        },
+    },
+    'filters': {
+        'sample_debug': {
+            '()': 'ocr_app.logging_filters.SampleFilter',
+            'rate': LOG_DEBUG_SAMPLE_RATE,
+        },
+    },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
+            'formatter': 'structured',
+            'filters': ['sample_debug'],
         },
         'file': {
             'level': 'DEBUG',
             'class': 'logging.FileHandler',
             'filename': 'debug.log',
+            'formatter': 'structured',
+            'filters': ['sample_debug'],
         },
     },
     'loggers': {
         'ocr_app': {
             'handlers': ['console', 'file'],
-            'level': 'DEBUG',
+            'level': LOG_LEVEL,
             'propagate': True,
         },
     },
 }
-
-# 添加调试设置
-print("=== Media Settings ===")
-print(f"MEDIA_ROOT: {MEDIA_ROOT}")
-print(f"MEDIA_ROOT exists: {os.path.exists(MEDIA_ROOT)}")
-print(f"MEDIA_URL: {MEDIA_URL}")
-
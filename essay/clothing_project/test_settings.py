@@ -19,4 +19,10 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'ocr_app',  # 你的应用
-]
\ No newline at end of file
+]
+
+# 推荐结果不缓存：测试之间回滚数据库不会递增衣柜版本；缓存本身的测试用 override_settings 打开
+CACHES = {
+    **CACHES,
+    'recommendations': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
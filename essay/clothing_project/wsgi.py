@@ -13,4 +13,11 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'clothing_project.settings')
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# worker启动时在后台加载并预热OCR和分类模型，加载完成前 /health/ready/ 返回503
+from django.conf import settings
+
+if getattr(settings, 'PRELOAD_MODELS', False):
+    from ocr_app.services.engine_registry import preload_engines
+    preload_engines()
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ClothingImage, WeatherData, Recommendation
+from .models import ClothingImage, WeatherData, Recommendation, OCRResultCache
 
 @admin.register(ClothingImage)
 class ClothingImageAdmin(admin.ModelAdmin):
@@ -18,3 +18,9 @@ class RecommendationAdmin(admin.ModelAdmin):
     list_display = ['clothing', 'weather', 'created_at']
     list_filter = ['created_at']
     search_fields = ['recommendation_text']
+
+@admin.register(OCRResultCache)
+class OCRResultCacheAdmin(admin.ModelAdmin):
+    list_display = ['key', 'materials', 'hits', 'last_used', 'created_at']
+    list_filter = ['last_used']
+    search_fields = ['key']
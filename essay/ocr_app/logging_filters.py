@@ -0,0 +1,18 @@
+import logging
+import random
+
+
+class SampleFilter(logging.Filter):
+    """按比例抽样低级别（默认DEBUG）的日志记录，更高级别的记录全部保留。
+
+    过滤发生在格式化之前，被丢弃的记录不会产生字符串格式化的开销。"""
+
+    def __init__(self, rate=1.0, max_level=logging.DEBUG):
+        super().__init__()
+        self.rate = float(rate)
+        self.max_level = logging._checkLevel(max_level)
+
+    def filter(self, record):
+        if record.levelno > self.max_level or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
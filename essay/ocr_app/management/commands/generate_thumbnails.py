@@ -0,0 +1,69 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from ocr_app.models import ClothingImage
+from ocr_app.services import recommendation_cache, thumbnails
+
+
+class Command(BaseCommand):
+    help = '为还没有缩略图的衣物记录生成缩略图（WebP，128/512px）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=200,
+                            help='每次读取和更新的记录数')
+        parser.add_argument('--workers', type=int, default=4,
+                            help='并行生成缩略图的线程数（Pillow 解码和缩放时会释放GIL）')
+        parser.add_argument('--force', action='store_true',
+                            help='重新生成所有记录的缩略图')
+
+    def handle(self, *args, **options):
+        chunk_size = max(1, options['chunk_size'])
+        records = ClothingImage.objects.only('id', 'image', 'label_image', 'renditions').order_by('id')
+
+        total = generated = failed = 0
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+            chunk = []
+            for record in records.iterator(chunk_size=chunk_size):
+                missing = self.missing_fields(record, options['force'])
+                if not missing:
+                    continue
+                chunk.append((record, missing))
+                if len(chunk) >= chunk_size:
+                    counts = self.generate(executor, chunk)
+                    generated, failed = generated + counts[0], failed + counts[1]
+                    total += len(chunk)
+                    chunk = []
+            if chunk:
+                counts = self.generate(executor, chunk)
+                generated, failed = generated + counts[0], failed + counts[1]
+                total += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated thumbnails for {generated} of {total} records, {failed} failed"
+        ))
+
+    @staticmethod
+    def missing_fields(record, force):
+        renditions = record.renditions or {}
+        return [
+            field_name for field_name in thumbnails.FIELDS
+            if getattr(record, field_name) and (force or field_name not in renditions)
+        ]
+
+    def generate(self, executor, chunk):
+        results = executor.map(lambda entry: thumbnails.generate_thumbnails(entry[0], entry[1]), chunk)
+
+        updated = []
+        failed = 0
+        for (record, missing), done in zip(chunk, results):
+            if len(done) < len(missing):
+                failed += 1
+                self.stderr.write(f"Could not create all thumbnails for record {record.id} ({record.image.name})")
+            if done:
+                updated.append(record)
+
+        if updated:
+            ClothingImage.objects.bulk_update(updated, ['renditions'])
+            # bulk_update 不发送 post_save，缓存的推荐结果中还是原图的地址
+            recommendation_cache.bump_wardrobe_version()
+        return len(updated), failed
@@ -0,0 +1,67 @@
+from django.core.management.base import BaseCommand
+from ocr_app.models import ClothingImage
+from ocr_app.services import recommendation_cache
+from ocr_app.services.engine_registry import get_classifier_registry
+
+
+class Command(BaseCommand):
+    help = '用当前分类模型重新分类所有衣物图片（已保存的VGG16特征直接复用）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='每次读取和更新的记录数')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='只统计分类变化，不写入数据库')
+
+    def handle(self, *args, **options):
+        chunk_size = max(1, options['chunk_size'])
+        records = ClothingImage.objects.only(
+            'id', 'image', 'image_hash', 'category', 'classification_confidence'
+        ).order_by('id')
+
+        total = changed = failed = 0
+        with get_classifier_registry().acquire() as classifier:
+            chunk = []
+            for record in records.iterator(chunk_size=chunk_size):
+                chunk.append(record)
+                if len(chunk) >= chunk_size:
+                    counts = self.reclassify(classifier, chunk, options['dry_run'])
+                    changed, failed = changed + counts[0], failed + counts[1]
+                    total += len(chunk)
+                    chunk = []
+            if chunk:
+                counts = self.reclassify(classifier, chunk, options['dry_run'])
+                changed, failed = changed + counts[0], failed + counts[1]
+                total += len(chunk)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Reclassified {total - failed} of {total} images, {changed} changed category, {failed} failed"
+        ))
+
+    def reclassify(self, classifier, records, dry_run):
+        results = classifier.classify_images(
+            [record.image.path for record in records],
+            hashes=[record.image_hash for record in records],
+        )
+
+        updated = []
+        changed = failed = 0
+        for record, result in zip(records, results):
+            if result is None:
+                failed += 1
+                self.stderr.write(f"Could not classify record {record.id} ({record.image.name})")
+                continue
+            if record.category != result['category']:
+                changed += 1
+            record.category = result['category']
+            record.classification_confidence = result['confidence']
+            record.image_hash = result['image_hash']
+            updated.append(record)
+
+        if updated and not dry_run:
+            ClothingImage.objects.bulk_update(
+                updated, ['category', 'classification_confidence', 'image_hash']
+            )
+            # bulk_update 不发送 post_save，类别变化后缓存的推荐结果失效
+            recommendation_cache.bump_wardrobe_version()
+        return changed, failed
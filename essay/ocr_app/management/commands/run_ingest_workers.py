@@ -0,0 +1,56 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from ocr_app.services.ingest import requeue_stale_jobs, run_worker
+from ocr_app.services.metrics import start_flusher, write_snapshot
+
+
+class Command(BaseCommand):
+    help = '处理上传队列中的任务（分类 + OCR）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int,
+                            default=getattr(settings, 'INGEST_WORKER_CONCURRENCY', 1),
+                            help='并行处理任务的worker线程数')
+        parser.add_argument('--batch-size', type=int,
+                            default=getattr(settings, 'INGEST_BATCH_SIZE', 8),
+                            help='每个worker一次领取并批量处理的任务数')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='队列为空时的等待秒数')
+        parser.add_argument('--drain', action='store_true',
+                            help='处理完当前队列后退出')
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        stop_event = threading.Event()
+
+        def stop(signum, frame):
+            self.stdout.write("Stopping after the current jobs...")
+            stop_event.set()
+
+        signal.signal(signal.SIGINT, stop)
+        signal.signal(signal.SIGTERM, stop)
+
+        requeue_stale_jobs()
+        start_flusher()
+
+        threads = [
+            threading.Thread(
+                target=run_worker,
+                args=(index, max(1, options['batch_size']), options['poll_interval'], stop_event),
+                kwargs={'drain': options['drain']},
+                name=f'ingest-worker-{index}',
+            )
+            for index in range(concurrency)
+        ]
+        self.stdout.write(f"Starting {concurrency} ingest workers")
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(timeout=1.0)
+        # 退出前写入最后一次指标快照（未设置 METRICS_MULTIPROCESS_DIR 时不做任何事）
+        write_snapshot()
+        self.stdout.write(self.style.SUCCESS("Ingest workers stopped"))
@@ -0,0 +1,45 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .services.metrics import start_flusher
+from .services.timing import collect_request_timings, record, server_timing_header
+
+
+class ServerTimingMiddleware:
+    """收集请求内各阶段的耗时，写入 Server-Timing 响应头
+
+    同时支持同步和异步：ASGI 下不会让异步视图退回到线程中执行
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        # 预加载应用后fork出的worker进程需要自己的快照线程；已启动时只比较一次pid
+        start_flusher()
+        start = time.perf_counter()
+        with collect_request_timings() as timings:
+            response = self.get_response(request)
+        return self.finish(request, response, timings, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        start_flusher()
+        start = time.perf_counter()
+        with collect_request_timings() as timings:
+            response = await self.get_response(request)
+        return self.finish(request, response, timings, time.perf_counter() - start)
+
+    @staticmethod
+    def finish(request, response, timings, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and match.url_name:
+            record(f'view.{match.url_name}', elapsed)
+        response['Server-Timing'] = server_timing_header(timings, total_ms=elapsed * 1000)
+        return response
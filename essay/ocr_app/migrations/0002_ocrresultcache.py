@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:53
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OCRResultCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('detected_texts', models.JSONField(default=list)),
+                ('recognized_texts', models.JSONField(default=list)),
+                ('materials', models.JSONField(default=list)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
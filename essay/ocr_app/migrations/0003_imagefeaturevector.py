@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_app', '0002_ocrresultcache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clothingimage',
+            name='image_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.CreateModel(
+            name='ImageFeatureVector',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('backbone', models.CharField(max_length=64)),
+                ('dtype', models.CharField(default='float32', max_length=16)),
+                ('dim', models.PositiveIntegerField()),
+                ('vector', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'unique_together': {('content_hash', 'backbone')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_app', '0005_clothingimage_category_created_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clothingimage',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
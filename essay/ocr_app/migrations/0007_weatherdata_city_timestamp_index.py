@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_app', '0006_clothingimage_renditions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='weatherdata',
+            index=models.Index(fields=['city', '-timestamp'], name='weather_city_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_app', '0007_weatherdata_city_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='clothingimage',
+            name='category',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='clothingimage',
+            index=models.Index(fields=['category', '-created_at'], name='clothing_category_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:20
+
+import time
+
+from django.db import migrations, models
+
+
+def create_version(apps, schema_editor):
+    WardrobeVersion = apps.get_model('ocr_app', 'WardrobeVersion')
+    WardrobeVersion.objects.get_or_create(pk=1, defaults={'version': time.time_ns()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr_app', '0008_clothingimage_category_recent_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WardrobeVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField()),
+            ],
+        ),
+        migrations.RunPython(create_version, migrations.RunPython.noop),
+    ]
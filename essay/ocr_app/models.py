@@ -1,14 +1,21 @@
 # ocr_app/models.py
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.contrib.auth.models import User
+from django.utils import timezone
 from PIL import Image
 import pillow_heif  # 需要安装这个包来处理 HEIC
 from io import BytesIO
 from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 import os
 import logging
 import time
 
+from .services import recommendation_cache, thumbnails
+from .services.timing import timed
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,7 +37,11 @@ class ClothingImage(models.Model):
     classification_confidence = models.FloatField(null=True, blank=True)
     recognized_text = models.TextField(null=True, blank=True)
     materials = models.JSONField(null=True, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # 衣物图片文件内容的sha256，用于查找已保存的特征向量
+    image_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    # 缩略图文件名：{'image': {'128': ..., '512': ...}, 'label_image': {...}}
+    renditions = models.JSONField(default=dict, blank=True)
 
     def delete(self, *args, **kwargs):
         """删除记录和关联的图片文件"""
@@ -44,11 +55,11 @@ class ClothingImage(models.Model):
                     return True
                 except PermissionError:
                     if i < max_retries - 1:
-                        print(f"Attempt {i+1}: File is in use, waiting before retry...")
+                        logger.debug("Attempt %d: file %s is in use, waiting before retry", i + 1, file_path)
                         time.sleep(1)  # 等待1秒后重试
                     continue
                 except Exception as e:
-                    print(f"Error deleting file {file_path}: {str(e)}")
+                    logger.error("Error deleting file %s: %s", file_path, e)
                     return False
             return False
 
@@ -59,6 +70,8 @@ class ClothingImage(models.Model):
         # 尝试删除标签图片文件
         if self.label_image:
             try_delete_file(self.label_image.path)
+
+        thumbnails.delete_thumbnails(self)
         
         # 删除数据库记录
         super().delete(*args, **kwargs)
@@ -66,11 +79,28 @@ class ClothingImage(models.Model):
     def __str__(self):
         return f"Clothing {self.id}"
 
+    def rendition_url(self, field_name, size):
+        """缩略图的URL；还没有生成缩略图时返回原图的URL"""
+        name = (self.renditions or {}).get(field_name, {}).get(str(size))
+        if name:
+            return default_storage.url(name)
+        field = getattr(self, field_name)
+        return field.url if field else None
+
+    @property
+    def thumbnail_url(self):
+        return self.rendition_url('image', thumbnails.LARGE)
+
+    @property
+    def thumbnail_small_url(self):
+        return self.rendition_url('image', thumbnails.SMALL)
+
+    @property
+    def label_thumbnail_url(self):
+        return self.rendition_url('label_image', thumbnails.LARGE)
+
+    @timed('db.save')
     def save(self, *args, **kwargs):
-        print("\n=== Save Debug Info ===")
-        print(f"Saving image: {self.image.name if self.image else 'No image'}")
-        print(f"Saving label: {self.label_image.name if self.label_image else 'No label'}")
-        
         if not self.image:
             raise ValueError("No image provided")
             
@@ -79,10 +109,7 @@ class ClothingImage(models.Model):
         # 验证保存后的文件
         if not os.path.exists(self.image.path):
             raise ValueError(f"Image file not saved: {self.image.path}")
-        
-        print(f"Save successful. ID: {self.id}")
-        print(f"Image path: {self.image.path}")
-        print(f"Image exists: {os.path.exists(self.image.path)}")
+        logger.debug("Saved clothing=%s image=%s label=%s", self.id, self.image.name, self.label_image.name)
 
     def convert_heic_to_jpg(self, field_name):
         """将 HEIC 格式转换为 JPG"""
@@ -115,10 +142,28 @@ class ClothingImage(models.Model):
             setattr(self, field_name, ContentFile(output.read(), name=new_name))
             
         except Exception as e:
-            print(f"Error converting HEIC to JPG: {str(e)}")
+            logger.error("Error converting HEIC to JPG: %s", e)
 
     class Meta:
         ordering = ['-created_at']  # 按创建时间倒序排列
+        # 推荐按类别取最新的衣物：每个类别沿索引倒序读取，取够条数就停止
+        indexes = [models.Index(fields=['category', '-created_at'], name='clothing_category_recent_idx')]
+
+
+@receiver([post_save, post_delete], sender=ClothingImage, dispatch_uid='clothing_wardrobe_version')
+def wardrobe_changed(sender, **kwargs):
+    """衣物的新增、修改和删除都让缓存的推荐结果失效（bulk_create/bulk_update 需要自己调用）"""
+    recommendation_cache.bump_wardrobe_version()
+
+
+class WardrobeVersion(models.Model):
+    """衣柜的版本号（只有一行）：衣物变化后递增，所有进程缓存的推荐结果都按它失效"""
+    ID = 1
+
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"Wardrobe version {self.version}"
 
 
 class WeatherData(models.Model):
@@ -132,6 +177,10 @@ class WeatherData(models.Model):
     def __str__(self):
         return f"Weather Data {self.temperature}°C at {self.timestamp}"
 
+    class Meta:
+        # WeatherService 按城市查找最近的读数
+        indexes = [models.Index(fields=['city', '-timestamp'], name='weather_city_recent_idx')]
+
 
 class Recommendation(models.Model):
     """Model to store clothing recommendations"""
@@ -144,3 +193,76 @@ class Recommendation(models.Model):
         return f"Recommendation for {self.clothing}"
 
 
+class OCRResultCache(models.Model):
+    """Cached OCR results keyed by label pixel hash and OCR configuration"""
+    key = models.CharField(max_length=64, unique=True)
+    detected_texts = models.JSONField(default=list)
+    recognized_texts = models.JSONField(default=list)
+    materials = models.JSONField(default=list)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"OCR cache {self.key[:12]}"
+
+
+class ImageFeatureVector(models.Model):
+    """Backbone feature vector of an image, keyed by content hash and backbone version"""
+    content_hash = models.CharField(max_length=64)
+    backbone = models.CharField(max_length=64)
+    dtype = models.CharField(max_length=16, default='float32')
+    dim = models.PositiveIntegerField()
+    vector = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('content_hash', 'backbone')
+
+    def __str__(self):
+        return f"{self.backbone} features {self.content_hash[:12]}"
+
+
+class IngestBatch(models.Model):
+    """A batch upload whose items are processed by the ingest workers"""
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Ingest batch {self.id}"
+
+
+class IngestJob(models.Model):
+    """One clothing/label pair waiting in the DB-backed ingest queue"""
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, '等待中'),
+        (STATUS_RUNNING, '处理中'),
+        (STATUS_DONE, '完成'),
+        (STATUS_FAILED, '失败'),
+    ]
+
+    batch = models.ForeignKey(IngestBatch, on_delete=models.CASCADE, related_name='jobs')
+    position = models.PositiveIntegerField()
+    # 队列中的文件（相对于MEDIA_ROOT），处理完成后删除
+    clothing_file = models.CharField(max_length=255)
+    label_file = models.CharField(max_length=255)
+    clothing_name = models.CharField(max_length=255)
+    label_name = models.CharField(max_length=255)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    clothing = models.ForeignKey(ClothingImage, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['status', 'id'])]
+
+    def __str__(self):
+        return f"Ingest job {self.id} ({self.status})"
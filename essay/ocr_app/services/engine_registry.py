@@ -0,0 +1,247 @@
+import os
+import threading
+import time
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .metrics import MODEL_LOADS
+
+logger = logging.getLogger(__name__)
+
+
+class EngineRegistry:
+    """进程级模型实例池：延迟加载、线程安全，每个worker进程只加载一次"""
+
+    def __init__(self, name, factory, pool_size=1, warmup=None):
+        self.name = name
+        self.factory = factory
+        # 加载后执行一次的预热函数（例如一次空推理），避免第一个真实请求承担图构建开销
+        self.warmup_hook = warmup
+        self.pool_size = max(1, int(pool_size))
+
+        self._cond = threading.Condition()
+        self._idle = []               # 空闲的实例
+        self._created = 0             # 当前代已创建（含加载中）的实例数
+        self._ready = 0               # 当前代已加载完成的实例数
+        self._generation = 0          # reload() 之后递增，旧实例归还时直接丢弃
+        self._pid = os.getpid()
+
+        self._loads = 0
+        self._reloads = 0
+        self._load_seconds = 0.0
+        self._last_load_seconds = None
+        self._waits = 0
+        self._last_error = None
+
+    def _check_fork(self):
+        """fork之后子进程不能复用父进程的实例（Paddle/TF的线程状态不可继承）"""
+        if os.getpid() != self._pid:
+            self._pid = os.getpid()
+            self._idle = []
+            self._created = 0
+            self._ready = 0
+            self._generation += 1
+
+    def _build(self, generation):
+        start = time.perf_counter()
+        try:
+            instance = self.factory()
+            if self.warmup_hook is not None:
+                self.warmup_hook(instance)
+        except Exception as e:
+            with self._cond:
+                self._last_error = f"{type(e).__name__}: {e}"
+            logger.exception("Failed to load %s engine", self.name)
+            MODEL_LOADS.inc(model=self.name, result='error')
+            raise
+        elapsed = time.perf_counter() - start
+        MODEL_LOADS.inc(model=self.name, result='success')
+        with self._cond:
+            self._last_error = None
+            if generation == self._generation:
+                self._ready += 1
+            self._loads += 1
+            self._load_seconds += elapsed
+            self._last_load_seconds = elapsed
+        logger.info("Loaded %s engine in %.2fs (pool %d/%d)",
+                    self.name, elapsed, self._created, self.pool_size)
+        return instance
+
+    def _checkout(self):
+        with self._cond:
+            self._check_fork()
+            while True:
+                if self._idle:
+                    return self._idle.pop(), self._generation
+                if self._created < self.pool_size:
+                    # 先占位，在锁外加载模型，避免阻塞其他线程归还实例
+                    self._created += 1
+                    generation = self._generation
+                    break
+                self._waits += 1
+                self._cond.wait()
+
+        try:
+            return self._build(generation), generation
+        except Exception:
+            with self._cond:
+                if generation == self._generation:
+                    self._created -= 1
+                self._cond.notify()
+            raise
+
+    def _checkin(self, instance, generation):
+        with self._cond:
+            if generation == self._generation and os.getpid() == self._pid:
+                self._idle.append(instance)
+            elif generation == self._generation:
+                self._created -= 1
+                self._ready -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def acquire(self):
+        """借出一个实例，使用完毕后自动归还"""
+        instance, generation = self._checkout()
+        try:
+            yield instance
+        finally:
+            self._checkin(instance, generation)
+
+    def warmup(self):
+        """预先加载整个池，用于worker启动时"""
+        with self._cond:
+            self._check_fork()
+            missing = self.pool_size - self._created
+            self._created += missing
+            generation = self._generation
+        built = 0
+        try:
+            for _ in range(missing):
+                instance = self._build(generation)
+                built += 1
+                self._checkin(instance, generation)
+        finally:
+            if built < missing:
+                with self._cond:
+                    if generation == self._generation:
+                        self._created -= missing - built
+                    self._cond.notify_all()
+
+    def reload(self, eager=False):
+        """丢弃所有已加载的实例；正在使用中的实例归还时被丢弃"""
+        with self._cond:
+            self._idle = []
+            self._created = 0
+            self._ready = 0
+            self._generation += 1
+            self._reloads += 1
+            self._cond.notify_all()
+        logger.info("Reloading %s engines", self.name)
+        if eager:
+            self.warmup()
+
+    @property
+    def loaded(self):
+        with self._cond:
+            return os.getpid() == self._pid and self._ready > 0
+
+    def stats(self):
+        with self._cond:
+            return {
+                'name': self.name,
+                'pool_size': self.pool_size,
+                'loaded': self._ready,
+                'idle': len(self._idle),
+                'in_use': self._ready - len(self._idle),
+                'loads': self._loads,
+                'reloads': self._reloads,
+                'waits': self._waits,
+                'total_load_seconds': round(self._load_seconds, 3),
+                'last_load_seconds': (round(self._last_load_seconds, 3)
+                                      if self._last_load_seconds is not None else None),
+                'last_error': self._last_error,
+            }
+
+
+def ocr_backend():
+    """settings.OCR_BACKEND 指定的OCR实现类（默认PaddleOCR，stub_backends 中有不加载模型的替身）"""
+    return import_string(getattr(settings, 'OCR_BACKEND', 'ocr_app.services.ocr_processor.OCRProcessor'))
+
+
+def classifier_backend():
+    """settings.CLASSIFIER_BACKEND 指定的分类器实现类"""
+    return import_string(getattr(settings, 'CLASSIFIER_BACKEND',
+                                 'ocr_app.services.image_classifier.ImageClassifier'))
+
+
+def _build_ocr_processor():
+    return ocr_backend()()
+
+
+def _build_image_classifier():
+    return classifier_backend()()
+
+
+def _warmup(instance):
+    instance.warmup()
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def _get_registry(name, factory, pool_size_setting):
+    registry = _registries.get(name)
+    if registry is None:
+        with _registries_lock:
+            registry = _registries.get(name)
+            if registry is None:
+                pool_size = getattr(settings, pool_size_setting, 1)
+                registry = EngineRegistry(name, factory, pool_size=pool_size, warmup=_warmup)
+                _registries[name] = registry
+    return registry
+
+
+def get_ocr_registry():
+    """当前进程共享的OCR引擎池"""
+    return _get_registry('ocr', _build_ocr_processor, 'OCR_ENGINE_POOL_SIZE')
+
+
+def get_classifier_registry():
+    """当前进程共享的图片分类器（VGG16特征提取 + 分类Pipeline）"""
+    return _get_registry('classifier', _build_image_classifier, 'CLASSIFIER_POOL_SIZE')
+
+
+def model_registries():
+    """健康检查和预加载覆盖的所有模型"""
+    return {
+        'ocr': get_ocr_registry(),
+        'classifier': get_classifier_registry(),
+    }
+
+
+def preload_engines(background=True):
+    """worker启动时加载并预热所有模型；后台加载时就绪状态可通过 /health/ready/ 查询"""
+    def load_all():
+        for registry in model_registries().values():
+            try:
+                registry.warmup()
+            except Exception:
+                # 错误已记录在 stats()['last_error'] 中，首次请求时会再次尝试加载
+                pass
+
+    if not background:
+        load_all()
+        return None
+    thread = threading.Thread(target=load_all, name='model-preload', daemon=True)
+    thread.start()
+    return thread
+
+
+def engine_stats():
+    """所有已创建的引擎池的加载统计"""
+    return {name: registry.stats() for name, registry in list(_registries.items())}
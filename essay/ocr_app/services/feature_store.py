@@ -0,0 +1,65 @@
+import hashlib
+import logging
+
+import numpy as np
+from django.conf import settings
+
+from ..models import ImageFeatureVector
+from .metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(data):
+    """图片文件内容的sha256（与 ClothingImage.image_hash 一致）"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class FeatureStore:
+    """按 (图片内容哈希, 骨干网络版本) 保存特征向量，分类头重新训练后无需再跑骨干网络"""
+
+    def __init__(self, backbone, dtype=None):
+        self.backbone = backbone
+        # float16 占用减半，对512维池化特征的分类结果几乎没有影响
+        self.dtype = np.dtype(dtype or getattr(settings, 'FEATURE_STORE_DTYPE', 'float32'))
+
+    @staticmethod
+    def _decode(entry):
+        vector = np.frombuffer(bytes(entry.vector), dtype=entry.dtype)
+        return vector.reshape(entry.dim).astype(np.float32)
+
+    def get_many(self, hashes):
+        """一次查询取回多个特征向量，返回 {content_hash: float32数组}"""
+        hashes = [h for h in dict.fromkeys(hashes) if h]
+        if not hashes:
+            return {}
+        entries = ImageFeatureVector.objects.filter(backbone=self.backbone, content_hash__in=hashes)
+        found = {entry.content_hash: self._decode(entry) for entry in entries}
+        if found:
+            CACHE_LOOKUPS.inc(len(found), cache='features', result='hit')
+        if len(hashes) > len(found):
+            CACHE_LOOKUPS.inc(len(hashes) - len(found), cache='features', result='miss')
+        logger.debug("Feature store lookup: %d hit, %d miss", len(found), len(hashes) - len(found))
+        return found
+
+    def set_many(self, vectors):
+        """保存 {content_hash: 特征向量}，已存在的条目保持不变"""
+        rows = []
+        for key, vector in vectors.items():
+            vector = np.asarray(vector, dtype=self.dtype).ravel()
+            rows.append(ImageFeatureVector(
+                content_hash=key,
+                backbone=self.backbone,
+                dtype=self.dtype.name,
+                dim=vector.size,
+                vector=vector.tobytes(),
+            ))
+        ImageFeatureVector.objects.bulk_create(rows, batch_size=500, ignore_conflicts=True)
+
+    def matrix(self, hashes):
+        """按给定顺序返回特征矩阵和对应的哈希列表（缺失的哈希被跳过），用于重新训练或相似度计算"""
+        found = self.get_many(hashes)
+        keys = [h for h in dict.fromkeys(hashes) if h in found]
+        if not keys:
+            return np.empty((0, 0), dtype=np.float32), []
+        return np.stack([found[h] for h in keys]), keys
@@ -1,13 +1,24 @@
-from tensorflow.keras.applications.vgg16 import preprocess_input, VGG16
-from tensorflow.keras.models import Model
-from tensorflow.keras.preprocessing.image import img_to_array
+# TensorFlow/Keras 在创建分类器时才导入，导入本模块不会加载它们
 import numpy as np
 from PIL import Image
 import io
 import joblib
+import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .feature_store import FeatureStore, content_hash
+from .metrics import CLASSIFIED_IMAGES
+from .timing import timed
+
+logger = logging.getLogger(__name__)
 
 class ImageClassifier:
+    # 骨干网络及输入预处理的版本；修改后已保存的特征向量不再复用
+    BACKBONE_VERSION = 'vgg16-imagenet-avgpool-224'
+
     def __init__(self):
         try:
             # 初始化类别标签映射
@@ -19,110 +30,205 @@ class ImageClassifier:
             }
             self.LABELS_TO_CATEGORY = {v: k for k, v in self.CATEGORY_LABELS.items()}
             
+            from tensorflow.keras.applications.vgg16 import VGG16
+            from tensorflow.keras.models import Model
+
             # 加载预训练的VGG16模型
             base_model = VGG16(weights='imagenet', include_top=False, pooling='avg')
             self.feature_extractor = Model(inputs=base_model.input, outputs=base_model.output)
-            print("Feature extractor loaded successfully")
+            logger.info("Feature extractor loaded")
             
             # 加载分类Pipeline
             base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
             model_path = os.path.join(base_dir, 'ml_models', 'image_classification_pipeline.pkl')
-            print(f"Looking for model at: {model_path}")
+            logger.debug("Looking for model at %s", model_path)
             
             if not os.path.exists(model_path):
-                print(f"Model file not found at {model_path}")
+                logger.warning("Model file not found at %s", model_path)
                 # 尝试其他可能的路径
                 alternate_path = os.path.join(base_dir, 'ml_models', 'image_classification_pipeline .pkl')
                 if os.path.exists(alternate_path):
                     model_path = alternate_path
-                    print(f"Found model at alternate path: {model_path}")
+                    logger.info("Found model at alternate path %s", model_path)
                 else:
                     raise FileNotFoundError(f"Model file not found at {model_path} or {alternate_path}")
             
             self.pipeline = joblib.load(model_path)
-            print("Classification pipeline loaded successfully")
+            logger.info("Classification pipeline loaded")
+
+            # 已计算过的VGG16特征按图片内容哈希保存在数据库中
+            self.feature_store = FeatureStore(self.BACKBONE_VERSION)
             
         except Exception as e:
-            print(f"Error initializing classifier: {str(e)}")
+            logger.error("Error initializing classifier: %s", e)
             raise e
 
+    def warmup(self):
+        """用一张空白图片跑一次完整推理，让TensorFlow提前完成图构建"""
+        from tensorflow.keras.applications.vgg16 import preprocess_input
+
+        dummy = preprocess_input(np.zeros((1, 224, 224, 3), dtype=np.float32))
+        features = self.feature_extractor.predict(dummy, verbose=0)
+        self.pipeline.predict_proba(features.reshape(1, -1))
+        logger.info("Classifier warmed up")
+
+    @staticmethod
+    def read_bytes(image_file):
+        """读取上传文件或文件路径的原始内容"""
+        if hasattr(image_file, 'read'):
+            data = image_file.read()
+            # 重置文件指针，以便后续处理
+            if hasattr(image_file, 'seek'):
+                image_file.seek(0)
+            return data
+        with open(image_file, 'rb') as f:
+            return f.read()
+
+    @staticmethod
+    @timed('classifier.decode')
+    def decode_image(data, target_size=(224, 224)):
+        """解码并缩放图片，返回 (224, 224, 3) 的float32数组（尚未做VGG16预处理）"""
+        image = Image.open(io.BytesIO(data))
+        image = image.resize(target_size)
+        image = image.convert('RGB')
+        # 与 keras 的 img_to_array 相同（channels_last, float32），解码线程中不需要TensorFlow
+        return np.asarray(image, dtype=np.float32)
+
+    def load_image(self, image_file, target_size=(224, 224)):
+        """读取并缩放图片"""
+        return self.decode_image(self.read_bytes(image_file), target_size)
+
+    def extract_features(self, arrays, batch_size=None):
+        """按批次做VGG16前向计算，每批只调用一次 predict，返回 (N, 512) 的特征矩阵"""
+        from tensorflow.keras.applications.vgg16 import preprocess_input
+
+        if batch_size is None:
+            batch_size = getattr(settings, 'CLASSIFIER_BATCH_SIZE', 16)
+        batch_size = max(1, int(batch_size))
+
+        features = []
+        for start in range(0, len(arrays), batch_size):
+            batch = preprocess_input(np.stack(arrays[start:start + batch_size]))
+            with timed('classifier.vgg16'):
+                features.append(self.feature_extractor.predict(batch, batch_size=len(batch), verbose=0))
+        return np.concatenate(features).reshape(len(arrays), -1)
+
+    @timed('classifier.preprocess_image')
     def preprocess_image(self, image_file, target_size=(224, 224)):
         """预处理图片并提取特征"""
         try:
-            print("\n=== Image Preprocessing Debug ===")
-            # 处理上传的文件
-            if hasattr(image_file, 'read'):
-                print("Processing uploaded file...")
-                image_content = image_file.read()
-                image = Image.open(io.BytesIO(image_content))
-                # 重置文件指针，以便后续处理
-                if hasattr(image_file, 'seek'):
-                    image_file.seek(0)
-            else:
-                print("Processing file path...")
-                image = Image.open(image_file)
-            
-            print(f"Original image size: {image.size}")
-            print(f"Original image mode: {image.mode}")
-            
-            # 预处理图像
-            image = image.resize(target_size)
-            print(f"Resized to: {image.size}")
-            
-            image = image.convert('RGB')
-            print("Converted to RGB")
-            
-            x = img_to_array(image)
-            print(f"Converted to array shape: {x.shape}")
-            
-            x = np.expand_dims(x, axis=0)
-            print(f"Expanded dimensions: {x.shape}")
-            
-            x = preprocess_input(x)
-            print("Applied VGG16 preprocessing")
-            
-            # 提取特征
-            print("Extracting features with VGG16...")
-            features = self.feature_extractor.predict(x)
-            print(f"Extracted features shape: {features.shape}")
-            
-            return features.flatten()
-            
+            x = self.load_image(image_file, target_size)
+            return self.extract_features([x], batch_size=1)[0]
+
         except Exception as e:
-            print(f"Preprocessing error: {str(e)}")
-            print(f"Error type: {type(e).__name__}")
-            print(f"Error details: {str(e)}")
+            logger.error("Preprocessing error: %s: %s", type(e).__name__, e)
             raise e
 
+    def classify_features(self, features):
+        """对特征矩阵只调用一次 predict_proba，类别和置信度都从概率中得到"""
+        with timed('classifier.predict_proba'):
+            probabilities = self.pipeline.predict_proba(features)
+        best = probabilities.argmax(axis=1)
+        labels = self.pipeline.classes_[best]
+        return [
+            {
+                'category': self.LABELS_TO_CATEGORY.get(label, 'unknown'),
+                'confidence': float(probabilities[i, j]),
+            }
+            for i, (label, j) in enumerate(zip(labels, best))
+        ]
+
+    def classify_images(self, image_files, batch_size=None, workers=None, hashes=None, decoded=None):
+        """批量分类多张图片，返回与输入等长的结果列表；无法读取的图片对应None。
+
+        hashes 可传入已知的图片内容哈希（例如 ClothingImage.image_hash），特征已保存时不再读取文件。
+        decoded 可传入预先用 decode_image 解码好的数组（需同时给出哈希），这些图片不再读取和解码。
+        其余图片的读取和解码在线程池中进行，只有没有保存特征的图片才按 batch_size 分批跑VGG16，
+        最后对所有特征只调用一次 predict_proba。"""
+        image_files = list(image_files)
+        if not image_files:
+            return []
+        if workers is None:
+            workers = getattr(settings, 'CLASSIFIER_DECODE_WORKERS', 4)
+        hashes = list(hashes) if hashes is not None else [None] * len(image_files)
+        decoded = list(decoded) if decoded is not None else [None] * len(image_files)
+        store = self.feature_store
+        features = store.get_many(hashes) if store is not None else {}
+
+        def run(func, indexes):
+            if workers > 1 and len(indexes) > 1:
+                with ThreadPoolExecutor(max_workers=min(workers, len(indexes))) as executor:
+                    return list(executor.map(func, indexes))
+            return [func(i) for i in indexes]
+
+        def read(i):
+            try:
+                return self.read_bytes(image_files[i])
+            except Exception as e:
+                logger.warning("Failed to read %s: %s", getattr(image_files[i], 'name', image_files[i]), e)
+                return None
+
+        def decode(i):
+            if decoded[i] is not None:
+                return decoded[i]
+            try:
+                return self.decode_image(contents[i])
+            except Exception as e:
+                logger.warning("Failed to load %s: %s", getattr(image_files[i], 'name', image_files[i]), e)
+                return None
+
+        # 第一步：读取特征尚未保存的图片，按内容哈希再查一次
+        todo = [i for i, key in enumerate(hashes) if key not in features and decoded[i] is None]
+        contents = dict(zip(todo, run(read, todo)))
+        for i, data in contents.items():
+            if data is not None:
+                hashes[i] = content_hash(data)
+        if store is not None:
+            features.update(store.get_many([hashes[i] for i in todo if contents[i] is not None]))
+
+        # 第二步：只有没有保存特征的图片才解码并跑VGG16（相同内容只算一次）
+        missing = list({hashes[i]: i for i in range(len(image_files))
+                        if (decoded[i] is not None or contents.get(i) is not None)
+                        and hashes[i] not in features}.values())
+        inputs = [(i, x) for i, x in zip(missing, run(decode, missing)) if x is not None]
+        if inputs:
+            vectors = self.extract_features([x for _, x in inputs], batch_size)
+            computed = {hashes[i]: vector for (i, _), vector in zip(inputs, vectors)}
+            if store is not None:
+                store.set_many(computed)
+            features.update(computed)
+        CLASSIFIED_IMAGES.inc(len(inputs), features='computed')
+
+        ready = [i for i, key in enumerate(hashes) if key in features]
+        results = [None] * len(image_files)
+        CLASSIFIED_IMAGES.inc(len(ready) - len(inputs), features='stored')
+        CLASSIFIED_IMAGES.inc(len(image_files) - len(ready), features='failed')
+        if ready:
+            matrix = np.stack([features[hashes[i]] for i in ready])
+            for i, result in zip(ready, self.classify_features(matrix)):
+                result['image_hash'] = hashes[i]
+                results[i] = result
+        logger.info("Classified %d/%d images (%d through VGG16)", len(ready), len(image_files), len(inputs))
+        return results
+
     def classify_image(self, image_file):
         """使用模型对图片进行分类"""
         try:
-            print("\n=== Image Classification Debug ===")
-            print(f"Processing image: {getattr(image_file, 'name', str(image_file))}")
-            
-            # 提取特征
-            print("Extracting features...")
-            features = self.preprocess_image(image_file)
-            print(f"Features shape: {features.shape}")
-            
-            # 使用Pipeline进行预测
-            print("Making prediction...")
-            prediction = self.pipeline.predict([features])[0]
-            confidence = max(self.pipeline.predict_proba([features])[0])
-            
-            # 获取类别名称
-            category = self.LABELS_TO_CATEGORY.get(prediction, 'unknown')
-            
-            result = {
-                'category': category,
-                'confidence': float(confidence)
-            }
-            print(f"Classification result: {result}")
-            
+            # 单张图片读取或解码失败时抛出原始异常
+            data = self.read_bytes(image_file)
+            key = content_hash(data)
+            vector = self.feature_store.get_many([key]).get(key) if self.feature_store else None
+            if vector is None:
+                vector = self.extract_features([self.decode_image(data)], batch_size=1)[0]
+                if self.feature_store is not None:
+                    self.feature_store.set_many({key: vector})
+
+            result = self.classify_features(vector.reshape(1, -1))[0]
+            result['image_hash'] = key
+            logger.debug("Classified %s: %s", getattr(image_file, 'name', image_file), result)
+
             return result
-            
+
         except Exception as e:
-            print(f"Classification error: {str(e)}")
-            print(f"Error type: {type(e).__name__}")
-            print(f"Error details: {str(e)}")
-            raise e 
\ No newline at end of file
+            logger.error("Classification error: %s: %s", type(e).__name__, e)
+            raise e
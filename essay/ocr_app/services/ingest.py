@@ -0,0 +1,320 @@
+"""
+基于数据库的上传处理队列。
+
+上传请求只保存文件并为每对（衣物图片, 标签图片）创建一个 IngestJob，
+分类和OCR由 ``manage.py run_ingest_workers`` 在后台批量完成。
+"""
+import logging
+import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import ClothingImage, IngestBatch, IngestJob
+from .engine_registry import classifier_backend, get_classifier_registry, ocr_backend
+from .feature_store import content_hash
+from .label_ocr import process_label_images
+from .metrics import INGEST_JOBS
+from .thumbnails import render_thumbnails, save_thumbnails
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DIR = 'ingest_queue'
+
+
+def enqueue_batch(pairs):
+    """保存上传的文件并为每一对图片创建一个任务，返回 IngestBatch"""
+    with transaction.atomic():
+        batch = IngestBatch.objects.create()
+        jobs = []
+        for position, (clothing_image, label_image) in enumerate(pairs):
+            prefix = f'{QUEUE_DIR}/{batch.id}/{position}'
+            clothing_name = os.path.basename(clothing_image.name)
+            label_name = os.path.basename(label_image.name)
+            jobs.append(IngestJob(
+                batch=batch,
+                position=position,
+                clothing_file=default_storage.save(f'{prefix}_clothing_{clothing_name}', clothing_image),
+                label_file=default_storage.save(f'{prefix}_label_{label_name}', label_image),
+                clothing_name=clothing_name,
+                label_name=label_name,
+            ))
+        IngestJob.objects.bulk_create(jobs)
+    logger.info("Queued ingest batch %s with %d jobs", batch.id, len(jobs))
+    return batch
+
+
+def worker_id(index=0):
+    return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+
+def claim_jobs(worker, limit, batch=None):
+    """领取最多 limit 个等待中的任务。
+
+    用带 status='pending' 条件的 UPDATE 领取，多个worker同时领取同一任务时只有一个能成功。"""
+    pending = IngestJob.objects.filter(status=IngestJob.STATUS_PENDING)
+    if batch is not None:
+        pending = pending.filter(batch=batch)
+    ids = list(pending.order_by('id').values_list('id', flat=True)[:limit])
+    if not ids:
+        return []
+    IngestJob.objects.filter(id__in=ids, status=IngestJob.STATUS_PENDING).update(
+        status=IngestJob.STATUS_RUNNING,
+        worker=worker,
+        started_at=timezone.now(),
+        attempts=F('attempts') + 1,
+    )
+    return list(IngestJob.objects.filter(id__in=ids, status=IngestJob.STATUS_RUNNING, worker=worker))
+
+
+def requeue_stale_jobs(timeout=None):
+    """worker中途退出时，超时未完成的任务重新排队；超过最大尝试次数的标记为失败"""
+    if timeout is None:
+        timeout = getattr(settings, 'INGEST_JOB_TIMEOUT', 600)
+    max_attempts = getattr(settings, 'INGEST_MAX_ATTEMPTS', 3)
+    stale = IngestJob.objects.filter(
+        status=IngestJob.STATUS_RUNNING,
+        started_at__lt=timezone.now() - timedelta(seconds=timeout),
+    )
+    failed = _fail_exhausted(stale, max_attempts, 'Timed out')
+    requeued = stale.update(status=IngestJob.STATUS_PENDING, worker='')
+    if failed or requeued:
+        logger.warning("Requeued %d stale ingest jobs, failed %d", requeued, failed)
+    return requeued
+
+
+def _finish(job, status, error='', clothing=None):
+    IngestJob.objects.filter(id=job.id).update(
+        status=status, error=error, clothing=clothing, finished_at=timezone.now()
+    )
+    INGEST_JOBS.inc(status=status)
+    for name in (job.clothing_file, job.label_file):
+        try:
+            default_storage.delete(name)
+        except Exception as e:
+            logger.warning("Could not remove queued file %s: %s", name, e)
+
+
+def _fail_exhausted(running, max_attempts, error):
+    """超过最大尝试次数的任务标记为失败，和正常结束的任务一样删除队列文件、计入指标"""
+    exhausted = list(running.filter(attempts__gte=max_attempts))
+    for job in exhausted:
+        _finish(job, IngestJob.STATUS_FAILED, error=error)
+    return len(exhausted)
+
+
+def _release(jobs, error):
+    """整批处理出错（例如模型加载失败）时放回队列，超过最大尝试次数的标记为失败"""
+    max_attempts = getattr(settings, 'INGEST_MAX_ATTEMPTS', 3)
+    ids = [job.id for job in jobs]
+    running = IngestJob.objects.filter(id__in=ids, status=IngestJob.STATUS_RUNNING)
+    _fail_exhausted(running, max_attempts, error)
+    running.update(status=IngestJob.STATUS_PENDING, worker='', error=error)
+
+
+def prepare_jobs(jobs):
+    """读取队列文件并预先解码（分类器输入和OCR输入），不需要模型，可以和上一批的推理同时进行"""
+    classifier_class = classifier_backend()
+    ocr_class = ocr_backend()
+    prepared = []
+    for job in jobs:
+        item = {'job': job}
+        try:
+            with default_storage.open(job.clothing_file, 'rb') as f:
+                item['clothing_data'] = f.read()
+            with default_storage.open(job.label_file, 'rb') as f:
+                item['label_data'] = f.read()
+        except Exception as e:
+            item['error'] = f"Could not read queued files: {e}"
+            prepared.append(item)
+            continue
+
+        item['clothing_hash'] = content_hash(item['clothing_data'])
+        # 解码失败时留给推理阶段按原始内容再处理一次，错误在那里记录
+        try:
+            item['clothing_array'] = classifier_class.decode_image(item['clothing_data'])
+        except Exception:
+            item['clothing_array'] = None
+        try:
+            item['label_array'] = ocr_class.load_image(item['label_data'])
+        except Exception:
+            item['label_array'] = None
+        # 缩略图也在这里生成；失败时页面显示原图，之后可以用 generate_thumbnails 命令补上
+        item['thumbnails'] = {}
+        for field_name, data in (('image', item['clothing_data']), ('label_image', item['label_data'])):
+            try:
+                item['thumbnails'][field_name] = render_thumbnails(data)
+            except Exception as e:
+                logger.warning("Could not create thumbnails for job %s: %s", job.id, e)
+        prepared.append(item)
+    return prepared
+
+
+def _classify(items, in_pool=False):
+    try:
+        with get_classifier_registry().acquire() as classifier:
+            return classifier.classify_images(
+                [ContentFile(item['clothing_data'], name=item['job'].clothing_name) for item in items],
+                hashes=[item['clothing_hash'] for item in items],
+                decoded=[item['clothing_array'] for item in items],
+            )
+    finally:
+        if in_pool:
+            # 线程池线程中查询特征库时打开的数据库连接
+            connection.close()
+
+
+def _recognize_labels(label_inputs):
+    """按 OCR_BATCH_SIZE 分块批量识别，限制一次送进OCR引擎的标签数（和内存占用）"""
+    size = max(1, getattr(settings, 'OCR_BATCH_SIZE', 16))
+    labels = []
+    for start in range(0, len(label_inputs), size):
+        labels.extend(process_label_images(label_inputs[start:start + size]))
+    return labels
+
+
+def process_jobs(jobs, prepared=None, executor=None):
+    """分类和OCR同时进行（分类在线程池中，OCR在当前线程），然后逐个保存 ClothingImage"""
+    if prepared is None:
+        prepared = prepare_jobs(jobs)
+
+    for item in prepared:
+        if 'error' in item:
+            _finish(item['job'], IngestJob.STATUS_FAILED, error=item['error'])
+    items = [item for item in prepared if 'error' not in item]
+    if not items:
+        return
+
+    # 预先解码失败的标签交给OCR按原始内容处理，错误在那里记录
+    label_inputs = [
+        item['label_array'] if item['label_array'] is not None
+        else ContentFile(item['label_data'], name=item['job'].label_name)
+        for item in items
+    ]
+    try:
+        if executor is not None:
+            # TensorFlow 和 Paddle/OpenCV 的推理都会释放GIL，两个阶段可以真正并行
+            classified = executor.submit(_classify, items, True)
+            labels = _recognize_labels(label_inputs)
+            categories = classified.result()
+        else:
+            categories = _classify(items)
+            labels = _recognize_labels(label_inputs)
+    except Exception as e:
+        logger.exception("Ingest batch of %d jobs failed", len(items))
+        _release([item['job'] for item in items], f"{type(e).__name__}: {e}")
+        return
+
+    for item, category, label in zip(items, categories, labels):
+        job = item['job']
+        try:
+            if category is None:
+                raise ValueError(f"Could not classify {job.clothing_name}")
+
+            clothing = ClothingImage(
+                category=category['category'],
+                classification_confidence=category['confidence'],
+                image_hash=category['image_hash'],
+            )
+            clothing.image.save(job.clothing_name, ContentFile(item['clothing_data']), save=False)
+            clothing.label_image.save(job.label_name, ContentFile(item['label_data']), save=False)
+            if label:
+                clothing.recognized_text = " ".join(label.get('recognized_texts', []))
+                clothing.materials = label.get('materials', [])
+            else:
+                # OCR失败时仍然保存，用户可以手动输入标签文字
+                clothing.recognized_text = ""
+                clothing.materials = []
+            save_thumbnails(clothing, item.get('thumbnails', {}))
+            clothing.save()
+        except Exception as e:
+            logger.exception("Ingest job %s failed", job.id)
+            _finish(job, IngestJob.STATUS_FAILED, error=str(e))
+            continue
+        _finish(job, IngestJob.STATUS_DONE, clothing=clothing)
+
+
+def run_pending_jobs(batch=None, batch_size=None, worker=None, pipeline_workers=None):
+    """在当前线程中处理队列直到没有等待中的任务，返回处理的任务数。
+
+    当前批次推理时，下一批已经在线程池中读取和解码。整批出错（后端配置错误、数据库错误等）时
+    把当前批和已经领取的下一批放回队列并返回，不抛出异常。"""
+    if batch_size is None:
+        batch_size = getattr(settings, 'INGEST_BATCH_SIZE', 8)
+    if pipeline_workers is None:
+        pipeline_workers = getattr(settings, 'INGEST_PIPELINE_WORKERS', 2)
+    worker = worker or worker_id()
+
+    processed = 0
+    jobs = claim_jobs(worker, batch_size, batch=batch)
+    if not jobs:
+        return processed
+    with ThreadPoolExecutor(max_workers=max(1, pipeline_workers),
+                            thread_name_prefix='ingest-pipeline') as executor:
+        prepared = executor.submit(prepare_jobs, jobs)
+        while jobs:
+            next_jobs = []
+            try:
+                next_jobs = claim_jobs(worker, batch_size, batch=batch)
+                next_prepared = executor.submit(prepare_jobs, next_jobs) if next_jobs else None
+                process_jobs(jobs, prepared.result(), executor=executor)
+            except Exception as e:
+                logger.exception("Ingest batch of %d jobs failed", len(jobs))
+                _release(jobs + next_jobs, f"{type(e).__name__}: {e}")
+                break
+            processed += len(jobs)
+            jobs, prepared = next_jobs, next_prepared
+    return processed
+
+
+def run_worker(index, batch_size, poll_interval, stop_event, drain=False):
+    """worker线程的主循环：领取一批任务、处理、没有任务时等待 poll_interval 秒"""
+    worker = worker_id(index)
+    logger.info("Ingest worker %s started", worker)
+    try:
+        while not stop_event.is_set():
+            close_old_connections()
+            try:
+                processed = run_pending_jobs(batch_size=batch_size, worker=worker)
+            except Exception:
+                # 例如领取任务或放回队列时数据库不可用：等下一次轮询，worker线程不能退出
+                logger.exception("Ingest worker %s failed", worker)
+                processed = 0
+            if processed:
+                logger.info("Ingest worker %s processed %d jobs", worker, processed)
+            elif drain:
+                break
+            stop_event.wait(poll_interval)
+    finally:
+        connection.close()
+        logger.info("Ingest worker %s stopped", worker)
+
+
+def batch_status(batch_id):
+    """批次中每个任务的状态，供上传页面轮询；批次不存在时返回None"""
+    if not IngestBatch.objects.filter(id=batch_id).exists():
+        return None
+    items = list(
+        IngestJob.objects.filter(batch_id=batch_id).order_by('position').values(
+            'position', 'clothing_name', 'label_name', 'status', 'attempts', 'error',
+            'clothing_id', 'clothing__category',
+        )
+    )
+    counts = {status: 0 for status, _ in IngestJob.STATUS_CHOICES}
+    for item in items:
+        counts[item['status']] += 1
+        item['category'] = item.pop('clothing__category')
+    return {
+        'batch_id': batch_id,
+        'total': len(items),
+        'counts': counts,
+        'finished': counts[IngestJob.STATUS_PENDING] == 0 and counts[IngestJob.STATUS_RUNNING] == 0,
+        'items': items,
+    }
@@ -0,0 +1,115 @@
+"""标签图片OCR：查询OCR缓存，未命中的标签交给本进程共享的OCR引擎，结果整理为文本和材料列表"""
+import logging
+
+from .engine_registry import get_ocr_registry, ocr_backend
+from .metrics import OCR_IMAGES
+from .ocr_cache import get_ocr_cache
+
+logger = logging.getLogger(__name__)
+
+
+def process_label_images(label_images):
+    """Process several label images with one batched OCR pass, results in input order.
+
+    Items may also be arrays already decoded with the OCR backend's load_image."""
+    label_results = [None] * len(label_images)
+    try:
+        # 逐张解码并计算缓存键，只有未命中的标签进入批量OCR
+        backend = ocr_backend()
+        keys = {}
+        arrays = {}
+        for index, label_image in enumerate(label_images):
+            try:
+                arrays[index] = backend.load_image(label_image)
+                keys[index] = backend.cache_key(arrays[index])
+            except Exception as e:
+                logger.warning("Error decoding label image %s: %s", _name(label_image, index), e)
+        
+        cached = get_ocr_cache().get_many(keys.values())
+        misses = []
+        for index, key in keys.items():
+            if key in cached:
+                label_results[index] = cached[key]
+                arrays.pop(index)
+            else:
+                misses.append(index)
+        logger.debug("Batch of %d label images, OCR cache: %d hits, %d misses",
+                     len(label_images), len(keys) - len(misses), len(misses))
+        
+        if not misses:
+            return label_results
+        
+        with get_ocr_registry().acquire() as ocr_processor:
+            results = ocr_processor.process_images([arrays.pop(index) for index in misses])
+            
+            for index, result in zip(misses, results):
+                try:
+                    label_results[index] = _build_label_result(ocr_processor, result)
+                    _store_label_result(keys[index], result, label_results[index])
+                    OCR_IMAGES.inc(result='success' if label_results[index] else 'empty')
+                except Exception as e:
+                    OCR_IMAGES.inc(result='error')
+                    logger.warning("Error processing label image %s: %s", _name(label_images[index], index), e)
+        return label_results
+            
+    except Exception as e:
+        logger.exception("Error processing label images")
+        return label_results
+
+
+def _name(label_image, index):
+    return getattr(label_image, 'name', f'#{index + 1}')
+
+
+def _store_label_result(cache_key, result, label_result):
+    """只缓存成功的识别结果"""
+    if not label_result:
+        return
+    try:
+        get_ocr_cache().set(
+            cache_key,
+            detected_texts=result.get('detected_texts', []),
+            recognized_texts=label_result['recognized_texts'],
+            materials=label_result['materials'],
+        )
+    except Exception as e:
+        logger.warning("Failed to store OCR cache entry: %s", e)
+
+
+def _build_label_result(ocr_processor, result):
+    """把OCR结果整理成保存用的文本和材料列表"""
+    if result and result.get('status') == 'success':
+        # 提取识别的文本
+        recognized_texts = [text_info['text'] for text_info in result.get('detected_texts', [])]
+        
+        # 从文本中提取材料信息
+        materials = []
+        
+        # 首先尝试从OCR结果的materials字段获取材料信息
+        if 'materials' in result:
+            for material_data in result['materials']:
+                if isinstance(material_data, dict):
+                    material_name = material_data.get('material', '')
+                    if material_name and material_name not in materials:
+                        materials.append(material_name)
+        
+        # 如果OCR结果中没有足够的材料信息，从recognized_text中提取
+        full_text = " ".join(recognized_texts)
+        # 使用同一个OCR引擎的extract_material_and_percentage方法提取材料
+        extracted_materials = ocr_processor.extract_material_and_percentage(full_text)
+        
+        # 合并提取到的材料
+        for material in extracted_materials:
+            if material not in materials:
+                materials.append(material)
+        
+        logger.debug("Label texts=%s materials=%s", recognized_texts, materials)
+        
+        return {
+            'recognized_texts': recognized_texts,
+            'materials': materials
+        }
+    else:
+        logger.debug("No text recognized in the label image: %s",
+                     result.get('message') if result else result)
+        return None
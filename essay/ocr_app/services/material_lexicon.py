@@ -0,0 +1,100 @@
+"""
+Material lexicon shared by the OCR processor and the recommender.
+
+Loaded once from ``ocr_app/data/material_lexicon.json`` at import time; all
+indexes below are read-only and safe to share between threads and requests.
+"""
+import json
+import os
+from types import MappingProxyType
+
+LEXICON_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'material_lexicon.json'
+)
+
+LANGUAGES = ('chinese', 'japanese', 'english')
+
+
+def _freeze(value):
+    """递归转换为只读结构：dict -> MappingProxyType, list -> tuple"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _build_indexes(data):
+    translations = {}
+    properties = {}
+    surface_to_canonical = {}
+    surface_forms = {}
+    language_index = {language: {} for language in LANGUAGES}
+
+    for canonical, entry in data['materials'].items():
+        translations[canonical] = entry.get('translations', {})
+        if 'properties' in entry:
+            properties[canonical] = entry['properties']
+
+        # 标准名称本身总能解析到自己
+        language_index['english'].setdefault(canonical, canonical)
+
+        for language, surfaces in entry.get('translations', {}).items():
+            index = language_index.setdefault(language, {})
+            for surface in surfaces:
+                key = surface.lower()
+                # 同一表记出现在多个材料中时以文件中先出现的为准
+                index.setdefault(key, canonical)
+                surface_to_canonical.setdefault(key, canonical)
+                surface_forms.setdefault(key, surface)
+
+        # OCR常见误识别，例如"錦" -> "綿"
+        for alias, target in entry.get('ocr_aliases', {}).items():
+            surface_to_canonical.setdefault(alias.lower(), canonical)
+            surface_forms.setdefault(alias.lower(), target)
+
+    return {
+        'translations': _freeze(translations),
+        'properties': _freeze(properties),
+        'surface_to_canonical': MappingProxyType(surface_to_canonical),
+        'surface_forms': MappingProxyType(surface_forms),
+        'language_index': MappingProxyType(
+            {language: MappingProxyType(index) for language, index in language_index.items()}
+        ),
+    }
+
+
+with open(LEXICON_PATH, encoding='utf-8') as _f:
+    _data = json.load(_f)
+
+VERSION = _data.get('version', 1)
+_indexes = _build_indexes(_data)
+
+# 标准英文名称 -> {语言: (表记, ...)}
+TRANSLATIONS = _indexes['translations']
+# 标准英文名称 -> 材料属性（温湿度范围、适合天气等）
+PROPERTIES = _indexes['properties']
+# 小写表记（任意语言） -> 标准英文名称
+SURFACE_TO_CANONICAL = _indexes['surface_to_canonical']
+# 小写表记 -> 展示用表记（保持标签上的原始写法，误识别别名映射到正确写法）
+SURFACE_FORMS = _indexes['surface_forms']
+# 语言 -> {小写表记 -> 标准英文名称}
+LANGUAGE_INDEX = _indexes['language_index']
+
+del _data, _indexes
+
+
+def canonical_name(material, language=None):
+    """把任意语言的材料名称转换为标准英文名称，未知材料返回None"""
+    if not material:
+        return None
+    key = material.lower().strip()
+    if language is None:
+        return SURFACE_TO_CANONICAL.get(key)
+    return LANGUAGE_INDEX.get(language, {}).get(key)
+
+
+def material_properties(material, language=None):
+    """材料属性，未知材料返回None"""
+    canonical = canonical_name(material, language)
+    return PROPERTIES.get(canonical) if canonical else None
@@ -0,0 +1,91 @@
+import re
+
+import numpy as np
+from rapidfuzz import process, fuzz
+
+# 分词规则：英文单词、片假名、平假名、汉字，以及常见材料名称
+WORD_PATTERN = re.compile(
+    r'[a-zA-Z]+|[ァ-ンー]+|[ぁ-ん]+|[一-龥]+|(?:[ァ-ンー]+[a-zA-Z]*)+|[ポナアレウシ][ァ-ンー]+'
+    r'|レーヨン|ポリエステル|ナイロン|ウール|シルク|コットン'
+)
+SEPARATOR_PATTERN = re.compile(r'[\s\-・.。,、／]')
+PERCENTAGE_PATTERN = re.compile(r'\d+[%％]')
+
+
+class MaterialMatcher:
+    """预编译的材料名称匹配器。
+
+    所有表记（小写）在构建时放入哈希表做整词精确匹配；精确匹配失败的词
+    合并成一次 rapidfuzz.process.cdist 调用做模糊匹配，而不是逐词扫描字典。
+    """
+
+    def __init__(self, forms, threshold=70):
+        # forms: {小写表记: 匹配成功时返回的名称}
+        self.forms = dict(forms)
+        self.choices = list(self.forms)
+        self.threshold = threshold
+
+    def _fuzzy(self, queries):
+        """对所有查询词一次性计算相似度矩阵，返回每个词的最佳候选和分数"""
+        if not queries or not self.choices:
+            return [(None, 0.0)] * len(queries)
+        scores = process.cdist(queries, self.choices, scorer=fuzz.ratio, dtype=np.float64)
+        best = scores.argmax(axis=1)
+        return [(self.choices[j], float(scores[i, j])) for i, j in enumerate(best)]
+
+    def tokenize(self, text):
+        """按原有规则切分文本，合并相邻的材料名称片段，并去掉分隔符和百分比"""
+        words = WORD_PATTERN.findall(text)
+
+        # 对分割后的单词进行合并检查
+        i = 0
+        while i < len(words) - 1:
+            combined = words[i] + words[i + 1]
+            if combined.lower() in self.forms:
+                words[i] = combined
+                words.pop(i + 1)
+            else:
+                i += 1
+
+        tokens = []
+        for word in words:
+            word = SEPARATOR_PATTERN.sub('', word)
+            word = PERCENTAGE_PATTERN.sub('', word)
+            tokens.append(word.lower())
+        return tokens
+
+    def match_tokens(self, tokens):
+        """批量匹配：先查哈希表，剩余的词一起做一次模糊匹配。返回与输入等长的名称列表（未匹配为None）"""
+        matched = [self.forms.get(token) for token in tokens]
+        misses = [i for i, material in enumerate(matched) if material is None]
+        for i, (choice, score) in zip(misses, self._fuzzy([tokens[i] for i in misses])):
+            if choice is not None and score >= self.threshold:
+                matched[i] = self.forms[choice]
+        return matched
+
+    def extract(self, text):
+        """从一段文本中提取材料名称，按出现顺序去重"""
+        materials_found = []
+        for material in self.match_tokens(self.tokenize(text)):
+            if material and material not in materials_found:
+                materials_found.append(material)
+        return materials_found
+
+    def match_lines(self, lines):
+        """判断多行（已标准化、小写的）文本是否为材料名称，返回 [(is_material, name), ...]。
+
+        模糊匹配失败时，再检查文本与材料名称是否互相包含且长度接近"""
+        results = []
+        for line, (choice, score) in zip(lines, self._fuzzy(list(lines))):
+            if choice is not None and score >= self.threshold:
+                results.append((True, self.forms[choice]))
+                continue
+            for material_name, normalized in self.forms.items():
+                # 只有当文本长度接近材料名称长度时才考虑包含关系
+                if (material_name in line or line in material_name) and \
+                   abs(len(line) - len(material_name)) <= 2:
+                    results.append((True, normalized))
+                    break
+            else:
+                results.append((False, None))
+        return results
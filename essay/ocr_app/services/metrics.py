@@ -0,0 +1,340 @@
+"""
+进程内的计数器/仪表，以 Prometheus 文本格式输出（/metrics/）。
+
+阶段耗时直方图来自 ``timing`` 模块（``clothing_stage_duration_seconds{stage=...}``）。
+设置 ``METRICS_MULTIPROCESS_DIR`` 后，每个worker进程定期把自己的快照写成该目录下的
+JSON 文件，/metrics/ 汇总目录中所有进程的数据：计数器和直方图求和。已经退出的进程的快照
+在汇总时删除，它的计数不再计入（与单进程重启后计数器归零相同）。
+"""
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+from . import timing
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, registry, name, help_text, labelnames=()):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        with self.registry.lock:
+            values = self.registry.values[self.name]
+            values[key] = values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.registry.values[self.name][key] = value
+
+
+class MetricsRegistry:
+    """线程安全的指标注册表；collector 在输出前调用，用来刷新仪表（例如模型是否已加载）"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.values = {}
+        self.collectors = []
+
+    def _register(self, metric):
+        with self.lock:
+            self.metrics[metric.name] = metric
+            self.values.setdefault(metric.name, {})
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(self, name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._register(Gauge(self, name, help_text, labelnames))
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def snapshot(self):
+        """本进程的所有指标值（可JSON序列化）"""
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception:
+                logger.exception("Metrics collector %r failed", collector)
+        with self.lock:
+            values = {
+                name: [[list(key), value] for key, value in samples.items()]
+                for name, samples in self.values.items()
+            }
+        return {
+            'pid': os.getpid(),
+            'time': time.time(),
+            'values': values,
+            'histograms': timing.histogram_snapshot(),
+        }
+
+
+REGISTRY = MetricsRegistry()
+
+OCR_IMAGES = REGISTRY.counter(
+    'clothing_ocr_images_total', 'Label images run through the OCR engine', ['result'])
+CLASSIFIED_IMAGES = REGISTRY.counter(
+    'clothing_classified_images_total', 'Clothing images classified, by where the features came from',
+    ['features'])
+MODEL_LOADS = REGISTRY.counter(
+    'clothing_model_loads_total', 'Model instances loaded by the engine pools', ['model', 'result'])
+MODEL_LOADED = REGISTRY.gauge(
+    'clothing_model_instances_loaded', 'Model instances currently loaded', ['model'])
+WEATHER_REQUESTS = REGISTRY.counter(
+    'clothing_weather_requests_total', 'Weather API requests', ['result'])
+CACHE_LOOKUPS = REGISTRY.counter(
+    'clothing_cache_lookups_total', 'Cache lookups', ['cache', 'result'])
+INGEST_JOBS = REGISTRY.counter(
+    'clothing_ingest_jobs_total', 'Ingest jobs finished', ['status'])
+
+
+def _collect_model_pools():
+    from .engine_registry import engine_stats
+
+    for name, stats in engine_stats().items():
+        MODEL_LOADED.set(stats['loaded'], model=name)
+
+
+REGISTRY.add_collector(_collect_model_pools)
+
+
+# ---- 多进程汇总 ----
+
+_flusher = None
+_flusher_pid = None
+_flusher_lock = threading.Lock()
+# 快照文件名中的进程标识；pid 可能被复用，加上随机后缀避免覆盖已退出进程的计数
+_process_token = uuid.uuid4().hex[:8]
+
+
+def _reset_after_fork():
+    """fork出的子进程从零开始计数，否则父进程已有的计数会被重复汇总"""
+    global _flusher, _flusher_pid, _process_token
+    REGISTRY.lock = threading.Lock()
+    for samples in REGISTRY.values.values():
+        samples.clear()
+    timing.reset_after_fork()
+    _flusher = None
+    _flusher_pid = None
+    _process_token = uuid.uuid4().hex[:8]
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def multiprocess_dir():
+    return getattr(settings, 'METRICS_MULTIPROCESS_DIR', '') or None
+
+
+def _snapshot_path(directory):
+    return os.path.join(directory, f'{os.getpid()}-{_process_token}.json')
+
+
+def write_snapshot(directory=None):
+    """把本进程的快照原子地写入共享目录"""
+    directory = directory or multiprocess_dir()
+    if not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    path = _snapshot_path(directory)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(REGISTRY.snapshot(), f)
+    os.replace(tmp_path, path)
+    return path
+
+
+def start_flusher():
+    """多进程模式下启动后台线程定期写快照；每个进程只启动一次"""
+    global _flusher, _flusher_pid
+    if _flusher_pid == os.getpid():
+        return _flusher
+    directory = multiprocess_dir()
+    if not directory:
+        return None
+    with _flusher_lock:
+        if _flusher_pid == os.getpid():
+            return _flusher
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 2.0)
+
+        def flush_forever():
+            while True:
+                time.sleep(interval)
+                try:
+                    write_snapshot(directory)
+                except Exception:
+                    logger.exception("Could not write metrics snapshot")
+
+        _flusher = threading.Thread(target=flush_forever, name='metrics-flusher', daemon=True)
+        _flusher.start()
+        _flusher_pid = os.getpid()
+        return _flusher
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def remove_dead_snapshots(directory):
+    """删除已经退出的进程留下的快照（文件名以进程号开头），返回删除的文件数"""
+    removed = 0
+    for path in glob.glob(os.path.join(directory, '*.json*')):
+        pid = os.path.basename(path).split('-', 1)[0]
+        if not pid.isdigit() or int(pid) == os.getpid() or _pid_alive(int(pid)):
+            continue
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            # 另一个进程同时在汇总
+            pass
+    if removed:
+        logger.info("Removed %d metrics snapshots of exited processes", removed)
+    return removed
+
+
+def load_snapshots(directory):
+    snapshots = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+        try:
+            with open(path, encoding='utf-8') as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            logger.warning("Skipping unreadable metrics snapshot %s", path)
+    return snapshots
+
+
+def aggregate(snapshots):
+    """计数器和直方图对所有进程求和；仪表只对仍在运行的进程求和"""
+    values = {}
+    histograms = {}
+    for snapshot in snapshots:
+        alive = snapshot['pid'] == os.getpid() or _pid_alive(snapshot['pid'])
+        for name, samples in snapshot['values'].items():
+            metric = REGISTRY.metrics.get(name)
+            if metric is None or (metric.kind == 'gauge' and not alive):
+                continue
+            merged = values.setdefault(name, {})
+            for key, value in samples:
+                merged[tuple(key)] = merged.get(tuple(key), 0) + value
+        for stage, data in snapshot['histograms'].items():
+            merged = histograms.setdefault(stage, {'counts': [0] * len(data['counts']), 'sum_ms': 0.0, 'count': 0})
+            merged['counts'] = [a + b for a, b in zip(merged['counts'], data['counts'])]
+            merged['sum_ms'] += data['sum_ms']
+            merged['count'] += data['count']
+    return values, histograms
+
+
+# ---- 文本格式 ----
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _queue_depth():
+    """队列深度直接从数据库读取（所有进程共享，不需要汇总）"""
+    from django.db.models import Count
+    from ..models import IngestJob
+
+    counts = {status: 0 for status, _ in IngestJob.STATUS_CHOICES
+              if status in (IngestJob.STATUS_PENDING, IngestJob.STATUS_RUNNING)}
+    rows = (IngestJob.objects.filter(status__in=list(counts))
+            .values('status').annotate(n=Count('id')).values_list('status', 'n'))
+    counts.update(dict(rows))
+    return counts
+
+
+def render():
+    """Prometheus 文本格式的全部指标"""
+    directory = multiprocess_dir()
+    if directory:
+        write_snapshot(directory)
+        remove_dead_snapshots(directory)
+        values, histograms = aggregate(load_snapshots(directory))
+    else:
+        values, histograms = aggregate([REGISTRY.snapshot()])
+
+    lines = []
+    for name, metric in REGISTRY.metrics.items():
+        lines.append(f'# HELP {name} {metric.help}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for key, value in sorted(values.get(name, {}).items()):
+            lines.append(f'{name}{_labels(metric.labelnames, key)} {_number(value)}')
+
+    name = 'clothing_stage_duration_seconds'
+    lines.append(f'# HELP {name} Time spent in each processing stage')
+    lines.append(f'# TYPE {name} histogram')
+    for stage, data in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(timing.BUCKETS_MS, data['counts']):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else _number(bound / 1000)
+            lines.append(f'{name}_bucket{_labels(("stage", "le"), (stage, le))} {cumulative}')
+        lines.append(f'{name}_sum{_labels(("stage",), (stage,))} {_number(data["sum_ms"] / 1000)}')
+        lines.append(f'{name}_count{_labels(("stage",), (stage,))} {data["count"]}')
+
+    name = 'clothing_ingest_queue_jobs'
+    lines.append(f'# HELP {name} Ingest jobs waiting or running')
+    lines.append(f'# TYPE {name} gauge')
+    try:
+        for status, count in sorted(_queue_depth().items()):
+            lines.append(f'{name}{_labels(("status",), (status,))} {count}')
+    except Exception:
+        logger.exception("Could not read ingest queue depth")
+
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,113 @@
+import threading
+import logging
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import OCRResultCache
+from .metrics import CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+
+class OCRCache:
+    """基于数据库的OCR结果缓存，按最近使用时间做容量淘汰（LRU）"""
+
+    def __init__(self, max_entries=None):
+        if max_entries is None:
+            max_entries = getattr(settings, 'OCR_CACHE_MAX_ENTRIES', 5000)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _record(self, hits=0, misses=0):
+        with self._lock:
+            self._hits += hits
+            self._misses += misses
+        if hits:
+            CACHE_LOOKUPS.inc(hits, cache='ocr', result='hit')
+        if misses:
+            CACHE_LOOKUPS.inc(misses, cache='ocr', result='miss')
+
+    @staticmethod
+    def _to_result(entry):
+        return {
+            'detected_texts': entry.detected_texts,
+            'recognized_texts': entry.recognized_texts,
+            'materials': entry.materials,
+            'cached': True,
+        }
+
+    def get(self, key):
+        """命中时返回缓存的结果并刷新最近使用时间，未命中返回None"""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys):
+        """一次查询取回多个键，返回 {key: result}"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        entries = OCRResultCache.objects.filter(key__in=keys)
+        found = {entry.key: self._to_result(entry) for entry in entries}
+        if found:
+            OCRResultCache.objects.filter(key__in=list(found)).update(
+                hits=F('hits') + 1, last_used=timezone.now()
+            )
+
+        self._record(hits=len(found), misses=len(keys) - len(found))
+        logger.debug("OCR cache lookup: %d hit, %d miss", len(found), len(keys) - len(found))
+        return found
+
+    def set(self, key, detected_texts, recognized_texts, materials):
+        OCRResultCache.objects.update_or_create(
+            key=key,
+            defaults={
+                'detected_texts': detected_texts,
+                'recognized_texts': recognized_texts,
+                'materials': materials,
+                'last_used': timezone.now(),
+            },
+        )
+        self.evict()
+
+    def evict(self):
+        """超出容量时删除最久未使用的条目"""
+        excess = OCRResultCache.objects.count() - self.max_entries
+        if excess <= 0:
+            return 0
+        stale_ids = list(
+            OCRResultCache.objects.order_by('last_used').values_list('id', flat=True)[:excess]
+        )
+        deleted, _ = OCRResultCache.objects.filter(id__in=stale_ids).delete()
+        with self._lock:
+            self._evictions += deleted
+        return deleted
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 4) if lookups else None,
+                'evictions': self._evictions,
+                'max_entries': self.max_entries,
+            }
+
+
+_ocr_cache = None
+_ocr_cache_lock = threading.Lock()
+
+
+def get_ocr_cache():
+    """当前进程共享的OCR缓存（命中统计按进程累计）"""
+    global _ocr_cache
+    if _ocr_cache is None:
+        with _ocr_cache_lock:
+            if _ocr_cache is None:
+                _ocr_cache = OCRCache()
+    return _ocr_cache
@@ -1,94 +1,68 @@
-from paddleocr import PaddleOCR, draw_ocr
-import cv2
+# PaddleOCR 和 OpenCV 在用到时才导入，导入本模块（例如只用 load_image/cache_key）不会加载它们
 import numpy as np
 from PIL import Image, ImageEnhance, ImageOps, ExifTags
 import io
-import tempfile
+import json
+import hashlib
+import logging
 import unicodedata
 import re
-from rapidfuzz import process, fuzz
-import os
+
+from . import material_lexicon
+from .material_matcher import MaterialMatcher, SEPARATOR_PATTERN, PERCENTAGE_PATTERN
+from .timing import timed
+
+logger = logging.getLogger(__name__)
 
 class OCRProcessor:
+    # 批量模式下多个标签的文本行合在一起识别，批次越大前向次数越少
+    REC_BATCH_NUM = 32
+
+    # 使用最新的PP-OCRv4模型进行初始化
+    OCR_CONFIG = {
+        'use_angle_cls': True,
+        'lang': 'japan',
+        # 使用默认路径，PaddleOCR会自动下载所需模型
+        'use_gpu': False,                # 是否使用GPU
+        'enable_mkldnn': True,           # 启用mkldnn加速
+        'total_process_num': 4,          # 减少处理线程数以提高稳定性
+        'show_log': False,               # 不显示日志
+        # OCR检测参数
+        'det_db_thresh': 0.2,            # 降低文本检测阈值，提高召回率
+        'det_db_box_thresh': 0.2,        # 降低文本框检测阈值
+        'det_db_unclip_ratio': 2.0,      # 增加文本框扩张比例
+        'det_max_batch_num': 10,         # 增加批处理数量
+        'rec_batch_num': REC_BATCH_NUM,  # 批量识别时每次前向的文本行数
+        'cls_batch_num': REC_BATCH_NUM,
+        'rec_max_text_length': 50,       # 增加最大文本长度
+        'drop_score': 0.3                # 降低文本识别分数阈值
+    }
+
+    # 预处理或材料提取逻辑变化时递增，使旧的OCR缓存结果失效
+    PIPELINE_VERSION = 2
+    _fingerprint = None
+
+    # 匹配器在导入时基于共享的材料词典构建一次，所有实例和请求共享（返回标签上的原始表记，不转换为英文）
+    material_matcher = MaterialMatcher(material_lexicon.SURFACE_FORMS)
+    line_matcher = material_matcher
+
     def __init__(self):
-        # 使用最新的PP-OCRv4模型进行初始化
-        self.jp_ocr = PaddleOCR(
-            use_angle_cls=True,
-            lang='japan',
-            # 使用默认路径，PaddleOCR会自动下载所需模型
-            use_gpu=False,                # 是否使用GPU
-            enable_mkldnn=True,           # 启用mkldnn加速
-            total_process_num=4,          # 减少处理线程数以提高稳定性
-            show_log=False,               # 不显示日志
-            # OCR检测参数
-            det_db_thresh=0.2,            # 降低文本检测阈值，提高召回率
-            det_db_box_thresh=0.2,        # 降低文本框检测阈值
-            det_db_unclip_ratio=2.0,      # 增加文本框扩张比例
-            det_max_batch_num=10,         # 增加批处理数量
-            rec_max_text_length=50,       # 增加最大文本长度
-            drop_score=0.3                # 降低文本识别分数阈值
-        )
-
-        # 材料字典 - 添加英文材料名称
-        self.material_mapping = {
-            # 日文材料名称
-            "綿": "cotton",
-            "コットン": "cotton",  # 保持原始形式
-            "ポリエステル": "polyester",
-            "ナイロン": "nylon",
-            "ウール": "wool",
-            "毛": "wool",  # 添加"毛"作为"wool"的同义词
-            "シルク": "silk",
-            "アクリル": "acrylic",
-            "レーヨン": "rayon",
-            "麻": "hemp",
-            "カシミヤ": "cashmere",
-            "ポリウレタン": "polyurethane",
-            "スパンデックス": "spandex",
-            "モダール": "modal",
-            "テンセル": "tencel",
-            "ビスコース": "viscose",
-            "アルパカ": "alpaca",
-            "ラムウール": "lamb wool",
-            "アンゴラ": "angora",
-            "ヘンプ": "hemp",
-            "コーデュロイ": "corduroy",
-            "フリース": "fleece",
-            "デニム": "denim",
-            "エラスタン": "elastane",
-            "ポリエチレン": "polyethylene",
-            "リネン": "linen",
-            "トリアセテート": "triacetate",
-            # 英文材料名称
-            "cotton": "cotton",
-            "polyester": "polyester",
-            "nylon": "nylon",
-            "wool": "wool",
-            "silk": "silk",
-            "acrylic": "acrylic",
-            "rayon": "rayon",
-            "hemp": "hemp",
-            "cashmere": "cashmere",
-            "polyurethane": "polyurethane",
-            "spandex": "spandex",
-            "modal": "modal",
-            "tencel": "tencel",
-            "viscose": "viscose",
-            "alpaca": "alpaca",
-            "lamb wool": "lamb wool",
-            "angora": "angora",
-            "corduroy": "corduroy",
-            "fleece": "fleece",
-            "denim": "denim",
-            "elastane": "elastane",
-            "polyethylene": "polyethylene",
-            "linen": "linen",
-            "triacetate": "triacetate",
-            "錦": "cotton"
-        }
-
-        # 创建所有材料的列表（包括日文和英文）
-        self.material_dict = list(self.material_mapping.keys()) + list(set(self.material_mapping.values()))
+        from paddleocr import PaddleOCR
+
+        self.jp_ocr = PaddleOCR(**self.OCR_CONFIG)
+
+        # 材料字典（小写表记 -> 标准英文名称），与推荐服务共用
+        self.material_mapping = material_lexicon.SURFACE_TO_CANONICAL
+
+    def warmup(self):
+        """用空白图片分别跑一次检测、方向分类和识别，避免第一个真实请求承担初始化开销"""
+        blank = np.full((64, 256, 3), 255, dtype=np.uint8)
+        self.jp_ocr.ocr(blank)
+        line = np.full((32, 160, 3), 255, dtype=np.uint8)
+        if self.jp_ocr.use_angle_cls:
+            self.jp_ocr.text_classifier([line])
+        self.jp_ocr.text_recognizer([line])
+        logger.info("OCR engine warmed up")
 
     def normalize_text(self, text):
         """标准化文本"""
@@ -100,206 +74,263 @@ class OCRProcessor:
     def normalize_material_name(self, text):
         """标准化材料名称"""
         # 移除所有空格、连字符和特殊字符
-        text = re.sub(r'[\s\-・.。,、／]', '', text)
+        text = SEPARATOR_PATTERN.sub('', text)
         # 移除百分比
-        text = re.sub(r'\d+[%％]', '', text)
+        text = PERCENTAGE_PATTERN.sub('', text)
         return text
 
+    @timed('materials.extract')
     def extract_material_and_percentage(self, text):
         """从文本中提取材料名称，使用字典匹配和模糊匹配进行纠正"""
-        print(f"\nExtracting materials from: {text}")
+        # 所有词的精确匹配和模糊匹配由预编译的匹配器一次完成
+        materials_found = self.material_matcher.extract(text)
         
-        # 创建小写的材料映射字典（保持原始形式）
-        lowercase_mapping = {}
-        for k in self.material_mapping.keys():
-            lowercase_mapping[k.lower()] = k  # 保持原始形式，不转换为英文
+        logger.debug("Materials in %r: %s", text, materials_found)
+        return materials_found
+
+    @classmethod
+    def config_fingerprint(cls):
+        """OCR配置、模型版本和预处理版本的摘要，作为缓存键的一部分"""
+        if cls._fingerprint is None:
+            import paddleocr
+            payload = json.dumps({
+                'config': cls.OCR_CONFIG,
+                'paddleocr': getattr(paddleocr, '__version__', 'unknown'),
+                'pipeline': cls.PIPELINE_VERSION,
+                'lexicon': material_lexicon.VERSION,
+            }, sort_keys=True)
+            cls._fingerprint = hashlib.sha256(payload.encode('utf-8')).hexdigest()
+        return cls._fingerprint
+
+    @classmethod
+    def cache_key(cls, img_array):
+        """基于解码后像素内容的缓存键：同一张标签重复上传时命中，与文件名和元数据无关"""
+        img_array = np.ascontiguousarray(img_array)
+        digest = hashlib.blake2b(digest_size=32)
+        digest.update(cls.config_fingerprint().encode('ascii'))
+        digest.update(f"{img_array.shape}:{img_array.dtype}".encode('ascii'))
+        digest.update(memoryview(img_array).cast('B'))
+        return digest.hexdigest()
+
+    @staticmethod
+    @timed('ocr.decode')
+    def load_image(image):
+        """把上传的字节、文件对象、路径或numpy数组解码成RGB数组（整个流程只解码一次）"""
+        if isinstance(image, np.ndarray):
+            img_array = image
+            if img_array.ndim == 3 and img_array.shape[2] == 4:
+                # RGBA数组：与PIL分支一致，合成到白色背景上
+                alpha = img_array[:, :, 3:4].astype(np.float32) / 255.0
+                rgb = img_array[:, :, :3].astype(np.float32)
+                img_array = np.rint(rgb * alpha + 255.0 * (1.0 - alpha)).astype(np.uint8)
+            return img_array
+
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            img = Image.open(io.BytesIO(image))
+        elif hasattr(image, 'read'):
+            data = image.read()
+            # 重置文件指针，上传文件之后还要保存到模型字段
+            if hasattr(image, 'seek'):
+                image.seek(0)
+            img = Image.open(io.BytesIO(data))
+        else:
+            img = Image.open(image)
+
+        # 如果图像是RGBA模式，转换为RGB
+        if img.mode == 'RGBA':
+            # 创建白色背景
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            # 粘贴原图到白色背景上
+            background.paste(img, mask=img.split()[3])  # 使用alpha通道作为mask
+            img = background
+        elif img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        return np.asarray(img)
+
+    @timed('ocr.preprocess')
+    def preprocess_image(self, img_array):
+        """灰度化、反色、去噪和二值化，返回可以直接交给OCR引擎的BGR数组"""
+        import cv2
+
+        if img_array.ndim == 2:
+            gray = img_array
+        else:
+            gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
         
-        materials_found = []
+        # 检测是否为黑底白字
+        mean_brightness = np.mean(gray)
+        logger.debug("Mean brightness: %.1f", mean_brightness)
         
-        # 将文本分成单词，使用更精确的分割规则
-        pattern = r'[a-zA-Z]+|[ァ-ンー]+|[ぁ-ん]+|[一-龥]+|(?:[ァ-ンー]+[a-zA-Z]*)+|[ポナアレウシ][ァ-ンー]+|レーヨン|ポリエステル|ナイロン|ウール|シルク|コットン'
-        words = re.findall(pattern, text)
-        print(f"Split words: {words}")
+        # 如果是深色背景，进行反转
+        if mean_brightness < 128:
+            gray = cv2.bitwise_not(gray)
         
-        # 对分割后的单词进行合并检查
-        i = 0
-        while i < len(words) - 1:
-            combined = words[i] + words[i + 1]
-            # 检查合并后的词是否是材料名
-            if combined.lower() in lowercase_mapping:
-                words[i] = combined
-                words.pop(i + 1)
-            else:
-                i += 1
+        # 使用高斯模糊减少噪声
+        blurred = cv2.GaussianBlur(gray, (3, 3), 0)
         
-        for word in words:
-            # 标准化单词
-            word = re.sub(r'[\s\-・.。,、／]', '', word)
-            word = re.sub(r'\d+[%％]', '', word)
-            word_lower = word.lower()  # 转换为小写进行比较
-            print(f"Processing word: {word} (lowercase: {word_lower})")
-            
-            # 1. 首先尝试精确匹配
-            if word_lower in lowercase_mapping:
-                material = lowercase_mapping[word_lower]  # 使用原始形式
-                if material not in materials_found:
-                    materials_found.append(material)
-                    print(f"Found material (exact match): {material}")
-                continue
-            
-            # 2. 如果没有精确匹配，尝试模糊匹配
-            matches = process.extract(word_lower, lowercase_mapping.keys(), scorer=fuzz.ratio, limit=3)
-            print(f"Fuzzy matches for {word_lower}: {matches}")
-            
-            # 如果最佳匹配的分数超过阈值
-            if matches and matches[0][1] >= 70:  # 降低阈值到70
-                best_match = matches[0][0]  # 获取最佳匹配的材料名
-                material = lowercase_mapping[best_match]  # 获取原始形式
-                if material not in materials_found:
-                    materials_found.append(material)
-                    print(f"Found material (fuzzy match): {word} -> {material} (score: {matches[0][1]})")
+        # 使用Otsu's二值化方法
+        _, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
         
-        print(f"All materials found: {materials_found}")
-        return materials_found
+        # 应用形态学操作来清理噪声
+        kernel = np.ones((2,2), np.uint8)
+        cleaned = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
+        cleaned = cv2.morphologyEx(cleaned, cv2.MORPH_OPEN, kernel)
+        
+        # 再次检查是否需要反转
+        if mean_brightness < 128:
+            cleaned = cv2.bitwise_not(cleaned)
+        
+        # PaddleOCR按cv2.imread的结果处理输入，这里直接给出三通道BGR数组，不再经过临时JPEG文件
+        return cv2.cvtColor(cleaned, cv2.COLOR_GRAY2BGR)
 
-    def process_image(self, image_path):
+    def process_image(self, image):
+        """image 可以是上传文件、原始字节、文件路径或已解码的numpy数组"""
         try:
-            print("\n=== Starting Advanced Japanese OCR Processing ===")
-            print(f"Processing image: {image_path}")
-            
-            # 打开图像
-            img = Image.open(image_path)
-            
-            # 如果图像是RGBA模式，转换为RGB
-            if img.mode == 'RGBA':
-                # 创建白色背景
-                background = Image.new('RGB', img.size, (255, 255, 255))
-                # 粘贴原图到白色背景上
-                background.paste(img, mask=img.split()[3])  # 使用alpha通道作为mask
-                img = background
-            elif img.mode != 'RGB':
-                img = img.convert('RGB')
-            
-            # 转换为numpy数组进行处理
-            img_array = np.array(img)
-            gray = cv2.cvtColor(img_array, cv2.COLOR_RGB2GRAY)
-            
-            # 检测是否为黑底白字
-            mean_brightness = np.mean(gray)
-            print(f"Mean brightness: {mean_brightness}")
-            
-            # 如果是深色背景，进行反转
-            if mean_brightness < 128:
-                print("Dark background detected, inverting image...")
-                gray = cv2.bitwise_not(gray)
-            
-            # 使用高斯模糊减少噪声
-            blurred = cv2.GaussianBlur(gray, (3, 3), 0)
-            
-            # 使用Otsu's二值化方法
-            _, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-            
-            # 应用形态学操作来清理噪声
-            kernel = np.ones((2,2), np.uint8)
-            cleaned = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
-            cleaned = cv2.morphologyEx(cleaned, cv2.MORPH_OPEN, kernel)
+            img_array = self.load_image(image)
+            processed = self.preprocess_image(img_array)
             
-            # 再次检查是否需要反转
-            if mean_brightness < 128:
-                print("Ensuring white text on black background...")
-                cleaned = cv2.bitwise_not(cleaned)
+            # 使用PP-OCRv4进行文本检测和识别（直接传入内存中的数组）
+            with timed('ocr.detect_recognize'):
+                jp_results = self.jp_ocr.ocr(processed)
+            # 原始结果可能很长，只在 DEBUG 级别输出行数
+            logger.debug("OCR detected %d lines in %s", len(jp_results[0] or []) if jp_results else 0,
+                         getattr(image, 'name', type(image).__name__))
             
-            # 转回PIL图像
-            processed_img = Image.fromarray(cleaned)
-            
-            # 使用临时文件
-            temp_path = None
+            return self.build_result(jp_results)
+        
+        except Exception as e:
+            logger.exception("OCR processing error")
+            return {
+                'status': 'error',
+                'message': str(e),
+                'detected_texts': [],
+                'recognized_texts': [],
+                'materials': []
+            }
+
+    def process_images(self, images):
+        """批量OCR：逐张预处理并检测文本框，再把所有标签的文本行合并成大批次做方向分类和识别。
+        返回与输入顺序一致的结果列表，每项格式与 process_image 相同"""
+        # paddleocr 会把自身目录加入 sys.path，批量识别时复用它内部的文本框排序和裁剪函数
+        from tools.infer.predict_system import sorted_boxes
+        from tools.infer.utility import get_rotate_crop_image
+
+        results = [None] * len(images)
+        all_crops = []
+        owners = []
+        boxes_by_image = {}
+
+        for index, image in enumerate(images):
             try:
-                # 创建临时文件
-                temp_file = tempfile.NamedTemporaryFile(suffix='.jpg', delete=False)
-                temp_path = temp_file.name
-                temp_file.close()  # 立即关闭文件
-                
-                # 保存处理后的图像
-                processed_img.save(temp_path, 'JPEG', quality=100)
-                
-                # 使用PP-OCRv4进行文本检测和识别
-                jp_results = self.jp_ocr.ocr(temp_path)
-                print(f"Raw OCR results: {jp_results}")
-                
-                if jp_results:
-                    # 存储识别的文本
-                    detected_texts = []
-                    all_recognized_text = []
-                    materials = []
-                    
-                    for result_group in jp_results:
-                        if isinstance(result_group, list):
-                            for line in result_group:
-                                if isinstance(line, (list, tuple)) and len(line) >= 2:
-                                    text_info = line[1]
-                                    if isinstance(text_info, (list, tuple)) and len(text_info) >= 2:
-                                        text = str(text_info[0])
-                                        confidence = float(text_info[1])
-                                    else:
-                                        text = str(text_info)
-                                        confidence = 0.5
-                                        
-                                    if text.strip():
-                                        text = text.strip()
-                                        all_recognized_text.append(text)
-                                        detected_texts.append({
-                                            'text': text,
-                                            'confidence': confidence
-                                        })
-                                        
-                                        # 检查是否是材料
-                                        is_material, material_name = self.is_potential_material(text)
-                                        if is_material and material_name and material_name not in materials:
-                                            materials.append(material_name)
-                                            print(f"Found material: {material_name} from text: {text}")
-                
-                    # 从完整文本中再次尝试提取材料
-                    full_text = " ".join(all_recognized_text)
-                    print(f"\nExtracting materials from: {full_text}")
-                    extracted_materials = self.extract_material_and_percentage(full_text)
-                    for material in extracted_materials:
-                        if material not in materials:
-                            materials.append(material)
-                            print(f"Found additional material from full text: {material}")
-                    
-                    return {
-                        'status': 'success',
-                        'detected_texts': detected_texts,
-                        'recognized_texts': all_recognized_text,
-                        'materials': materials
-                    }
-                else:
-                    print("No text detected in the image")
-                    return {
+                processed = self.preprocess_image(self.load_image(image))
+                with timed('ocr.detect'):
+                    dt_boxes, _ = self.jp_ocr.text_detector(processed)
+                if dt_boxes is None:
+                    raise ValueError('Text detection failed')
+                dt_boxes = sorted_boxes(dt_boxes)
+                boxes_by_image[index] = dt_boxes
+                for box in dt_boxes:
+                    all_crops.append(get_rotate_crop_image(processed, box.copy()))
+                    owners.append(index)
+                # 只保留裁剪出的文本行，整张图在这里就可以释放
+            except Exception as e:
+                logger.warning("OCR processing error for image %d: %s", index, e)
+                results[index] = {
+                    'status': 'error',
+                    'message': str(e),
+                    'detected_texts': [],
+                    'recognized_texts': [],
+                    'materials': []
+                }
+
+        logger.debug("Batch OCR: %d images, %d text lines", len(images), len(all_crops))
+
+        rec_res = []
+        if all_crops:
+            try:
+                if self.jp_ocr.use_angle_cls:
+                    with timed('ocr.angle_cls'):
+                        all_crops, _, _ = self.jp_ocr.text_classifier(all_crops)
+                with timed('ocr.recognize'):
+                    rec_res, _ = self.jp_ocr.text_recognizer(all_crops)
+            except Exception as e:
+                logger.exception("Batch recognition error")
+                for index in boxes_by_image:
+                    results[index] = {
                         'status': 'error',
-                        'message': 'No text detected in the image',
+                        'message': str(e),
                         'detected_texts': [],
                         'recognized_texts': [],
                         'materials': []
                     }
-                    
-            finally:
-                # 清理临时文件
-                if temp_path and os.path.exists(temp_path):
-                    try:
-                        os.remove(temp_path)
-                        print(f"Cleaned up temporary file: {temp_path}")
-                    except Exception as e:
-                        print(f"Warning: Failed to delete temporary file: {e}")
+                return results
+
+        # 按标签重新分组，与 PaddleOCR.ocr() 的返回格式一致：[[box, (text, score)], ...]
+        lines_by_image = {index: [] for index in boxes_by_image}
+        position = {index: 0 for index in boxes_by_image}
+        for owner, (text, score) in zip(owners, rec_res):
+            box = boxes_by_image[owner][position[owner]]
+            position[owner] += 1
+            if score >= self.jp_ocr.drop_score:
+                lines_by_image[owner].append([box.tolist(), (text, score)])
+
+        for index, lines in lines_by_image.items():
+            results[index] = self.build_result([lines])
+
+        return results
+
+    def build_result(self, jp_results):
+        """把PaddleOCR的原始结果整理成统一的返回格式"""
+        if jp_results:
+            # 存储识别的文本
+            detected_texts = []
+            all_recognized_text = []
+            materials = []
+            
+            for result_group in jp_results:
+                if isinstance(result_group, list):
+                    for line in result_group:
+                        if isinstance(line, (list, tuple)) and len(line) >= 2:
+                            text_info = line[1]
+                            if isinstance(text_info, (list, tuple)) and len(text_info) >= 2:
+                                text = str(text_info[0])
+                                confidence = float(text_info[1])
+                            else:
+                                text = str(text_info)
+                                confidence = 0.5
+                                
+                            if text.strip():
+                                text = text.strip()
+                                all_recognized_text.append(text)
+                                detected_texts.append({
+                                    'text': text,
+                                    'confidence': confidence
+                                })
+            
+            # 检查每一行是否是材料（所有行一次批量匹配）
+            for is_material, material_name in self.potential_materials(all_recognized_text):
+                if is_material and material_name and material_name not in materials:
+                    materials.append(material_name)
         
-        except Exception as e:
-            print(f"Processing error: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            # 从完整文本中再次尝试提取材料
+            full_text = " ".join(all_recognized_text)
+            extracted_materials = self.extract_material_and_percentage(full_text)
+            for material in extracted_materials:
+                if material not in materials:
+                    materials.append(material)
+            
+            return {
+                'status': 'success',
+                'detected_texts': detected_texts,
+                'recognized_texts': all_recognized_text,
+                'materials': materials
+            }
+        else:
+            logger.debug("No text detected in the image")
             return {
                 'status': 'error',
-                'message': str(e),
+                'message': 'No text detected in the image',
                 'detected_texts': [],
                 'recognized_texts': [],
                 'materials': []
@@ -307,62 +338,24 @@ class OCRProcessor:
 
     def is_potential_material(self, text):
         """检查文本是否可能是材料名称"""
-        # 首先标准化文本
-        text = self.normalize_material_name(text)
-        text_lower = text.lower()
-        
-        print(f"\nChecking potential material: {text_lower}")
-        
-        # 所有已知材料名称（日文和英文）
-        all_materials = {
-            # 日文材料名称
-            'ポリエステル': 'ポリエステル',
-            'ナイロン': 'ナイロン',
-            'レーヨン': 'レーヨン',
-            'アクリル': 'アクリル',
-            'ポリウレタン': 'ポリウレタン',
-            '綿': '綿',
-            '錦': '綿',  # 添加直接映射
-            'コットン': 'コットン',  # 保持原始形式
-            'ウール': 'ウール',
-            'シルク': 'シルク',
-            '麻': '麻',
-            'カシミヤ': 'カシミヤ',
-            # 英文材料名称
-            'polyester': 'polyester',
-            'nylon': 'nylon',
-            'rayon': 'rayon',
-            'acrylic': 'acrylic',
-            'polyurethane': 'polyurethane',
-            'cotton': 'cotton',  # 保持原始形式
-            'wool': 'wool',
-            'silk': 'silk',
-            'hemp': 'hemp',
-            'cashmere': 'cashmere'
-        }
-        
-        # 如果文本为空或只包含特殊字符，直接返回False
-        if not text_lower or text_lower.strip('-_.,。、'):
-            print(f"Empty or invalid text: {text_lower}")
-            return False, None
-        
-        # 1. 首先进行模糊匹配
-        matches = process.extract(text_lower, all_materials.keys(), scorer=fuzz.ratio, limit=3)
-        print(f"Fuzzy matches: {matches}")
-        
-        # 降低匹配阈值以捕获更多可能的匹配
-        if matches and matches[0][1] >= 70:
-            matched_material = all_materials[matches[0][0]]
-            print(f"Found fuzzy match: {text_lower} -> {matched_material} (score: {matches[0][1]})")
-            return True, matched_material
+        return self.potential_materials([text])[0]
+
+    def potential_materials(self, texts):
+        """批量检查多行文本是否可能是材料名称，所有行的模糊匹配合并为一次计算"""
+        results = [(False, None)] * len(texts)
+        candidates = []
+        for index, text in enumerate(texts):
+            # 首先标准化文本
+            text_lower = self.normalize_material_name(text).lower()
             
-        # 2. 如果模糊匹配失败，检查文本是否完全包含材料名称
-        for material_name, normalized in all_materials.items():
-            # 只有当文本长度接近材料名称长度时才考虑包含关系
-            if (material_name.lower() in text_lower or text_lower in material_name.lower()) and \
-               abs(len(text_lower) - len(material_name)) <= 2:
-                print(f"Found material by containment: {normalized}")
-                return True, normalized
+            # 如果文本为空或只包含特殊字符，直接返回False
+            if not text_lower.strip('-_.,。、'):
+                continue
+            candidates.append((index, text_lower))
         
-        print(f"No material match found for: {text_lower}")
-        return False, None
\ No newline at end of file
+        matches = self.line_matcher.match_lines([text_lower for _, text_lower in candidates])
+        for (index, text_lower), match in zip(candidates, matches):
+            results[index] = match
+            if match[0]:
+                logger.debug("Found material: %s -> %s", text_lower, match[1])
+        return results
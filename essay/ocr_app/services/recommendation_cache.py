@@ -0,0 +1,104 @@
+"""
+推荐结果缓存。
+
+推荐的衣物只取决于天气和衣柜的内容，按 (衣柜版本, 挑选方式, 推荐类别, 天气分档) 缓存格式化后的列表：
+天气按 1℃、5% 湿度分档，再加上天气类型。衣柜版本在 ClothingImage 保存、删除（以及批量更新）后递增，
+旧版本的条目不会再被读取，由缓存的 LRU 淘汰。命中时只读取衣柜版本，不访问衣物表。
+
+衣柜版本保存在数据库（WardrobeVersion）中，所有进程共享：run_ingest_workers、管理命令和其他 worker
+的修改提交后，每个进程的下一次查询就会使用新版本。条目本身使用 CACHES['recommendations']，
+默认是进程内的 LocMemCache（LRU，最多 MAX_ENTRIES 条）。
+"""
+import math
+import time
+
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .metrics import CACHE_LOOKUPS
+
+CACHE_ALIAS = 'recommendations'
+TEMPERATURE_STEP = 1
+HUMIDITY_STEP = 5
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def wardrobe_version():
+    from ..models import WardrobeVersion
+
+    version = WardrobeVersion.objects.filter(pk=WardrobeVersion.ID).values_list('version', flat=True).first()
+    if version is None:
+        version = _create_version().version
+    return version
+
+
+def _create_version():
+    """用当前时间初始化：版本行被删除（例如重建数据库）后，也不会与进程中旧条目的版本相同"""
+    from ..models import WardrobeVersion
+
+    try:
+        with transaction.atomic():
+            return WardrobeVersion.objects.get_or_create(pk=WardrobeVersion.ID,
+                                                         defaults={'version': time.time_ns()})[0]
+    except IntegrityError:
+        # 其他进程同时创建了
+        return WardrobeVersion.objects.get(pk=WardrobeVersion.ID)
+
+
+def bump_wardrobe_version():
+    """衣柜内容变化后调用；在事务提交之后才递增，避免提交前就按新版本缓存了旧数据"""
+    transaction.on_commit(_bump)
+
+
+def _bump():
+    from ..models import WardrobeVersion
+
+    if not WardrobeVersion.objects.filter(pk=WardrobeVersion.ID).update(version=F('version') + 1):
+        # 版本行还不存在（还没有读取过）
+        _create_version()
+
+
+def weather_bucket(weather):
+    """(温度档, 湿度档, 天气类型)；推荐规则的温湿度分界都是整数，取下限不会改变推荐的类别"""
+    temperature = weather.get('temperature', 20)
+    humidity = weather.get('humidity', 50)
+    return (
+        math.floor(temperature / TEMPERATURE_STEP) * TEMPERATURE_STEP,
+        math.floor(humidity / HUMIDITY_STEP) * HUMIDITY_STEP,
+        weather.get('condition', 'Clear'),
+    )
+
+
+def bucketed_weather(weather):
+    """分档后的天气；按材料打分时用它代替实际天气，同一档的结果完全相同"""
+    temperature, humidity, condition = weather_bucket(weather)
+    return {'temperature': temperature, 'humidity': humidity, 'condition': condition}
+
+
+def cache_key(version, ranking, categories, size, weather=None):
+    parts = [str(version), ranking, ','.join(categories), str(size)]
+    if weather is not None:
+        parts.extend(str(part) for part in weather_bucket(weather))
+    return 'recommendations:' + ':'.join(parts)
+
+
+def get_many(keys):
+    found = get_cache().get_many(keys) if keys else {}
+    if found:
+        CACHE_LOOKUPS.inc(len(found), cache='recommendations', result='hit')
+    if len(keys) > len(found):
+        CACHE_LOOKUPS.inc(len(keys) - len(found), cache='recommendations', result='miss')
+    return found
+
+
+def set_many(entries):
+    if entries:
+        get_cache().set_many(entries)
+
+
+def clear():
+    get_cache().clear()
@@ -0,0 +1,132 @@
+"""
+不加载任何模型的确定性推理后端，用于测试、性能分析和离线压测。
+
+通过设置选择::
+
+    OCR_BACKEND=ocr_app.services.stub_backends.StubOCRProcessor
+    CLASSIFIER_BACKEND=ocr_app.services.stub_backends.StubImageClassifier
+
+解码、预处理、材料提取、特征库和缓存仍走真实代码，只有模型推理被替换：
+推理耗时按每张图片 STUB_OCR_LATENCY_MS / STUB_CLASSIFIER_LATENCY_MS 毫秒模拟（sleep 会释放GIL，
+与真实推理一样可以和其他线程并行），输出是固定的或由图片内容决定，同一张图片总是得到相同的结果。
+"""
+import hashlib
+import json
+import logging
+import time
+
+import numpy as np
+from django.conf import settings
+
+from . import material_lexicon
+from .feature_store import FeatureStore
+from .image_classifier import ImageClassifier
+from .ocr_processor import OCRProcessor
+from .timing import timed
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OCR_TEXTS = ('表地', '綿 80%', 'ポリエステル 20%')
+
+
+def _simulate_latency(ms_per_item, count):
+    if ms_per_item > 0 and count:
+        time.sleep(ms_per_item * count / 1000)
+
+
+def _content_seed(array):
+    array = np.ascontiguousarray(array)
+    digest = hashlib.blake2b(memoryview(array).cast('B'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+class StubOCRProcessor(OCRProcessor):
+    """对每张标签返回固定的文本行（STUB_OCR_TEXTS），预处理和材料提取与真实引擎相同"""
+
+    def __init__(self):
+        self.jp_ocr = None
+        self.material_mapping = material_lexicon.SURFACE_TO_CANONICAL
+        self.latency_ms = getattr(settings, 'STUB_OCR_LATENCY_MS', 0)
+        self.texts = list(getattr(settings, 'STUB_OCR_TEXTS', DEFAULT_OCR_TEXTS))
+
+    @classmethod
+    def config_fingerprint(cls):
+        # 不缓存在类属性上（基类的缓存值会被继承），并与真实引擎的缓存条目分开
+        payload = json.dumps({
+            'backend': 'stub',
+            'texts': list(getattr(settings, 'STUB_OCR_TEXTS', DEFAULT_OCR_TEXTS)),
+            'pipeline': cls.PIPELINE_VERSION,
+            'lexicon': material_lexicon.VERSION,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def warmup(self):
+        logger.info("Stub OCR engine ready")
+
+    def _lines(self, processed):
+        height, width = processed.shape[:2]
+        step = height / (len(self.texts) + 1)
+        return [
+            [[[0, step * i], [width, step * i], [width, step * (i + 1)], [0, step * (i + 1)]], (text, 0.99)]
+            for i, text in enumerate(self.texts)
+        ]
+
+    def process_image(self, image):
+        return self.process_images([image])[0]
+
+    def process_images(self, images):
+        results = []
+        for image in images:
+            try:
+                processed = self.preprocess_image(self.load_image(image))
+            except Exception as e:
+                logger.warning("Stub OCR could not preprocess image: %s", e)
+                results.append({
+                    'status': 'error',
+                    'message': str(e),
+                    'detected_texts': [],
+                    'recognized_texts': [],
+                    'materials': []
+                })
+                continue
+            results.append(processed)
+
+        with timed('ocr.detect_recognize'):
+            _simulate_latency(self.latency_ms, sum(1 for r in results if not isinstance(r, dict)))
+        return [r if isinstance(r, dict) else self.build_result([self._lines(r)]) for r in results]
+
+
+class StubImageClassifier(ImageClassifier):
+    """特征向量由图片像素决定（伪随机），类别取 STUB_CLASSIFIER_CATEGORY 或由特征决定"""
+
+    BACKBONE_VERSION = 'stub-v1'
+    FEATURE_DIM = 512
+
+    def __init__(self):
+        self.CATEGORY_LABELS = {'pant': 0, 'shortpant': 1, 'longsleeve': 2, 'tshirt': 3}
+        self.LABELS_TO_CATEGORY = {v: k for k, v in self.CATEGORY_LABELS.items()}
+        self.latency_ms = getattr(settings, 'STUB_CLASSIFIER_LATENCY_MS', 0)
+        self.category = getattr(settings, 'STUB_CLASSIFIER_CATEGORY', '') or None
+        self.feature_store = FeatureStore(self.BACKBONE_VERSION)
+
+    def warmup(self):
+        logger.info("Stub classifier ready")
+
+    def extract_features(self, arrays, batch_size=None):
+        with timed('classifier.vgg16'):
+            _simulate_latency(self.latency_ms, len(arrays))
+            return np.stack([
+                np.random.default_rng(_content_seed(array)).random(self.FEATURE_DIM, dtype=np.float32)
+                for array in arrays
+            ]) if len(arrays) else np.empty((0, self.FEATURE_DIM), dtype=np.float32)
+
+    def classify_features(self, features):
+        features = np.asarray(features, dtype=np.float32).reshape(len(features), -1)
+        labels = (features[:, 0] * len(self.CATEGORY_LABELS)).astype(int) % len(self.CATEGORY_LABELS)
+        return [
+            {
+                'category': self.category or self.LABELS_TO_CATEGORY[int(label)],
+                'confidence': round(0.5 + float(row[1]) / 2, 4),
+            }
+            for label, row in zip(labels, features)
+        ]
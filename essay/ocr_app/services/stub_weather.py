@@ -0,0 +1,153 @@
+"""
+本地的天气接口替身，返回与 OpenWeatherMap /data/2.5/weather 相同结构的JSON。
+
+用于测试和离线压测，不需要网络和API key::
+
+    python -m ocr_app.services.stub_weather --port 8001 --delay-ms 50
+    WEATHER_API_URL=http://127.0.0.1:8001/data/2.5/weather python manage.py runserver
+
+测试中::
+
+    with StubWeatherServer(temperature=12) as server:
+        with override_settings(WEATHER_API_URL=server.url):
+            ...
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PATH = '/data/2.5/weather'
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # 默认的 listen backlog 只有5，并发压测时连接会被拒绝后重试
+    request_queue_size = 1024
+
+
+class StubWeatherServer:
+    """在后台线程中运行；temperature 等属性可以在运行中修改（temperatures 可以按城市指定），
+    requests 记录收到的城市"""
+
+    def __init__(self, host='127.0.0.1', port=0, temperature=18.0, humidity=60, condition='Clouds',
+                 delay=0.0, status=200):
+        self.temperature = temperature
+        self.temperatures = {}
+        self.humidity = humidity
+        self.condition = condition
+        self.delay = delay
+        self.status = status
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}{PATH}'
+
+    @property
+    def request_count(self):
+        with self._lock:
+            return len(self.requests)
+
+    def reading(self, city):
+        temperature = self.temperatures.get(city, self.temperature)
+        return {
+            'name': city,
+            'main': {
+                'temp': temperature,
+                'feels_like': temperature,
+                'humidity': self.humidity,
+                'pressure': 1013,
+            },
+            'weather': [{'main': self.condition, 'description': self.condition.lower()}],
+            'wind': {'speed': 2.5},
+        }
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # 保持连接，与真实接口一样可以复用连接池里的连接
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                city = parse_qs(url.query).get('q', [''])[0]
+                with stub._lock:
+                    stub.requests.append(city)
+                if stub.delay:
+                    time.sleep(stub.delay)
+
+                if url.path != PATH:
+                    status, body = 404, {'cod': '404', 'message': 'Not found'}
+                elif not city:
+                    status, body = 400, {'cod': '400', 'message': 'Nothing to geocode'}
+                elif stub.status != 200:
+                    status, body = stub.status, {'cod': str(stub.status), 'message': 'Stub error'}
+                else:
+                    status, body = 200, stub.reading(city)
+
+                payload = json.dumps(body).encode('utf-8')
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    # 客户端已经超时断开
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={'poll_interval': 0.05},
+                                        name='stub-weather', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Stand-in OpenWeatherMap server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--temperature', type=float, default=18.0)
+    parser.add_argument('--delay-ms', type=float, default=0.0, help='simulated upstream latency')
+    options = parser.parse_args(argv)
+
+    server = StubWeatherServer(options.host, options.port, temperature=options.temperature,
+                               delay=options.delay_ms / 1000)
+    server.start()
+    print(f'Serving stub weather on {server.url}')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
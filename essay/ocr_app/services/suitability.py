@@ -0,0 +1,254 @@
+"""
+按材料给衣物打分：衣物的材料适不适合当前的天气（NumPy 向量化）。
+
+每件衣物的材料按成分比例（标签文本中的百分比，没有时平均分配）换算成一行特征：
+加权的适宜温度范围、湿度范围，以及每种天气条件的适合程度。整个衣柜的特征矩阵
+只在衣柜变化后重新构建，之后每次打分只是对整个矩阵的几次向量运算，
+10万件衣物也只需要几毫秒。
+"""
+import logging
+import re
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+
+from . import material_lexicon, recommendation_cache
+from .timing import timed
+
+logger = logging.getLogger(__name__)
+
+# 温度、湿度超出材料适宜范围时，适合程度按距离指数衰减（超出 TEMP_SCALE 度约降到 0.37）
+TEMP_SCALE = 5.0
+HUMIDITY_SCALE = 15.0
+WEIGHTS = {'temperature': 0.5, 'humidity': 0.2, 'condition': 0.3}
+# 没有已知材料的部分（未识别、词典中没有属性的材料）的分数
+UNKNOWN_SCORE = 0.5
+
+# 材料词典中出现的所有天气条件
+CONDITIONS = tuple(sorted({
+    condition
+    for properties in material_lexicon.PROPERTIES.values()
+    for condition in properties.get('weather_conditions', ())
+}))
+CONDITION_INDEX = {condition: i for i, condition in enumerate(CONDITIONS)}
+# OpenWeatherMap 的天气类型 -> 词典中的天气条件
+CONDITION_ALIASES = {
+    'Drizzle': ('Light Rain',),
+    'Thunderstorm': ('Rain',),
+    'Snow': ('Snow', 'Light Snow'),
+    'Mist': ('Clouds',),
+    'Fog': ('Clouds',),
+    'Haze': ('Clouds',),
+}
+
+# "綿 80%"、"ポリエステル20％"
+COMPOSITION_PATTERN = re.compile(r'([^\s\d%％]+)\s*(\d+(?:\.\d+)?)\s*[%％]')
+
+
+def composition(materials, text=None):
+    """材料的成分比例 {标准名称（未知材料为原文）: 比例}，比例之和为1
+
+    标签文本中有百分比的材料按百分比，其余材料平均分配剩下的比例；没有百分比时平均分配
+    """
+    names = []
+    for material in materials or ():
+        if not isinstance(material, str) or not material.strip():
+            continue
+        name = material_lexicon.canonical_name(material) or material.lower().strip()
+        if name not in names:
+            names.append(name)
+    if not names:
+        return {}
+
+    parsed = {}
+    for surface, percent in COMPOSITION_PATTERN.findall(text or ''):
+        name = material_lexicon.canonical_name(surface)
+        if name in names:
+            # 表地、裏地分别标注时同一材料出现多次
+            parsed[name] = parsed.get(name, 0.0) + float(percent)
+
+    shares = dict(parsed)
+    rest = [name for name in names if name not in parsed]
+    remaining = 100.0 - sum(parsed.values()) if parsed else 100.0
+    if rest and remaining > 0:
+        for name in rest:
+            shares[name] = remaining / len(rest)
+    total = sum(shares.values())
+    if not total:
+        return {name: 1.0 / len(names) for name in names}
+    return {name: share / total for name, share in shares.items()}
+
+
+def material_features(materials, text=None):
+    """一件衣物的特征：(已知材料的比例, [温度下限, 温度上限, 湿度下限, 湿度上限], 天气条件向量)"""
+    known = 0.0
+    ranges = np.zeros(4, dtype=np.float32)
+    conditions = np.zeros(len(CONDITIONS), dtype=np.float32)
+    for name, share in composition(materials, text).items():
+        properties = material_lexicon.PROPERTIES.get(name)
+        if not properties or 'temp_range' not in properties:
+            continue
+        known += share
+        ranges += share * np.array([*properties['temp_range'], *properties.get('humidity_range', (0, 100))],
+                                   dtype=np.float32)
+        for condition in properties.get('weather_conditions', ()):
+            conditions[CONDITION_INDEX[condition]] += share
+    if known:
+        # 范围和天气条件只在已知材料之间加权
+        ranges /= known
+        conditions /= known
+    return known, ranges, conditions
+
+
+def active_conditions(weather):
+    """天气对应的条件向量（0/1）：天气类型本身，再加上由温度、湿度得出的 Hot/Cold/Mild/Humid"""
+    temperature = weather.get('temperature', 20)
+    humidity = weather.get('humidity', 50)
+    condition = weather.get('condition', 'Clear')
+
+    names = set(CONDITION_ALIASES.get(condition, (condition,)))
+    if temperature >= 28:
+        names.add('Hot')
+    elif temperature < 10:
+        names.add('Cold')
+    elif 15 <= temperature < 25:
+        names.add('Mild')
+    if humidity >= 70:
+        names.add('Humid')
+
+    vector = np.zeros(len(CONDITIONS), dtype=np.float32)
+    for name in names:
+        if name in CONDITION_INDEX:
+            vector[CONDITION_INDEX[name]] = 1.0
+    return vector
+
+
+def _distance(value, low, high):
+    return np.maximum(np.maximum(low - value, value - high), 0.0)
+
+
+class WardrobeMatrix:
+    """整个衣柜的材料特征矩阵；行的顺序就是平分时的先后顺序（新的衣物在前）"""
+
+    def __init__(self, ids, categories, known, ranges, conditions):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.category_names = sorted({category or '' for category in categories})
+        codes = {category: i for i, category in enumerate(self.category_names)}
+        self.category_codes = np.array([codes[category or ''] for category in categories], dtype=np.int16)
+        self.known = np.asarray(known, dtype=np.float32)
+        self.ranges = np.asarray(ranges, dtype=np.float32).reshape(-1, 4)
+        self.conditions = np.asarray(conditions, dtype=np.float32).reshape(-1, len(CONDITIONS))
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """rows: [(id, category, materials, recognized_text), ...]
+
+        成分相同的衣物只计算一次特征，每件衣物只记录它对应第几种成分，最后用下标一次取出整个矩阵"""
+        ids, categories, codes = [], [], []
+        features = {}
+        for pk, category, materials, text in rows:
+            key = (tuple(m for m in materials if isinstance(m, str)) if isinstance(materials, list) else (),
+                   text or '')
+            code = features.get(key)
+            if code is None:
+                code = features[key] = len(features)
+            ids.append(pk)
+            categories.append(category)
+            codes.append(code)
+
+        unique = [material_features(materials, text) for materials, text in features]
+        codes = np.array(codes, dtype=np.int64)
+        known = np.array([row[0] for row in unique], dtype=np.float32)
+        ranges = np.array([row[1] for row in unique], dtype=np.float32).reshape(-1, 4)
+        conditions = np.array([row[2] for row in unique], dtype=np.float32).reshape(-1, len(CONDITIONS))
+        return cls(ids, categories, known[codes], ranges[codes], conditions[codes])
+
+    @classmethod
+    def from_items(cls, items):
+        return cls.from_rows(
+            (item.id, item.category, item.materials, getattr(item, 'recognized_text', None)) for item in items
+        )
+
+    @classmethod
+    def from_queryset(cls, queryset):
+        queryset = queryset.order_by('-created_at', '-id')
+        rows = queryset.values_list('id', 'category', 'materials', 'recognized_text').iterator(chunk_size=2000)
+        return cls.from_rows(rows)
+
+    def scores(self, weather):
+        """每件衣物对天气的适合程度（0~1），与行的顺序相同"""
+        temperature = np.float32(weather.get('temperature', 20))
+        humidity = np.float32(weather.get('humidity', 50))
+        temp_fit = np.exp(-_distance(temperature, self.ranges[:, 0], self.ranges[:, 1]) / TEMP_SCALE)
+        humidity_fit = np.exp(-_distance(humidity, self.ranges[:, 2], self.ranges[:, 3]) / HUMIDITY_SCALE)
+        condition_fit = np.minimum(self.conditions @ active_conditions(weather), 1.0)
+        material_score = (WEIGHTS['temperature'] * temp_fit
+                          + WEIGHTS['humidity'] * humidity_fit
+                          + WEIGHTS['condition'] * condition_fit)
+        return self.known * material_score + (1.0 - self.known) * UNKNOWN_SCORE
+
+    def top_k(self, weather, k, categories=None):
+        """每个类别分数最高的 k 件：{类别: [(id, 分数), ...]}，分数相同时新的在前"""
+        with timed('suitability.top_k'):
+            scores = self.scores(weather)
+            ranked = {}
+            for category in categories if categories is not None else self.category_names:
+                if category not in self.category_names:
+                    ranked[category] = []
+                    continue
+                indices = np.flatnonzero(self.category_codes == self.category_names.index(category))
+                indices, top_scores = _top(indices, scores[indices], k)
+                ranked[category] = list(zip(self.ids[indices].tolist(), top_scores.tolist()))
+            return ranked
+
+
+def _top(indices, scores, k):
+    """分数最高的 k 个（稳定：分数相同时保持原来的顺序）；先用 partition 缩小范围，只对候选排序"""
+    if k and k < len(indices):
+        kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+        keep = scores >= kth
+        indices, scores = indices[keep], scores[keep]
+    order = np.argsort(-scores, kind='stable')[:k or None]
+    return indices[order], scores[order]
+
+
+_lock = threading.Lock()
+_matrix = None
+_matrix_key = None
+_matrix_built_at = 0.0
+
+
+def wardrobe_matrix(version=None):
+    """当前衣柜的特征矩阵（进程内缓存）；version 是调用方已经读取的衣柜版本
+
+    衣柜版本（所有进程共享）、衣物数量或最大id（不发送信号的批量新增、删除）变化时重新构建；
+    不经过信号也没有递增版本的修改（queryset.update 等）在 SUITABILITY_MATRIX_TTL 秒后更新
+    """
+    global _matrix, _matrix_key, _matrix_built_at
+    from ..models import ClothingImage
+
+    ttl = getattr(settings, 'SUITABILITY_MATRIX_TTL', 300)
+    if version is None:
+        version = recommendation_cache.wardrobe_version()
+    key = (version,
+           *ClothingImage.objects.aggregate(count=Count('id'), last=Max('id')).values())
+    with _lock:
+        if _matrix is not None and _matrix_key == key and time.time() - _matrix_built_at < ttl:
+            return _matrix
+        with timed('suitability.build'):
+            matrix = WardrobeMatrix.from_queryset(ClothingImage.objects.all())
+        _matrix, _matrix_key, _matrix_built_at = matrix, key, time.time()
+        logger.debug("Built suitability matrix for %d items", len(matrix))
+        return matrix
+
+
+def clear_matrix():
+    global _matrix, _matrix_key
+    with _lock:
+        _matrix = _matrix_key = None
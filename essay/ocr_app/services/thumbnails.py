@@ -0,0 +1,106 @@
+"""
+衣物图片和标签图片的缩略图（WebP）。
+
+列表和推荐页面只显示缩略图，原图（手机拍摄，通常 4000x3000）只在需要时打开。
+每张原图只解码一次：JPEG 用 draft 模式直接按 1/2、1/4、1/8 缩小解码，
+先生成大尺寸，再从大尺寸缩小出小尺寸。
+"""
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+import pillow_heif
+from PIL import Image, ImageOps
+
+from .timing import timed
+
+logger = logging.getLogger(__name__)
+
+# iPhone 拍摄的 HEIC 原图：注册后 Image.open 可以直接解码
+pillow_heif.register_heif_opener()
+
+SMALL = 128
+LARGE = 512
+SIZES = (LARGE, SMALL)
+FIELDS = ('image', 'label_image')
+UPLOAD_DIR = 'thumbnails'
+
+
+def render_thumbnails(data, sizes=SIZES):
+    """把图片内容缩放成各个尺寸（最长边）的WebP，返回 {size: bytes}"""
+    quality = getattr(settings, 'THUMBNAIL_QUALITY', 80)
+    with timed('thumbnails.render'):
+        image = Image.open(io.BytesIO(data))
+        largest = max(sizes)
+        # 只对JPEG有效：解码时直接缩小，不需要先解码出整张原图
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+        renditions = {}
+        for size in sorted(sizes, reverse=True):
+            image.thumbnail((size, size), Image.LANCZOS)
+            output = io.BytesIO()
+            image.save(output, format='WEBP', quality=quality, method=4)
+            renditions[size] = output.getvalue()
+        return renditions
+
+
+def rendition_name(source_name, size):
+    stem = os.path.splitext(source_name)[0]
+    return f'{UPLOAD_DIR}/{size}/{stem}.webp'
+
+
+def save_thumbnails(clothing, rendered):
+    """保存 render_thumbnails 的结果并更新 clothing.renditions（不保存记录本身）
+
+    rendered: {字段名: {size: bytes}}，字段对应的图片必须已经保存，文件名由原图决定
+    """
+    renditions = dict(clothing.renditions or {})
+    for field_name, sizes in rendered.items():
+        source = getattr(clothing, field_name)
+        saved = {}
+        for size, content in sizes.items():
+            name = rendition_name(source.name, size)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            saved[str(size)] = default_storage.save(name, ContentFile(content))
+        renditions[field_name] = saved
+    clothing.renditions = renditions
+    return renditions
+
+
+def generate_thumbnails(clothing, fields=FIELDS, sources=None):
+    """为记录的原图生成缩略图；sources 可以提供已经读入内存的原图内容 {字段名: bytes}
+
+    单张图片失败只记录日志，该字段继续显示原图。返回生成成功的字段名列表
+    """
+    sources = sources or {}
+    rendered = {}
+    for field_name in fields:
+        source = getattr(clothing, field_name)
+        if not source:
+            continue
+        try:
+            data = sources.get(field_name)
+            if data is None:
+                with source.open('rb') as f:
+                    data = f.read()
+            rendered[field_name] = render_thumbnails(data)
+        except Exception as e:
+            logger.warning("Could not create thumbnails for %s: %s", source.name, e)
+    save_thumbnails(clothing, rendered)
+    return list(rendered)
+
+
+def delete_thumbnails(clothing):
+    for sizes in (clothing.renditions or {}).values():
+        for name in sizes.values():
+            try:
+                default_storage.delete(name)
+            except OSError as e:
+                logger.warning("Could not delete thumbnail %s: %s", name, e)
@@ -0,0 +1,173 @@
+"""
+各处理阶段的耗时统计。
+
+``timed(stage)`` 可以作为上下文管理器或装饰器使用。每次计时都会：
+
+* 累加到本进程的分阶段直方图（``timing_stats()``，通过 /metrics/timings/ 查看）；
+* 如果当前请求开启了收集（ServerTimingMiddleware），记入该请求的 Server-Timing 头。
+
+请求内的收集基于 contextvars，线程池中执行的阶段只计入直方图。
+"""
+import bisect
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# 直方图桶的上界（毫秒），最后一个桶收集所有更慢的记录
+BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, float('inf'))
+
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+class Histogram:
+    """固定桶的耗时直方图，由所属的锁保护"""
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = None
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.min_ms = ms if self.min_ms is None else min(self.min_ms, ms)
+        self.max_ms = ms if self.max_ms is None else max(self.max_ms, ms)
+
+    def quantile(self, q):
+        """按桶估算分位数（返回所在桶的上界，最后一个桶返回最大值）"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'total_ms': round(self.total_ms, 3),
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else None,
+            'min_ms': round(self.min_ms, 3) if self.min_ms is not None else None,
+            'max_ms': round(self.max_ms, 3) if self.max_ms is not None else None,
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99),
+            'buckets': {
+                ('+Inf' if bound == float('inf') else str(bound)): count
+                for bound, count in zip(BUCKETS_MS, self.counts)
+            },
+        }
+
+
+_histograms = {}
+_lock = threading.Lock()
+
+
+def record(stage, seconds):
+    """记录一次耗时"""
+    ms = seconds * 1000
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = Histogram()
+        histogram.observe(ms)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, ms))
+
+
+class timed:
+    """计时一个阶段::
+
+        with timed('ocr.preprocess'):
+            ...
+
+        @timed('weather.fetch')
+        def get_weather_by_city(...):
+            ...
+    """
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        record(self.stage, time.perf_counter() - self.start)
+        return False
+
+    def __call__(self, func):
+        stage = self.stage
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # 每次调用使用新的计时器，装饰器实例可以被多个线程同时使用
+            with timed(stage):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+@contextmanager
+def collect_request_timings():
+    """在当前上下文中收集各阶段耗时，产出 [(stage, ms), ...] 列表"""
+    timings = []
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def server_timing_header(timings, total_ms=None):
+    """把收集到的耗时整理成 Server-Timing 头；同一阶段多次出现时合并并注明次数"""
+    merged = {}
+    for stage, ms in timings:
+        total, count = merged.get(stage, (0.0, 0))
+        merged[stage] = (total + ms, count + 1)
+    parts = []
+    for stage, (ms, count) in merged.items():
+        part = f'{stage};dur={ms:.1f}'
+        if count > 1:
+            part += f';desc="x{count}"'
+        parts.append(part)
+    if total_ms is not None:
+        parts.append(f'total;dur={total_ms:.1f}')
+    return ', '.join(parts)
+
+
+def timing_stats():
+    """本进程各阶段耗时直方图的快照"""
+    with _lock:
+        return {stage: histogram.snapshot() for stage, histogram in sorted(_histograms.items())}
+
+
+def histogram_snapshot():
+    """原始桶计数，供多进程汇总使用"""
+    with _lock:
+        return {
+            stage: {'counts': list(h.counts), 'sum_ms': h.total_ms, 'count': h.count}
+            for stage, h in _histograms.items()
+        }
+
+
+def reset_timings():
+    with _lock:
+        _histograms.clear()
+
+
+def reset_after_fork():
+    """fork出的子进程不继承父进程的统计（锁也可能处于被持有的状态）"""
+    global _lock
+    _lock = threading.Lock()
+    _histograms.clear()
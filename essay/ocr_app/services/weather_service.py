@@ -1,43 +1,308 @@
-import requests
+"""
+天气查询：共享连接池、超时、两级缓存。
+
+- 所有 WeatherService 实例共用一个 requests.Session（连接池），不再每次请求重新握手
+- 连接和读取都有超时（WEATHER_CONNECT_TIMEOUT / WEATHER_READ_TIMEOUT），上游变慢不会卡住worker
+- 结果按规范化的城市名缓存在进程内，WEATHER_CACHE_TTL 秒内直接返回；
+  过期后的 WEATHER_STALE_TTL 秒内先返回旧结果，同时在后台刷新（同一城市只刷新一次）
+- 获取到的读数写入 WeatherData 作为第二级缓存，进程重启或其他worker也能用上；每个城市只保留最新的一条
+
+异步视图使用 ``aget_weather_by_city``：安装了 httpx 时在事件循环上直接请求（每个事件循环一个连接池），
+否则在线程池中用上面的同步会话请求，同样不会阻塞事件循环。
+"""
+import asyncio
 import logging
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from ..models import WeatherData
+from .metrics import CACHE_LOOKUPS, WEATHER_REQUESTS
+from .timing import timed
+
+try:
+    import httpx
+except ImportError:  # 可选依赖
+    httpx = None
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_API_URL = "http://api.openweathermap.org/data/2.5/weather"
+
+_lock = threading.Lock()
+_session = None
+_executor = None
+# 规范化城市名 -> (获取时间 time.time(), 结果)；按插入顺序淘汰
+_cache = {}
+_refreshing = set()
+# 事件循环 -> httpx.AsyncClient；AsyncClient 不能跨事件循环使用
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _reset_after_fork():
+    """子进程不能复用父进程连接池里的连接，也没有父进程的刷新线程"""
+    global _lock, _session, _executor, _async_clients
+    _lock = threading.Lock()
+    _session = None
+    _executor = None
+    _refreshing.clear()
+    _async_clients = weakref.WeakKeyDictionary()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_session():
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=getattr(settings, 'WEATHER_POOL_SIZE', 10))
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+def get_async_client(timeout):
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None:
+            size = getattr(settings, 'WEATHER_POOL_SIZE', 10)
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(timeout[1], connect=timeout[0]),
+                limits=httpx.Limits(max_connections=size, max_keepalive_connections=size),
+            )
+            _async_clients[loop] = client
+        return client
+
+
+def normalize_city(city):
+    return ' '.join((city or '').split()).casefold()
+
+
+def clear_cache():
+    """清空进程内缓存（不影响 WeatherData 中的记录）"""
+    with _lock:
+        _cache.clear()
+
+
+def _remember(key, entry):
+    max_entries = max(1, getattr(settings, 'WEATHER_CACHE_MAX_ENTRIES', 1000))
+    with _lock:
+        _cache.pop(key, None)
+        _cache[key] = entry
+        while len(_cache) > max_entries:
+            _cache.pop(next(iter(_cache)))
+
+
 class WeatherService:
-    def __init__(self, api_key):
+    def __init__(self, api_key, base_url=None):
         self.api_key = api_key
-        self.base_url = "http://api.openweathermap.org/data/2.5/weather"
+        self.base_url = base_url or getattr(settings, 'WEATHER_API_URL', '') or DEFAULT_API_URL
+        self.ttl = getattr(settings, 'WEATHER_CACHE_TTL', 600)
+        self.stale_ttl = getattr(settings, 'WEATHER_STALE_TTL', 3600)
+        self.timeout = (
+            getattr(settings, 'WEATHER_CONNECT_TIMEOUT', 3.05),
+            getattr(settings, 'WEATHER_READ_TIMEOUT', 5),
+        )
 
     def get_weather_by_city(self, city):
+        key = normalize_city(city)
+        if not key:
+            return {'error': 'Empty city name'}
+
+        entry = self._memory_cached(key) or self._stored(key)
+        result = self._from_cache(key, entry)
+        if result is not None:
+            return result
+        CACHE_LOOKUPS.inc(cache='weather', result='miss')
+        return self._fetch_and_store(key)
+
+    def get_cached(self, city):
+        """只查进程内缓存，不访问数据库和网络；没有可用的结果时返回 None"""
+        key = normalize_city(city)
+        return self._from_cache(key, self._memory_cached(key)) if key else None
+
+    async def aget_weather_by_city(self, city):
+        """get_weather_by_city 的异步版本，缓存相同"""
+        key = normalize_city(city)
+        if not key:
+            return {'error': 'Empty city name'}
+
+        entry = self._memory_cached(key)
+        if entry is None:
+            entry = await sync_to_async(self._stored)(key)
+        result = self._from_cache(key, entry)
+        if result is not None:
+            return result
+
+        CACHE_LOOKUPS.inc(cache='weather', result='miss')
+        result = await self._afetch(key)
+        if 'error' not in result:
+            _remember(key, (time.time(), result))
+            await sync_to_async(self._persist)(key, result)
+        return result
+
+    def _from_cache(self, key, entry):
+        """缓存的结果还能用时返回它（过期但在 stale 窗口内时同时安排后台刷新），否则返回 None"""
+        if entry is not None:
+            fetched_at, result = entry
+            age = time.time() - fetched_at
+            if age < self.ttl:
+                CACHE_LOOKUPS.inc(cache='weather', result='hit')
+                return result
+            if age < self.ttl + self.stale_ttl:
+                # 先返回旧结果，刷新不阻塞当前请求
+                CACHE_LOOKUPS.inc(cache='weather', result='stale')
+                self._refresh_in_background(key)
+                return result
+        return None
+
+    @staticmethod
+    def _memory_cached(key):
+        with _lock:
+            return _cache.get(key)
+
+    def _stored(self, key):
+        """第二级：其他进程或之前获取并保存的读数"""
+        since = timezone.now() - timedelta(seconds=self.ttl + self.stale_ttl)
         try:
-            logger.debug(f"Fetching weather for city: {city}")
-            logger.debug(f"Using API key: {self.api_key}")
-
-            params = {
-                'q': city,
-                'appid': self.api_key,
-                'units': 'metric',  # 使用摄氏度
-                'lang': 'zh_cn'    # 使用中文描述
+            reading = (WeatherData.objects
+                       .filter(city=key, timestamp__gte=since)
+                       .order_by('-timestamp')
+                       .first())
+        except DatabaseError as e:
+            logger.warning("Could not read cached weather for %s: %s", key, e)
+            return None
+        if reading is None:
+            return None
+        entry = (reading.timestamp.timestamp(), {
+            'weather': {
+                'temperature': reading.temperature,
+                'condition': reading.condition,
+                'humidity': reading.humidity,
             }
-            
-            response = requests.get(self.base_url, params=params)
+        })
+        _remember(key, entry)
+        return entry
+
+    def _fetch_and_store(self, key):
+        result = self._fetch(key)
+        if 'error' not in result:
+            _remember(key, (time.time(), result))
+            self._persist(key, result)
+        return result
+
+    @staticmethod
+    def _persist(key, result):
+        weather = result['weather']
+        fields = {
+            'temperature': weather['temperature'],
+            'humidity': weather['humidity'],
+            'condition': weather['condition'],
+        }
+        try:
+            # 更新该城市已有的记录，表不会随请求次数增长
+            updated = WeatherData.objects.filter(city=key).update(timestamp=timezone.now(), **fields)
+            if not updated:
+                WeatherData.objects.create(city=key, **fields)
+        except DatabaseError as e:
+            logger.warning("Could not save weather for %s: %s", key, e)
+
+    def _refresh_in_background(self, key):
+        global _executor
+        with _lock:
+            if key in _refreshing:
+                return
+            _refreshing.add(key)
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='weather-refresh')
+            executor = _executor
+        executor.submit(self._refresh, key)
+
+    def _refresh(self, key):
+        try:
+            self._fetch_and_store(key)
+        except Exception:
+            logger.exception("Background weather refresh for %s failed", key)
+        finally:
+            with _lock:
+                _refreshing.discard(key)
+            # 刷新线程中写 WeatherData 时打开的数据库连接
+            connection.close()
+
+    def _params(self, city):
+        return {
+            'q': city,
+            'appid': self.api_key,
+            'units': 'metric',  # 使用摄氏度
+            'lang': 'zh_cn'    # 使用中文描述
+        }
+
+    def _error_message(self, e):
+        """异常消息中的URL带有 appid，记录日志和返回给页面之前去掉；httpx 的超时异常没有消息"""
+        message = str(e) or type(e).__name__
+        return message.replace(self.api_key, '***') if self.api_key else message
+
+    @staticmethod
+    def _parse(data):
+        return {
+            'weather': {
+                'temperature': data['main']['temp'],
+                'condition': data['weather'][0]['main'],
+                'description': data['weather'][0]['description'],
+                'feels_like': data['main']['feels_like'],
+                'humidity': data['main']['humidity'],
+                'pressure': data['main']['pressure'],
+                'wind_speed': data['wind']['speed']
+            }
+        }
+
+    @timed('weather.fetch')
+    def _fetch(self, city):
+        try:
+            logger.debug("Fetching weather for city: %s", city)
+            response = get_session().get(self.base_url, params=self._params(city), timeout=self.timeout)
             response.raise_for_status()
             
             data = response.json()
-            logger.debug(f"API Response: {data}")
-
-            return {
-                'weather': {
-                    'temperature': data['main']['temp'],
-                    'condition': data['weather'][0]['main'],
-                    'description': data['weather'][0]['description'],
-                    'feels_like': data['main']['feels_like'],
-                    'humidity': data['main']['humidity'],
-                    'pressure': data['main']['pressure'],
-                    'wind_speed': data['wind']['speed']
-                }
-            }
+            WEATHER_REQUESTS.inc(result='success')
+            logger.debug("API Response: %s", data)
+            return self._parse(data)
         except Exception as e:
-            logger.error(f"Error fetching weather: {str(e)}")
-            return {'error': str(e)}
+            message = self._error_message(e)
+            WEATHER_REQUESTS.inc(result='error')
+            logger.error("Error fetching weather for %s: %s", city, message)
+            return {'error': message}
 
+    async def _afetch(self, city):
+        if httpx is None:
+            # 没有异步HTTP客户端：在线程池中同步请求，事件循环不被阻塞
+            return await sync_to_async(self._fetch, thread_sensitive=False)(city)
+        try:
+            logger.debug("Fetching weather for city: %s", city)
+            with timed('weather.fetch'):
+                response = await get_async_client(self.timeout).get(self.base_url, params=self._params(city))
+                response.raise_for_status()
+                data = response.json()
+            WEATHER_REQUESTS.inc(result='success')
+            logger.debug("API Response: %s", data)
+            return self._parse(data)
+        except Exception as e:
+            message = self._error_message(e)
+            WEATHER_REQUESTS.inc(result='error')
+            logger.error("Error fetching weather for %s: %s", city, message)
+            return {'error': message}
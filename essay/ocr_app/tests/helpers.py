@@ -0,0 +1,26 @@
+"""多个测试模块共用的测试数据"""
+import io
+
+from PIL import Image
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from ocr_app.models import ClothingImage
+
+
+def make_image(name='item.png', color=(255, 0, 0), size=(40, 30)):
+    """上传用的PNG图片"""
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+def make_wardrobe(count, categories=('tshirt', 'pant', 'longsleeve', 'shortpant'), **fields):
+    """批量创建count件衣物，类别轮流取，返回按列表顺序（新的在前）排列的id"""
+    fields.setdefault('materials', ['綿'])
+    ClothingImage.objects.bulk_create([
+        ClothingImage(image=f'clothing_images/{i}.jpg', label_image=f'label_images/{i}.jpg',
+                      category=categories[i % len(categories)], **fields)
+        for i in range(count)
+    ])
+    # bulk_create 在同一毫秒内创建的记录 created_at 相同，分页必须靠 id 区分
+    return list(ClothingImage.objects.order_by('-created_at', '-id').values_list('id', flat=True))
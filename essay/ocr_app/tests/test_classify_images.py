@@ -0,0 +1,105 @@
+import importlib.util
+import unittest
+
+import numpy as np
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ocr_app.tests.helpers import make_image
+
+
+class FakeExtractor:
+    """记录每次 predict 的批大小，特征取每张图片的通道均值"""
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, batch, batch_size=None, verbose=0):
+        self.batches.append(len(batch))
+        return batch.mean(axis=(1, 2))
+
+
+class FakePipeline:
+    classes_ = np.array([0, 1, 2, 3])
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict_proba(self, features):
+        self.calls += 1
+        # 第一通道越大越像 'pant'
+        scores = np.zeros((len(features), 4))
+        scores[:, 0] = features[:, 0] > 0
+        scores[:, 3] = features[:, 0] <= 0
+        return scores * 0.9 + 0.025
+
+
+@unittest.skipUnless(importlib.util.find_spec('tensorflow'), 'tensorflow is not installed')
+class ClassifyImagesTests(SimpleTestCase):
+    def setUp(self):
+        from ocr_app.services.image_classifier import ImageClassifier
+
+        self.classifier = ImageClassifier.__new__(ImageClassifier)
+        self.classifier.LABELS_TO_CATEGORY = {0: 'pant', 1: 'shortpant', 2: 'longsleeve', 3: 'tshirt'}
+        self.classifier.feature_extractor = FakeExtractor()
+        self.classifier.pipeline = FakePipeline()
+        self.classifier.feature_store = None
+
+    @override_settings(CLASSIFIER_BATCH_SIZE=2)
+    def test_batches_forward_passes_and_single_predict_proba(self):
+        images = [make_image(color=(255, 0, 0)), make_image(color=(0, 0, 255)), make_image(color=(200, 0, 0))]
+        results = self.classifier.classify_images(images, workers=2)
+
+        self.assertEqual(self.classifier.feature_extractor.batches, [2, 1])
+        self.assertEqual(self.classifier.pipeline.calls, 1)
+        self.assertEqual([r['category'] for r in results], ['pant', 'tshirt', 'pant'])
+        self.assertAlmostEqual(results[0]['confidence'], 0.925)
+
+    def test_unreadable_image_yields_none(self):
+        broken = SimpleUploadedFile('broken.png', b'not an image', content_type='image/png')
+        results = self.classifier.classify_images([make_image(), broken])
+
+        self.assertIsNotNone(results[0])
+        self.assertIsNone(results[1])
+
+    def test_predecoded_inputs_are_not_read_again(self):
+        image = make_image(color=(0, 0, 255))
+        expected = self.classifier.classify_images([image])[0]
+        decoded = self.classifier.decode_image(image.read())
+
+        results = self.classifier.classify_images([None], hashes=[expected['image_hash']], decoded=[decoded])
+        self.assertEqual(results, [expected])
+
+    def test_classify_image_matches_batch_result(self):
+        image = make_image(color=(0, 0, 255))
+        self.assertEqual(self.classifier.classify_image(image),
+                         self.classifier.classify_images([image])[0])
+
+
+@unittest.skipUnless(importlib.util.find_spec('tensorflow'), 'tensorflow is not installed')
+class StoredFeaturesTests(TestCase):
+    def setUp(self):
+        from ocr_app.services.feature_store import FeatureStore
+        from ocr_app.services.image_classifier import ImageClassifier
+
+        self.classifier = ImageClassifier.__new__(ImageClassifier)
+        self.classifier.LABELS_TO_CATEGORY = {0: 'pant', 1: 'shortpant', 2: 'longsleeve', 3: 'tshirt'}
+        self.classifier.feature_extractor = FakeExtractor()
+        self.classifier.pipeline = FakePipeline()
+        self.classifier.feature_store = FeatureStore('test-backbone')
+
+    def test_stored_features_skip_the_backbone(self):
+        images = [make_image(color=(255, 0, 0)), make_image(color=(0, 0, 255))]
+        first = self.classifier.classify_images(images)
+        self.assertEqual(self.classifier.feature_extractor.batches, [2])
+
+        # 重新分类时直接按哈希取特征，不再读取文件
+        hashes = [result['image_hash'] for result in first]
+        again = self.classifier.classify_images([None, None], hashes=hashes)
+        self.assertEqual(self.classifier.feature_extractor.batches, [2])
+        self.assertEqual(again, first)
+
+    def test_duplicate_images_run_once(self):
+        results = self.classifier.classify_images([make_image(), make_image()])
+        self.assertEqual(self.classifier.feature_extractor.batches, [1])
+        self.assertEqual(results[0], results[1])
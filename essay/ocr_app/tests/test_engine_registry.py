@@ -0,0 +1,94 @@
+from django.test import SimpleTestCase
+import threading
+import time
+
+from ocr_app.services.engine_registry import EngineRegistry
+
+
+class EngineRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.built = []
+
+        def factory():
+            time.sleep(0.01)
+            instance = object()
+            self.built.append(instance)
+            return instance
+
+        self.factory = factory
+
+    def test_lazy_single_load(self):
+        """首次使用时才加载，之后复用同一个实例"""
+        registry = EngineRegistry('test', self.factory, pool_size=1)
+        self.assertFalse(registry.loaded)
+
+        with registry.acquire() as first:
+            pass
+        with registry.acquire() as second:
+            pass
+
+        self.assertIs(first, second)
+        self.assertTrue(registry.loaded)
+        self.assertEqual(registry.stats()['loads'], 1)
+
+    def test_pool_size_bounds_concurrent_loads(self):
+        """并发请求不会超过池大小"""
+        registry = EngineRegistry('test', self.factory, pool_size=2)
+        seen = set()
+        lock = threading.Lock()
+
+        def worker():
+            for _ in range(5):
+                with registry.acquire() as instance:
+                    with lock:
+                        seen.add(id(instance))
+                    time.sleep(0.001)
+
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = registry.stats()
+        self.assertLessEqual(stats['loads'], 2)
+        self.assertEqual(stats['in_use'], 0)
+        self.assertLessEqual(len(seen), 2)
+
+    def test_reload_discards_instances(self):
+        """reload之后重新加载，借出中的旧实例归还时被丢弃"""
+        registry = EngineRegistry('test', self.factory, pool_size=1)
+        with registry.acquire() as old:
+            registry.reload()
+        with registry.acquire() as new:
+            pass
+
+        self.assertIsNot(old, new)
+        stats = registry.stats()
+        self.assertEqual(stats['loads'], 2)
+        self.assertEqual(stats['reloads'], 1)
+        self.assertEqual(stats['loaded'], 1)
+
+    def test_failed_load_releases_slot(self):
+        """加载失败不会占用池的位置"""
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError('model download failed')
+            return object()
+
+        registry = EngineRegistry('test', flaky, pool_size=1)
+        with self.assertRaises(RuntimeError):
+            with registry.acquire():
+                pass
+        with registry.acquire() as instance:
+            self.assertIsNotNone(instance)
+
+    def test_warmup_loads_whole_pool(self):
+        registry = EngineRegistry('test', self.factory, pool_size=3)
+        registry.warmup()
+        stats = registry.stats()
+        self.assertEqual(stats['loaded'], 3)
+        self.assertEqual(stats['idle'], 3)
@@ -0,0 +1,48 @@
+import numpy as np
+from django.test import TestCase
+
+from ocr_app.models import ImageFeatureVector
+from ocr_app.services.feature_store import FeatureStore, content_hash
+
+
+class FeatureStoreTests(TestCase):
+    def test_round_trip(self):
+        store = FeatureStore('test-backbone')
+        vector = np.arange(512, dtype=np.float32) / 7
+        store.set_many({'a' * 64: vector})
+
+        found = store.get_many(['a' * 64, 'b' * 64])
+        self.assertEqual(list(found), ['a' * 64])
+        np.testing.assert_array_equal(found['a' * 64], vector)
+
+    def test_float16_storage(self):
+        store = FeatureStore('test-backbone', dtype='float16')
+        vector = np.linspace(0, 10, 512, dtype=np.float32)
+        store.set_many({'a' * 64: vector})
+
+        entry = ImageFeatureVector.objects.get()
+        self.assertEqual(len(entry.vector), 512 * 2)
+        restored = store.get_many(['a' * 64])['a' * 64]
+        self.assertEqual(restored.dtype, np.float32)
+        np.testing.assert_allclose(restored, vector, rtol=1e-3)
+
+    def test_keyed_by_backbone_and_existing_entries_kept(self):
+        FeatureStore('old').set_many({'a' * 64: np.zeros(4)})
+        store = FeatureStore('new')
+        self.assertEqual(store.get_many(['a' * 64]), {})
+
+        store.set_many({'a' * 64: np.ones(4)})
+        store.set_many({'a' * 64: np.full(4, 2.0)})
+        np.testing.assert_array_equal(store.get_many(['a' * 64])['a' * 64], np.ones(4))
+
+    def test_matrix_keeps_order_and_skips_missing(self):
+        store = FeatureStore('test-backbone')
+        store.set_many({'a': np.zeros(3), 'b': np.ones(3)})
+
+        matrix, keys = store.matrix(['b', 'missing', 'a'])
+        self.assertEqual(keys, ['b', 'a'])
+        np.testing.assert_array_equal(matrix, [[1, 1, 1], [0, 0, 0]])
+
+    def test_content_hash(self):
+        self.assertEqual(content_hash(b'abc'), content_hash(b'abc'))
+        self.assertEqual(len(content_hash(b'abc')), 64)
@@ -0,0 +1,217 @@
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ocr_app.models import ClothingImage, IngestJob
+from ocr_app.services import ingest, metrics
+from ocr_app.tests.helpers import make_image
+
+
+class FakeClassifier:
+    def classify_images(self, files, **kwargs):
+        return [None if 'broken' in f.name else {'category': 'tshirt', 'confidence': 0.9, 'image_hash': 'h'}
+                for f in files]
+
+
+class FakeRegistry:
+    @contextmanager
+    def acquire(self):
+        yield FakeClassifier()
+
+
+def ingest_jobs_total(status):
+    return metrics.REGISTRY.values[metrics.INGEST_JOBS.name].get((status,), 0)
+
+
+def fake_labels(files):
+    return [{'recognized_texts': ['綿', '100%'], 'materials': ['綿']} for _ in files]
+
+
+class IngestQueueTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        patches = [
+            mock.patch.object(ingest, 'get_classifier_registry', return_value=FakeRegistry()),
+            mock.patch.object(ingest, 'process_label_images', side_effect=fake_labels),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def enqueue(self, *names):
+        return ingest.enqueue_batch([(make_image(name), make_image(f'label_{name}')) for name in names])
+
+    def test_enqueue_saves_files_and_creates_pending_jobs(self):
+        batch = self.enqueue('a.png', 'b.png')
+        jobs = list(batch.jobs.order_by('position'))
+
+        self.assertEqual([job.status for job in jobs], ['pending', 'pending'])
+        self.assertEqual([job.clothing_name for job in jobs], ['a.png', 'b.png'])
+        self.assertTrue(all(default_storage.exists(job.clothing_file) for job in jobs))
+        self.assertTrue(jobs[0].clothing_file.startswith('ingest_queue/'))
+
+    def test_claim_is_exclusive(self):
+        self.enqueue('a.png', 'b.png', 'c.png')
+
+        first = ingest.claim_jobs('worker-1', 2)
+        second = ingest.claim_jobs('worker-2', 2)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse({job.id for job in first} & {job.id for job in second})
+        self.assertEqual(ingest.claim_jobs('worker-3', 2), [])
+
+    def test_process_jobs_creates_clothing_and_removes_queue_files(self):
+        batch = self.enqueue('a.png', 'broken.png')
+        self.assertEqual(ingest.run_pending_jobs(batch=batch), 2)
+
+        done, failed = batch.jobs.order_by('position')
+        self.assertEqual(done.status, IngestJob.STATUS_DONE)
+        self.assertEqual(done.clothing.category, 'tshirt')
+        self.assertEqual(done.clothing.materials, ['綿'])
+        self.assertTrue(default_storage.exists(done.clothing.renditions['image']['512']))
+        self.assertTrue(done.clothing.label_thumbnail_url.endswith('.webp'))
+        self.assertEqual(failed.status, IngestJob.STATUS_FAILED)
+        self.assertIn('broken.png', failed.error)
+        self.assertEqual(ClothingImage.objects.count(), 1)
+        self.assertFalse(default_storage.exists(done.clothing_file))
+
+    @override_settings(INGEST_MAX_ATTEMPTS=2)
+    def test_stale_jobs_are_requeued_then_failed(self):
+        self.enqueue('a.png')
+        ingest.claim_jobs('worker-1', 1)
+        IngestJob.objects.update(started_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(ingest.requeue_stale_jobs(timeout=60), 1)
+        ingest.claim_jobs('worker-2', 1)
+        IngestJob.objects.update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(ingest.requeue_stale_jobs(timeout=60), 0)
+        job = IngestJob.objects.get()
+        self.assertEqual(job.status, IngestJob.STATUS_FAILED)
+        self.assertFalse(default_storage.exists(job.clothing_file))
+
+    @override_settings(INGEST_MAX_ATTEMPTS=2)
+    def test_released_jobs_fail_after_max_attempts(self):
+        self.enqueue('a.png')
+        failed = ingest_jobs_total('failed')
+        ingest._release(ingest.claim_jobs('worker-1', 1), 'ImportError: no backend')
+        self.assertEqual(IngestJob.objects.get().status, IngestJob.STATUS_PENDING)
+
+        ingest._release(ingest.claim_jobs('worker-1', 1), 'ImportError: no backend')
+        job = IngestJob.objects.get()
+        self.assertEqual((job.status, job.error), (IngestJob.STATUS_FAILED, 'ImportError: no backend'))
+        self.assertFalse(default_storage.exists(job.clothing_file))
+        self.assertFalse(default_storage.exists(job.label_file))
+        self.assertEqual(ingest_jobs_total('failed'), failed + 1)
+
+    def test_batch_error_releases_current_and_prefetched_jobs(self):
+        batch = self.enqueue('a.png', 'b.png', 'c.png')
+        with mock.patch.object(ingest, 'prepare_jobs', side_effect=ImportError('No module named backends')), \
+                self.assertLogs('ocr_app.services.ingest', 'ERROR'):
+            self.assertEqual(ingest.run_pending_jobs(batch=batch, batch_size=1), 0)
+
+        jobs = list(batch.jobs.order_by('position'))
+        self.assertEqual([job.status for job in jobs], ['pending', 'pending', 'pending'])
+        self.assertEqual([job.attempts for job in jobs], [1, 1, 0])
+        self.assertIn('No module named backends', jobs[1].error)
+
+    def test_worker_survives_errors(self):
+        stop = threading.Event()
+        calls = []
+
+        def run(**kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                raise RuntimeError('database is locked')
+            stop.set()
+            return 0
+
+        with mock.patch.object(ingest, 'run_pending_jobs', side_effect=run), \
+                mock.patch.object(ingest, 'close_old_connections'), mock.patch.object(ingest, 'connection'), \
+                self.assertLogs('ocr_app.services.ingest', 'ERROR'):
+            ingest.run_worker(0, batch_size=2, poll_interval=0, stop_event=stop)
+        self.assertEqual(len(calls), 2)
+
+    def test_upload_enqueues_and_status_endpoint_reports_items(self):
+        response = self.client.post(
+            reverse('batch_upload'),
+            {'clothing_images[]': [make_image('a.png')], 'label_images[]': [make_image('l.png')]},
+            HTTP_ACCEPT='application/json',
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(IngestJob.objects.get().status, IngestJob.STATUS_PENDING)
+
+        status = self.client.get(response.json()['status_url']).json()
+        self.assertEqual(status['counts']['pending'], 1)
+        self.assertFalse(status['finished'])
+
+        ingest.run_pending_jobs()
+        status = self.client.get(response.json()['status_url']).json()
+        self.assertTrue(status['finished'])
+        self.assertEqual(status['items'][0]['category'], 'tshirt')
+
+    def test_classification_and_ocr_overlap(self):
+        ocr_started = threading.Event()
+        overlapped = []
+
+        class WaitingClassifier(FakeClassifier):
+            def classify_images(self, files, **kwargs):
+                # 只有OCR在分类结束前开始才算并行；每一批重新等待（本批分类返回前下一批的OCR不会开始）
+                overlapped.append(ocr_started.wait(timeout=5))
+                ocr_started.clear()
+                return super().classify_images(files, **kwargs)
+
+        class WaitingRegistry:
+            @contextmanager
+            def acquire(self):
+                yield WaitingClassifier()
+
+        def labels(files):
+            ocr_started.set()
+            return fake_labels(files)
+
+        batch = self.enqueue('a.png', 'b.png', 'c.png')
+        with mock.patch.object(ingest, 'get_classifier_registry', return_value=WaitingRegistry()), \
+                mock.patch.object(ingest, 'process_label_images', side_effect=labels):
+            self.assertEqual(ingest.run_pending_jobs(batch=batch, batch_size=2), 3)
+
+        self.assertEqual(overlapped, [True, True])
+        self.assertEqual(batch.jobs.filter(status=IngestJob.STATUS_DONE).count(), 3)
+
+    @override_settings(OCR_BATCH_SIZE=2)
+    def test_ocr_is_chunked_by_batch_size(self):
+        sizes = []
+
+        def labels(files):
+            sizes.append(len(files))
+            return fake_labels(files)
+
+        batch = self.enqueue('a.png', 'b.png', 'c.png')
+        with mock.patch.object(ingest, 'process_label_images', side_effect=labels):
+            self.assertEqual(ingest.run_pending_jobs(batch=batch, batch_size=3), 3)
+        self.assertEqual(sizes, [2, 1])
+        self.assertEqual(batch.jobs.filter(status=IngestJob.STATUS_DONE).count(), 3)
+
+    def test_prepared_inputs_are_decoded(self):
+        batch = self.enqueue('a.png')
+        prepared = ingest.prepare_jobs(list(batch.jobs.all()))
+
+        self.assertEqual(prepared[0]['clothing_array'].shape, (224, 224, 3))
+        self.assertEqual(prepared[0]['label_array'].shape, (30, 40, 3))
+        self.assertEqual(len(prepared[0]['clothing_hash']), 64)
+
+    def test_unknown_batch_is_404(self):
+        response = self.client.get(reverse('ingest_batch_status', args=[999]))
+        self.assertEqual(response.status_code, 404)
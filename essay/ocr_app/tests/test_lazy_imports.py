@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+HEAVY_MODULES = ('tensorflow', 'keras', 'paddle', 'paddleocr', 'cv2', 'sklearn')
+
+
+class LazyImportTests(SimpleTestCase):
+    """URLconf 和服务模块导入时不能加载任何机器学习框架（在新的解释器中检查）"""
+
+    def loaded_heavy_modules(self, *modules):
+        code = (
+            "import sys, django; django.setup(); "
+            + "".join(f"import {module}; " for module in modules)
+            + f"print('heavy:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+        )
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='clothing_project.test_settings')
+        proc = subprocess.run([sys.executable, '-c', code], cwd=settings.BASE_DIR,
+                              env=env, capture_output=True, text=True)
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        line = [line for line in proc.stdout.splitlines() if line.startswith('heavy:')][-1]
+        return [m for m in line[len('heavy:'):].split(',') if m]
+
+    def test_urlconf_import_is_light(self):
+        self.assertEqual(self.loaded_heavy_modules('clothing_project.urls'), [])
+
+    def test_service_modules_import_is_light(self):
+        self.assertEqual(self.loaded_heavy_modules(
+            'ocr_app.services.ocr_processor',
+            'ocr_app.services.image_classifier',
+            'ocr_app.services.engine_registry',
+        ), [])
@@ -0,0 +1,46 @@
+import logging
+
+from django.test import TestCase
+from django.urls import reverse
+
+from ocr_app.logging_filters import SampleFilter
+from ocr_app.models import ClothingImage
+
+
+def make_record(level):
+    return logging.LogRecord('ocr_app.test', level, __file__, 1, 'message %s', ('arg',), None)
+
+
+class SampleFilterTests(TestCase):
+    def test_debug_records_are_sampled_and_higher_levels_kept(self):
+        drop_all = SampleFilter(rate=0.0)
+        self.assertFalse(drop_all.filter(make_record(logging.DEBUG)))
+        self.assertTrue(drop_all.filter(make_record(logging.INFO)))
+        self.assertTrue(drop_all.filter(make_record(logging.WARNING)))
+        self.assertTrue(SampleFilter(rate=1.0).filter(make_record(logging.DEBUG)))
+
+
+class ListViewLoggingTests(TestCase):
+    def setUp(self):
+        ClothingImage.objects.bulk_create([
+            ClothingImage(image=f'clothing_images/{i}.jpg', category='tshirt', materials=['綿'])
+            for i in range(3)
+        ])
+        logger = logging.getLogger('ocr_app')
+        self.addCleanup(logger.setLevel, logger.level)
+        self.records = []
+        handler = logging.Handler()
+        handler.emit = self.records.append
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+
+    def test_per_record_debug_lines_only_at_debug_level(self):
+        logger = logging.getLogger('ocr_app')
+        logger.setLevel(logging.INFO)
+        with self.assertNumQueries(1):
+            self.client.get(reverse('clothing_list'))
+        self.assertEqual(self.records, [])
+
+        logger.setLevel(logging.DEBUG)
+        self.client.get(reverse('clothing_list'))
+        self.assertEqual(len([r for r in self.records if r.msg.startswith('Clothing record')]), 3)
@@ -0,0 +1,33 @@
+from django.test import SimpleTestCase
+
+from ocr_app.services import material_lexicon
+from ocr_app.services.recommender import ClothingRecommender
+
+
+class MaterialLexiconTests(SimpleTestCase):
+    def test_surface_forms_resolve_to_canonical_names(self):
+        self.assertEqual(material_lexicon.canonical_name('コットン'), 'cotton')
+        self.assertEqual(material_lexicon.canonical_name('Polyester '), 'polyester')
+        self.assertEqual(material_lexicon.canonical_name('涤纶', 'chinese'), 'polyester')
+        self.assertIsNone(material_lexicon.canonical_name('unknown fibre'))
+
+    def test_ocr_alias_maps_to_corrected_form(self):
+        self.assertEqual(material_lexicon.SURFACE_FORMS['錦'], '綿')
+        self.assertEqual(material_lexicon.SURFACE_TO_CANONICAL['錦'], 'cotton')
+
+    def test_every_property_entry_has_translations(self):
+        for canonical in material_lexicon.PROPERTIES:
+            self.assertIn(canonical, material_lexicon.TRANSLATIONS)
+            self.assertEqual(material_lexicon.canonical_name(canonical, 'english'), canonical)
+
+    def test_indexes_are_read_only(self):
+        with self.assertRaises(TypeError):
+            material_lexicon.SURFACE_TO_CANONICAL['new'] = 'cotton'
+        with self.assertRaises(TypeError):
+            material_lexicon.PROPERTIES['cotton']['temp_range'] = (0, 0)
+
+    def test_recommender_uses_shared_lexicon(self):
+        recommender = ClothingRecommender()
+        self.assertEqual(recommender.normalize_material_name('ウール', 'japanese'), 'wool')
+        self.assertEqual(recommender.get_material_properties('綿', 'japanese')['temp_range'], (15, 30))
+        self.assertIs(recommender.material_properties, ClothingRecommender().material_properties)
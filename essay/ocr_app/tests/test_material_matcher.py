@@ -0,0 +1,40 @@
+from django.test import SimpleTestCase
+
+from ocr_app.services.material_matcher import MaterialMatcher
+from ocr_app.services.stub_backends import StubOCRProcessor
+
+
+class MaterialMatcherTests(SimpleTestCase):
+    def setUp(self):
+        forms = {k.lower(): k for k in ['綿', 'コットン', 'ポリエステル', 'ナイロン', 'ウール', 'lamb wool', 'cotton']}
+        self.matcher = MaterialMatcher(forms)
+
+    def test_exact_matches_keep_original_form(self):
+        self.assertEqual(self.matcher.extract('ポリエステル 65% 綿 35%'), ['ポリエステル', '綿'])
+        self.assertEqual(self.matcher.extract('Cotton 100%'), ['cotton'])
+
+    def test_fuzzy_matches_ocr_misreads(self):
+        self.assertEqual(self.matcher.extract('ポリエステノレ 100%'), ['ポリエステル'])
+        self.assertEqual(self.matcher.extract('ナイロソ'), ['ナイロン'])
+
+    def test_adjacent_words_are_merged(self):
+        self.assertEqual(self.matcher.extract('ポリ エステル'), ['ポリエステル'])
+
+    def test_results_are_unique_and_ordered(self):
+        self.assertEqual(self.matcher.extract('ウール 綿 ウール'), ['ウール', '綿'])
+
+    def test_unrelated_text(self):
+        self.assertEqual(self.matcher.extract('MADE IN CHINA'), [])
+        self.assertEqual(self.matcher.extract(''), [])
+
+    def test_match_lines_uses_containment_fallback(self):
+        results = self.matcher.match_lines(['ポリエステル', 'ナイロン裏', 'xyz'])
+        self.assertEqual(results, [(True, 'ポリエステル'), (True, 'ナイロン'), (False, None)])
+
+
+class PotentialMaterialTests(SimpleTestCase):
+    def test_lines_are_matched_and_separators_skipped(self):
+        processor = StubOCRProcessor()
+        self.assertEqual(processor.potential_materials(['ポリエステル', 'ナイロン裏', '--', '', 'MADE IN CHINA']),
+                         [(True, 'ポリエステル'), (True, 'ナイロン'), (False, None), (False, None), (False, None)])
+        self.assertEqual(processor.is_potential_material('綿 80%'), (True, '綿'))
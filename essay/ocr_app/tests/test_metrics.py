@@ -0,0 +1,94 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ocr_app.services import metrics, timing
+
+
+def sample(text, line_prefix):
+    for line in text.splitlines():
+        if line.startswith(line_prefix + ' '):
+            return float(line.rsplit(' ', 1)[1])
+    return None
+
+
+def write(directory, pid, values, histograms=None):
+    with open(os.path.join(directory, f'{pid}-old.json'), 'w') as f:
+        json.dump({'pid': pid, 'time': 0, 'values': values, 'histograms': histograms or {}}, f)
+
+
+def dead_pid():
+    proc = subprocess.Popen([sys.executable, '-c', 'pass'])
+    proc.wait()
+    return proc.pid
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        timing.reset_timings()
+        self.addCleanup(timing.reset_timings)
+
+    def test_counters_are_thread_safe(self):
+        registry = metrics.MetricsRegistry()
+        counter = registry.counter('test_total', 'Test counter', ['result'])
+
+        def work():
+            for _ in range(1000):
+                counter.inc(result='ok')
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(registry.values['test_total'][('ok',)], 8000)
+        with self.assertRaises(ValueError):
+            counter.inc(status='ok')
+
+    def test_render_prometheus_text(self):
+        before = sample(metrics.render(), 'clothing_weather_requests_total{result="error"}') or 0
+        metrics.WEATHER_REQUESTS.inc(result='error')
+        timing.record('ocr.detect', 0.003)
+
+        text = metrics.render()
+        self.assertIn('# TYPE clothing_weather_requests_total counter', text)
+        self.assertEqual(sample(text, 'clothing_weather_requests_total{result="error"}'), before + 1)
+        self.assertEqual(sample(text, 'clothing_stage_duration_seconds_bucket{stage="ocr.detect",le="0.005"}'), 1)
+        self.assertEqual(sample(text, 'clothing_stage_duration_seconds_bucket{stage="ocr.detect",le="+Inf"}'), 1)
+        self.assertEqual(sample(text, 'clothing_stage_duration_seconds_count{stage="ocr.detect"}'), 1)
+        self.assertEqual(sample(text, 'clothing_ingest_queue_jobs{status="pending"}'), 0)
+
+    def test_multiprocess_directory_is_aggregated(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        # 另一个仍在运行的worker（测试进程的父进程）和一个已经退出的worker留下的快照
+        write(directory, os.getppid(), {'clothing_ingest_jobs_total': [[['done'], 3]]})
+        write(directory, dead_pid(), {
+            'clothing_ingest_jobs_total': [[['done'], 5]],
+            'clothing_model_instances_loaded': [[['ocr'], 1]],
+        }, {'test.remote': {'counts': [2] + [0] * (len(timing.BUCKETS_MS) - 1), 'sum_ms': 1.0, 'count': 2}})
+
+        with override_settings(METRICS_MULTIPROCESS_DIR=directory):
+            metrics.INGEST_JOBS.inc(status='done')
+            local = metrics.REGISTRY.values[metrics.INGEST_JOBS.name][('done',)]
+            text = metrics.render()
+
+        # 已经退出的worker的快照被删除，不再计入
+        self.assertEqual(sample(text, 'clothing_ingest_jobs_total{status="done"}'), local + 3)
+        self.assertIsNone(sample(text, 'clothing_stage_duration_seconds_count{stage="test.remote"}'))
+        self.assertNotIn('clothing_model_instances_loaded{model="ocr"} 1', text)
+        self.assertEqual(sorted(name.split('-')[0] for name in os.listdir(directory)),
+                         sorted([str(os.getpid()), str(os.getppid())]))
+
+    def test_metrics_view(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        self.assertIn('# TYPE clothing_stage_duration_seconds histogram', response.content.decode())
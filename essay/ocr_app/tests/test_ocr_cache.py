@@ -0,0 +1,45 @@
+from django.test import TestCase
+
+from ocr_app.models import OCRResultCache
+from ocr_app.services.ocr_cache import OCRCache
+
+
+class OCRCacheTests(TestCase):
+    def setUp(self):
+        self.cache = OCRCache(max_entries=2)
+
+    def store(self, key, materials):
+        self.cache.set(key, detected_texts=[{'text': key, 'confidence': 0.9}],
+                       recognized_texts=[key], materials=materials)
+
+    def test_hit_and_miss_counters(self):
+        self.store('a' * 64, ['綿'])
+
+        self.assertIsNone(self.cache.get('b' * 64))
+        result = self.cache.get('a' * 64)
+
+        self.assertEqual(result['materials'], ['綿'])
+        self.assertTrue(result['cached'])
+        stats = self.cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_ratio'], 0.5)
+        self.assertEqual(OCRResultCache.objects.get(key='a' * 64).hits, 1)
+
+    def test_evicts_least_recently_used(self):
+        """超出容量时淘汰最久未使用的条目，而不是最早写入的条目"""
+        self.store('a' * 64, ['綿'])
+        self.store('b' * 64, ['ナイロン'])
+        self.cache.get('a' * 64)
+        self.store('c' * 64, ['ウール'])
+
+        keys = set(OCRResultCache.objects.values_list('key', flat=True))
+        self.assertEqual(keys, {'a' * 64, 'c' * 64})
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_get_many_single_query(self):
+        self.store('a' * 64, ['綿'])
+        self.store('b' * 64, ['ナイロン'])
+        with self.assertNumQueries(2):
+            found = self.cache.get_many(['a' * 64, 'b' * 64, 'c' * 64])
+        self.assertEqual(set(found), {'a' * 64, 'b' * 64})
@@ -0,0 +1,72 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ocr_app.models import ClothingImage
+from ocr_app.services.pagination import InvalidCursor, decode_cursor, encode_cursor, paginate
+from ocr_app.tests.helpers import make_wardrobe
+
+TEXT = '綿 100%' * 50
+
+
+class PaginateTests(TestCase):
+    def test_walks_every_item_once_in_order(self):
+        expected = make_wardrobe(23)
+        seen = []
+        page = paginate(ClothingImage.objects.all(), size=5)
+        seen += [item.id for item in page.items]
+        while page.has_next:
+            page = paginate(ClothingImage.objects.all(), page.next_cursor, size=5)
+            seen += [item.id for item in page.items]
+        self.assertEqual(seen, expected)
+
+    def test_cursor_round_trip_and_invalid_cursor(self):
+        make_wardrobe(1)
+        item = ClothingImage.objects.get()
+        self.assertEqual(decode_cursor(encode_cursor(item)), (item.created_at, item.id))
+        for cursor in ('***', 'bm90LWEtY3Vyc29y', ''):
+            with self.assertRaises(InvalidCursor):
+                decode_cursor(cursor)
+
+
+@override_settings(CLOTHING_PAGE_SIZE=4)
+class ListViewTests(TestCase):
+    def test_clothing_list_pages(self):
+        expected = make_wardrobe(10)
+        url = reverse('clothing_list')
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual([c.id for c in response.context['clothing_images']], expected[:4])
+        self.assertIsNone(response.context['first_url'])
+
+        response = self.client.get(response.context['next_url'])
+        self.assertEqual([c.id for c in response.context['clothing_images']], expected[4:8])
+        self.assertEqual(response.context['first_url'], url)
+        self.assertContains(response, 'Older items')
+
+        self.assertEqual(self.client.get(url, {'cursor': 'garbage'}).status_code, 404)
+
+    def test_image_check_defers_text(self):
+        make_wardrobe(6, recognized_text=TEXT)
+        response = self.client.get(reverse('image_check'))
+        images = response.context['images']
+        self.assertEqual(len(images), 4)
+        self.assertLessEqual({'recognized_text', 'materials'}, images[0].get_deferred_fields())
+
+    def test_json_list(self):
+        expected = make_wardrobe(6, recognized_text=TEXT)
+        url = reverse('clothing_list_json')
+        data = self.client.get(url).json()
+        self.assertEqual([item['id'] for item in data['items']], expected[:4])
+        self.assertNotIn('recognized_text', data['items'][0])
+        self.assertTrue(data['items'][0]['image_url'].startswith('/media/clothing_images/'))
+
+        data = self.client.get(data['next_url']).json()
+        self.assertEqual([item['id'] for item in data['items']], expected[4:])
+        self.assertIsNone(data['next_cursor'])
+        self.assertIsNone(data['next_url'])
+
+        data = self.client.get(url, {'fields': 'text'}).json()
+        self.assertEqual(data['items'][0]['recognized_text'], TEXT)
+        self.assertIn('fields=text', data['next_url'])
+
+        self.assertEqual(self.client.get(url, {'cursor': 'garbage'}).status_code, 400)
@@ -0,0 +1,128 @@
+import json
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from ocr_app.models import ClothingImage, WardrobeVersion
+from ocr_app.services import recommendation_cache, suitability
+from ocr_app.services.weather_service import WeatherService
+
+def locmem(location):
+    return {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'recommendations': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': location},
+    }
+
+
+LOCMEM = locmem('recommendations-test')
+# 另一个 worker 进程：自己的进程内缓存，共享同一个数据库
+OTHER_WORKER = locmem('recommendations-other-worker')
+
+
+def weather(temperature, humidity=60, condition='Clouds'):
+    return {'weather': {'temperature': temperature, 'humidity': humidity, 'condition': condition}}
+
+
+class WeatherBucketTests(SimpleTestCase):
+    def test_buckets(self):
+        self.assertEqual(recommendation_cache.weather_bucket(
+            {'temperature': 17.9, 'humidity': 74, 'condition': 'Rain'}), (17, 70, 'Rain'))
+        self.assertEqual(recommendation_cache.weather_bucket(
+            {'temperature': -0.5, 'humidity': 75, 'condition': 'Snow'}), (-1, 75, 'Snow'))
+        self.assertEqual(recommendation_cache.bucketed_weather({'temperature': 24.99, 'humidity': 50}),
+                         {'temperature': 24, 'humidity': 50, 'condition': 'Clear'})
+
+
+@override_settings(CACHES=LOCMEM)
+class RecommendationCacheTests(TestCase):
+    def setUp(self):
+        recommendation_cache.clear()
+        suitability.clear_matrix()
+        self.addCleanup(suitability.clear_matrix)
+        self.item = self.create_item('longsleeve')
+
+    def create_item(self, category, materials=('綿',)):
+        # 版本在事务提交后递增，TestCase 中要手动执行 on_commit 回调
+        with self.captureOnCommitCallbacks(execute=True):
+            item = ClothingImage(image=f'clothing_images/{category}.jpg', category=category,
+                                 materials=list(materials))
+            # save_base 跳过 ClothingImage.save 中对图片文件的处理，仍然发送 post_save
+            item.save_base()
+        return item
+
+    def query(self, city, data):
+        with mock.patch.object(WeatherService, 'get_weather_by_city', return_value=data):
+            return self.client.post(reverse('query'), {'city': city})
+
+    def test_same_weather_bucket_served_from_cache(self):
+        first = self.query('Tokyo', weather(17.2))
+        # 只读取衣柜版本
+        with self.assertNumQueries(1):
+            second = self.query('Yokohama', weather(17.8, humidity=62))
+        self.assertEqual(second.context['recommendations'], first.context['recommendations'])
+        # 建议文本仍然按实际温度生成
+        self.assertIn('17.8°C', second.context['recommendation_text'])
+
+    def test_save_and_delete_invalidate(self):
+        self.assertEqual(len(self.query('Tokyo', weather(17)).context['recommendations']), 1)
+        self.create_item('pant')
+        self.assertEqual(len(self.query('Tokyo', weather(17)).context['recommendations']), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.delete()
+        self.assertEqual(len(self.query('Tokyo', weather(17)).context['recommendations']), 1)
+
+    def test_version_is_bumped_only_after_commit(self):
+        version = recommendation_cache.wardrobe_version()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.item.save_base()
+            self.assertEqual(recommendation_cache.wardrobe_version(), version)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(recommendation_cache.wardrobe_version(), version + 1)
+
+    def test_changes_in_another_worker_invalidate(self):
+        self.assertEqual(len(self.query('Tokyo', weather(17)).context['recommendations']), 1)
+        with self.settings(CACHES=OTHER_WORKER):
+            self.create_item('pant')
+        self.assertEqual(len(self.query('Tokyo', weather(17)).context['recommendations']), 2)
+        with self.settings(CACHES=OTHER_WORKER), self.captureOnCommitCallbacks(execute=True):
+            self.item.delete()
+        self.assertEqual(len(self.query('Tokyo', weather(17)).context['recommendations']), 1)
+
+    def test_bulk_updates_from_commands_invalidate(self):
+        self.query('Tokyo', weather(17))
+        with self.settings(CACHES=OTHER_WORKER):
+            # 管理命令在自己的进程中 bulk_update 之后递增版本
+            ClothingImage.objects.filter(pk=self.item.pk).update(category='tshirt')
+            with self.captureOnCommitCallbacks(execute=True):
+                recommendation_cache.bump_wardrobe_version()
+        self.assertEqual(self.query('Tokyo', weather(17)).context['recommendations'], [])
+
+    def test_missing_version_row_does_not_reuse_old_keys(self):
+        version = recommendation_cache.wardrobe_version()
+        WardrobeVersion.objects.all().delete()
+        self.assertGreater(recommendation_cache.wardrobe_version(), version)
+        self.assertEqual(WardrobeVersion.objects.count(), 1)
+
+    @override_settings(RECOMMENDATION_RANKING='suitability')
+    def test_suitability_ranking_keyed_by_weather_bucket(self):
+        self.create_item('longsleeve', ['ウール'])
+        cold = [item['materials'] for item in self.query('Sapporo', weather(0.2, condition='Snow'))
+                .context['recommendations'] if item['category'] == 'Long Sleeve']
+        self.assertEqual(cold, [['ウール'], ['綿']])
+        with self.assertNumQueries(1):
+            self.query('Asahikawa', weather(0.9, humidity=64, condition='Snow'))
+        # 不同的档重新打分：衣柜版本、衣物数量（矩阵已缓存）和取出衣物
+        with self.assertNumQueries(3):
+            self.query('Sapporo', weather(9, condition='Snow'))
+
+    def test_batch_query_uses_the_cache(self):
+        self.query('Tokyo', weather(17))
+        with mock.patch.object(WeatherService, 'aget_weather_by_city', return_value=weather(17.5)):
+            with self.assertNumQueries(1):
+                response = self.client.post(reverse('query_batch'), json.dumps({'cities': ['Osaka', 'Kyoto']}),
+                                            content_type='application/json')
+        first, second = response.json()['results']
+        self.assertEqual(len(first['recommendations']), 1)
+        self.assertEqual(first['recommendations'], second['recommendations'])
@@ -0,0 +1,214 @@
+import asyncio
+import json
+import threading
+import time
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ocr_app.models import ClothingImage
+from ocr_app import views
+from ocr_app.services import weather_service
+from ocr_app.services.recommender import ClothingRecommender
+from ocr_app.services.stub_weather import StubWeatherServer
+from ocr_app.services.weather_service import WeatherService
+from ocr_app.tests.helpers import make_wardrobe
+from ocr_app.views import recommended_items
+
+COOL = {'weather': {'temperature': 17, 'humidity': 60, 'condition': 'Clouds'}}
+
+
+@mock.patch.object(WeatherService, 'get_weather_by_city', return_value=COOL)
+class QueryViewTests(TestCase):
+    def test_single_filtered_query(self, weather):
+        make_wardrobe(20)
+        # 衣柜版本和一次按类别过滤的查询
+        with self.assertNumQueries(2):
+            response = self.client.post(reverse('query'), {'city': 'Tokyo'})
+
+        items = response.context['recommendations']
+        # 15~20℃ 推荐长袖和长裤
+        self.assertEqual(len(items), 10)
+        self.assertEqual({item['category'] for item in items}, {'Long Sleeve', 'Pants'})
+        self.assertTrue(all(item['image_url'].startswith('/media/clothing_images/') for item in items))
+
+    @override_settings(RECOMMENDATION_MAX_ITEMS=3)
+    def test_newest_items_up_to_limit(self, weather):
+        make_wardrobe(20)
+        response = self.client.post(reverse('query'), {'city': 'Tokyo'})
+
+        ids = [item['id'] for item in response.context['recommendations']]
+        expected = list(ClothingImage.objects.filter(category__in=['longsleeve', 'pant'])
+                        .values_list('id', flat=True)[:3])
+        self.assertEqual(ids, expected)
+
+
+class RecommenderTests(TestCase):
+    def test_get_recommendation_filters_querysets_in_the_database(self):
+        make_wardrobe(8)
+        recommender = ClothingRecommender()
+        weather = COOL['weather']
+
+        with self.assertNumQueries(1):
+            from_queryset = recommender.get_recommendation(ClothingImage.objects.all(), weather)
+        from_list = recommender.get_recommendation(list(ClothingImage.objects.all()), weather)
+        self.assertEqual(from_queryset['items'], from_list['items'])
+        self.assertEqual(recommender.get_advice(weather)['categories'], ['longsleeve', 'pant'])
+
+    @skipUnless(connection.vendor == 'sqlite', 'SQLite query plan')
+    def test_newest_items_use_the_composite_index_without_statistics(self):
+        make_wardrobe(200)
+        queryset = recommended_items(['longsleeve', 'pant'])
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            plan = ' '.join(str(row) for row in cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall())
+        self.assertIn('clothing_category_recent_idx', plan)
+
+
+class AsyncQueryViewTests(TestCase):
+    def setUp(self):
+        self.server = StubWeatherServer(temperature=17).start()
+        self.addCleanup(self.server.stop)
+        api = override_settings(WEATHER_API_URL=self.server.url)
+        api.enable()
+        self.addCleanup(api.disable)
+        weather_service.clear_cache()
+        self.addCleanup(weather_service.clear_cache)
+
+    @override_settings(RECOMMENDATION_MAX_ITEMS=5)
+    def test_same_recommendations_as_sync_view(self):
+        make_wardrobe(20)
+        expected = self.client.post(reverse('query'), {'city': 'Tokyo'}).context['recommendations']
+        self.assertEqual(len(expected), 5)
+
+        response = async_to_sync(self.async_client.post)(reverse('query_async'), {'city': 'Tokyo'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['recommendations'], expected)
+        self.assertIn('Server-Timing', response)
+
+    @override_settings(RECOMMENDATION_MAX_ITEMS=0)
+    def test_unlimited(self):
+        make_wardrobe(8)
+        response = async_to_sync(self.async_client.post)(reverse('query_async'), {'city': 'Tokyo'})
+        self.assertEqual(len(response.context['recommendations']), 4)
+
+    def test_weather_error(self):
+        self.server.status = 500
+        response = async_to_sync(self.async_client.post)(reverse('query_async'), {'city': 'Nowhere'})
+        self.assertContains(response, 'Unable to get weather information')
+
+    def test_wardrobe_loaded_while_weather_is_pending(self):
+        loaded = threading.Event()
+        load_wardrobe = views.load_wardrobe
+
+        def load():
+            loaded.set()
+            return load_wardrobe()
+
+        async def weather_after_load(service, city):
+            # 衣柜在天气返回之前就开始读取，否则这里等到超时
+            for _ in range(200):
+                if loaded.is_set():
+                    return COOL
+                await asyncio.sleep(0.01)
+            return {'error': 'wardrobe was not loaded concurrently'}
+
+        make_wardrobe(8)
+        with mock.patch.object(views, 'load_wardrobe', load), \
+                mock.patch.object(WeatherService, 'aget_weather_by_city', weather_after_load):
+            response = async_to_sync(self.async_client.post)(reverse('query_async'), {'city': 'Tokyo'})
+            self.assertEqual(len(response.context['recommendations']), 4)
+            loaded.clear()
+            results = self.query_batch(['Tokyo', 'Osaka'])
+        self.assertEqual([len(result['recommendations']) for result in results], [4, 4])
+
+    def query_batch(self, cities):
+        return async_to_sync(self.async_client.post)(
+            reverse('query_batch'), json.dumps({'cities': cities}), content_type='application/json',
+        ).json()['results']
+
+
+class BatchQueryTests(TestCase):
+    def setUp(self):
+        self.server = StubWeatherServer(temperature=17).start()
+        self.addCleanup(self.server.stop)
+        api = override_settings(WEATHER_API_URL=self.server.url)
+        api.enable()
+        self.addCleanup(api.disable)
+        weather_service.clear_cache()
+        self.addCleanup(weather_service.clear_cache)
+
+    def query(self, payload):
+        return async_to_sync(self.async_client.post)(
+            reverse('query_batch'), json.dumps(payload), content_type='application/json')
+
+    def test_duplicate_cities_fetched_once(self):
+        make_wardrobe(8)
+        self.server.temperatures = {'sapporo': 5, 'naha': 31}
+        response = self.query({'cities': ['Sapporo', 'Naha', ' sapporo ', 'SAPPORO']})
+        self.assertEqual(response.status_code, 200)
+
+        results = response.json()['results']
+        self.assertEqual([r['city'] for r in results], ['Sapporo', 'Naha', 'sapporo', 'SAPPORO'])
+        self.assertEqual(sorted(self.server.requests), ['naha', 'sapporo'])
+        self.assertEqual(results[0]['categories'], ['longsleeve', 'pant'])
+        self.assertEqual(results[1]['categories'], ['tshirt', 'shortpant'])
+        self.assertEqual(results[1]['weather']['temperature'], 31)
+        self.assertEqual({r['category'] for r in results[1]['recommendations']}, {'T-shirt', 'Short Pants'})
+        self.assertEqual(results[2]['recommendations'], results[0]['recommendations'])
+
+    @override_settings(RECOMMENDATION_MAX_ITEMS=3)
+    def test_missed_categories_read_in_one_query(self):
+        make_wardrobe(20)
+        self.server.temperatures = {'sapporo': 5, 'naha': 31}
+        cities = ['Sapporo', 'Naha', 'Tokyo']
+        self.query({'cities': cities})
+        # 天气已经缓存：衣柜版本和一次取出所有推荐类别的查询
+        with self.assertNumQueries(2):
+            results = self.query({'cities': cities}).json()['results']
+
+        for result in results:
+            expected = self.query({'cities': [result['city']]}).json()['results'][0]['recommendations']
+            self.assertEqual(len(expected), 3)
+            self.assertEqual(result['recommendations'], expected)
+        self.assertEqual({r['category'] for r in results[1]['recommendations']}, {'T-shirt', 'Short Pants'})
+        newest = list(ClothingImage.objects.filter(category__in=['tshirt', 'shortpant'])
+                      .values_list('id', flat=True)[:3])
+        self.assertEqual([r['id'] for r in results[1]['recommendations']], newest)
+
+    @override_settings(RECOMMENDATION_MAX_ITEMS=5)
+    def test_same_recommendations_as_query_view(self):
+        make_wardrobe(20)
+        expected = self.client.post(reverse('query'), {'city': 'Tokyo'}).context['recommendations']
+        result = self.query({'cities': ['Tokyo']}).json()['results'][0]
+        self.assertEqual(result['recommendations'], expected)
+        self.assertEqual(result['recommendation_text'], self.client.post(
+            reverse('query'), {'city': 'Tokyo'}).context['recommendation_text'])
+
+    def test_weather_fetched_concurrently(self):
+        self.server.delay = 0.3
+        started = time.perf_counter()
+        results = self.query({'cities': [f'city-{i}' for i in range(6)]}).json()['results']
+        # 依次请求需要 1.8 秒
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertEqual(len(results), 6)
+        self.assertEqual(self.server.request_count, 6)
+
+    def test_weather_error_per_city(self):
+        self.server.status = 500
+        response = self.query({'cities': ['Nowhere']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'],
+                         [{'city': 'Nowhere', 'error': 'Unable to get weather information'}])
+
+    @override_settings(BATCH_QUERY_MAX_CITIES=2)
+    def test_invalid_requests(self):
+        for payload in ({}, {'cities': 'Tokyo'}, {'cities': [' ']}, {'cities': ['a', 'b', 'c']}, [1]):
+            with self.subTest(payload=payload):
+                self.assertEqual(self.query(payload).status_code, 400)
+        response = async_to_sync(self.async_client.get)(reverse('query_batch'))
+        self.assertEqual(response.status_code, 405)
+        self.assertEqual(self.server.request_count, 0)
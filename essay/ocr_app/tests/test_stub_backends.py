@@ -0,0 +1,81 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from PIL import Image
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from ocr_app.models import ClothingImage
+from ocr_app.services import engine_registry
+from ocr_app.services.stub_backends import StubImageClassifier, StubOCRProcessor
+from ocr_app.tests.helpers import make_image
+
+STUBS = {
+    'OCR_BACKEND': 'ocr_app.services.stub_backends.StubOCRProcessor',
+    'CLASSIFIER_BACKEND': 'ocr_app.services.stub_backends.StubImageClassifier',
+}
+
+
+class StubBackendTests(SimpleTestCase):
+    def test_registries_use_configured_backends(self):
+        with override_settings(**STUBS), mock.patch.dict(engine_registry._registries, clear=True):
+            with engine_registry.get_ocr_registry().acquire() as ocr:
+                self.assertIsInstance(ocr, StubOCRProcessor)
+            with engine_registry.get_classifier_registry().acquire() as classifier:
+                self.assertIsInstance(classifier, StubImageClassifier)
+
+    @override_settings(STUB_OCR_TEXTS=['綿 100%'])
+    def test_stub_ocr_returns_canned_texts(self):
+        image = Image.new('RGB', (60, 40), 'white')
+        result = StubOCRProcessor().process_image(image_bytes(image))
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['recognized_texts'], ['綿 100%'])
+        self.assertIn('綿', result['materials'])
+
+    def test_stub_classifier_is_deterministic(self):
+        classifier = StubImageClassifier()
+        first = classifier.extract_features([classifier.decode_image(image_bytes(Image.new('RGB', (8, 8), 'red')))])
+        second = classifier.extract_features([classifier.decode_image(image_bytes(Image.new('RGB', (8, 8), 'red')))])
+        self.assertTrue((first == second).all())
+        self.assertEqual(classifier.classify_features(first), classifier.classify_features(second))
+        with override_settings(STUB_CLASSIFIER_CATEGORY='pant'):
+            self.assertEqual(StubImageClassifier().classify_features(first)[0]['category'], 'pant')
+
+
+def image_bytes(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+@override_settings(INGEST_INLINE=True, STUB_CLASSIFIER_CATEGORY='tshirt', **STUBS)
+class StubPipelineTests(TransactionTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        registries = mock.patch.dict(engine_registry._registries, clear=True)
+        registries.start()
+        self.addCleanup(registries.stop)
+
+    def test_upload_runs_full_pipeline_offline(self):
+        response = self.client.post(
+            reverse('batch_upload'),
+            {
+                'clothing_images[]': [make_image('a.png', 'red'), make_image('b.png', 'blue')],
+                'label_images[]': [make_image('la.png', 'white'), make_image('lb.png', 'gray')],
+            },
+            HTTP_ACCEPT='application/json',
+        )
+        self.assertEqual(response.status_code, 202)
+        status = self.client.get(response.json()['status_url']).json()
+        self.assertTrue(status['finished'])
+        self.assertEqual(status['counts']['done'], 2)
+
+        clothing = ClothingImage.objects.order_by('id')
+        self.assertEqual([c.category for c in clothing], ['tshirt', 'tshirt'])
+        self.assertEqual(clothing[0].materials, ['綿', 'ポリエステル'])
@@ -0,0 +1,131 @@
+import json
+import random
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from ocr_app.models import ClothingImage
+from ocr_app.services import suitability
+from ocr_app.services.recommender import ClothingRecommender
+from ocr_app.services.suitability import WardrobeMatrix, composition
+from ocr_app.services.weather_service import WeatherService
+
+COLD = {'temperature': 2, 'humidity': 50, 'condition': 'Snow'}
+HOT = {'temperature': 32, 'humidity': 60, 'condition': 'Clear'}
+
+
+class CompositionTests(SimpleTestCase):
+    def test_percentages_from_label_text(self):
+        self.assertEqual(composition(['綿', 'ポリエステル'], '表地 綿 80% ポリエステル20％'),
+                         {'cotton': 0.8, 'polyester': 0.2})
+
+    def test_materials_without_percentage_share_the_rest(self):
+        shares = composition(['綿', 'ウール', 'ナイロン'], '綿 50%')
+        self.assertAlmostEqual(shares['cotton'], 0.5)
+        self.assertAlmostEqual(shares['wool'], 0.25)
+        self.assertAlmostEqual(shares['nylon'], 0.25)
+
+    def test_equal_shares_and_unknown_materials(self):
+        self.assertEqual(composition(['ウール', '???'], ''), {'wool': 0.5, '???': 0.5})
+        self.assertEqual(composition([], '綿 100%'), {})
+        self.assertEqual(composition(None), {})
+
+
+class ScoringTests(SimpleTestCase):
+    def matrix(self, *materials):
+        return WardrobeMatrix.from_rows(
+            (i, 'longsleeve', item_materials, '') for i, item_materials in enumerate(materials)
+        )
+
+    def test_scores_follow_material_properties(self):
+        matrix = self.matrix(['ウール'], ['麻'], ['綿'], [])
+        wool, linen, cotton, unknown = matrix.scores(COLD)
+        self.assertGreater(wool, cotton)
+        self.assertGreater(cotton, linen)
+        self.assertAlmostEqual(float(unknown), suitability.UNKNOWN_SCORE)
+
+        wool, linen, cotton, unknown = matrix.scores(HOT)
+        self.assertGreater(linen, cotton)
+        self.assertGreater(cotton, wool)
+
+    def test_top_k_matches_a_full_sort(self):
+        rng = random.Random(0)
+        choices = [['綿'], ['綿', 'ポリエステル'], ['ウール'], ['麻'], ['カシミヤ'], [], ['デニム', 'ポリウレタン']]
+        rows = [(pk, rng.choice(['tshirt', 'pant', 'longsleeve']), rng.choice(choices),
+                 rng.choice(['', '綿 60% ポリエステル 40%']))
+                for pk in range(1000, 0, -1)]
+        matrix = WardrobeMatrix.from_rows(rows)
+        scores = matrix.scores(COLD)
+
+        ranked = matrix.top_k(COLD, 7, ['pant', 'longsleeve', 'shortpant'])
+        self.assertEqual(list(ranked), ['pant', 'longsleeve', 'shortpant'])
+        self.assertEqual(ranked['shortpant'], [])
+        for category in ('pant', 'longsleeve'):
+            # 参照实现：稳定排序，分数相同时保持行的顺序
+            expected = sorted(
+                (i for i, row in enumerate(rows) if row[1] == category), key=lambda i: -scores[i]
+            )[:7]
+            self.assertEqual([pk for pk, _ in ranked[category]], [rows[i][0] for i in expected])
+        self.assertEqual(len(matrix.top_k(COLD, 5000)['tshirt']), sum(row[1] == 'tshirt' for row in rows))
+
+    def test_empty_wardrobe(self):
+        matrix = WardrobeMatrix.from_rows([])
+        self.assertEqual(len(matrix.scores(HOT)), 0)
+        self.assertEqual(matrix.top_k(HOT, 3, ['pant']), {'pant': []})
+
+
+def make_wardrobe():
+    """每个类别各一件羊毛、麻、棉；按创建顺序，棉最新"""
+    ClothingImage.objects.bulk_create([
+        ClothingImage(image=f'clothing_images/{category}-{material}.jpg', category=category,
+                      materials=[material], recognized_text=f'{material} 100%')
+        for material in ('ウール', '麻', '綿')
+        for category in ('tshirt', 'pant', 'longsleeve', 'shortpant')
+    ])
+
+
+class RankedRecommendationTests(TestCase):
+    def setUp(self):
+        suitability.clear_matrix()
+        self.addCleanup(suitability.clear_matrix)
+
+    def test_get_recommendation_ranks_by_material(self):
+        make_wardrobe()
+        result = ClothingRecommender().get_recommendation(ClothingImage.objects.all(), COLD)
+        self.assertEqual([item['materials'] for item in result['items']][:2], [['ウール'], ['ウール']])
+        scores = [item['suitability'] for item in result['items']]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_matrix_is_cached_until_the_wardrobe_changes(self):
+        make_wardrobe()
+        matrix = suitability.wardrobe_matrix()
+        # 衣柜版本和衣物数量
+        with self.assertNumQueries(2):
+            self.assertIs(suitability.wardrobe_matrix(), matrix)
+        ClothingImage.objects.bulk_create([ClothingImage(image='clothing_images/new.jpg', category='pant')])
+        self.assertEqual(len(suitability.wardrobe_matrix()), 13)
+
+    @override_settings(RECOMMENDATION_RANKING='suitability', RECOMMENDATION_TOP_K=2)
+    @mock.patch.object(WeatherService, 'get_weather_by_city', return_value={'weather': COLD})
+    def test_query_view(self, weather):
+        make_wardrobe()
+        response = self.client.post(reverse('query'), {'city': 'Sapporo'})
+        items = response.context['recommendations']
+        # 寒冷：长袖和长裤，每个类别羊毛最适合、其次是棉
+        self.assertEqual([(item['category'], item['materials']) for item in items], [
+            ('Long Sleeve', ['ウール']), ('Long Sleeve', ['綿']), ('Pants', ['ウール']), ('Pants', ['綿']),
+        ])
+        self.assertContains(response, 'Material match:')
+
+    @override_settings(RECOMMENDATION_RANKING='suitability', RECOMMENDATION_TOP_K=1)
+    @mock.patch.object(WeatherService, 'aget_weather_by_city')
+    def test_batch_query(self, weather):
+        weather.side_effect = lambda city: {'weather': {'Naha': HOT, 'Sapporo': COLD}[city]}
+        make_wardrobe()
+        response = self.client.post(reverse('query_batch'), json.dumps({'cities': ['Naha', 'Sapporo']}),
+                                    content_type='application/json')
+        naha, sapporo = response.json()['results']
+        self.assertEqual([item['materials'] for item in naha['recommendations']], [['麻'], ['麻']])
+        self.assertEqual([item['materials'] for item in sapporo['recommendations']], [['ウール'], ['ウール']])
+        self.assertTrue(all(0 <= item['suitability'] <= 1 for item in naha['recommendations']))
@@ -0,0 +1,109 @@
+import io
+import os
+import shutil
+import tempfile
+
+import pillow_heif
+from PIL import Image
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ocr_app.models import ClothingImage
+from ocr_app.services import thumbnails
+from ocr_app.services.recommender import ClothingRecommender
+
+
+def jpeg(size=(2000, 1500), color=(200, 40, 40)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='JPEG', quality=95)
+    return buffer.getvalue()
+
+
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def make_clothing(self, data=None):
+        clothing = ClothingImage(category='longsleeve', materials=['綿'])
+        clothing.image.save('shirt.jpg', ContentFile(data or jpeg()), save=False)
+        clothing.label_image.save('label.jpg', ContentFile(jpeg((800, 600), 'white')), save=False)
+        clothing.save()
+        return clothing
+
+    def test_render_sizes(self):
+        original = jpeg()
+        rendered = thumbnails.render_thumbnails(original)
+        self.assertEqual(set(rendered), {128, 512})
+        for size, content in rendered.items():
+            image = Image.open(io.BytesIO(content))
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(max(image.size), size)
+        # 页面体积至少小一个数量级
+        self.assertLess(len(rendered[512]) * 10, len(original))
+
+    def test_render_heic(self):
+        buffer = io.BytesIO()
+        pillow_heif.from_pillow(Image.new('RGB', (1600, 1200), (40, 120, 200))).save(buffer)
+        rendered = thumbnails.render_thumbnails(buffer.getvalue())
+        image = Image.open(io.BytesIO(rendered[512]))
+        self.assertEqual((image.format, image.size), ('WEBP', (512, 384)))
+
+    def test_generate_and_delete(self):
+        clothing = self.make_clothing()
+        self.assertEqual(clothing.thumbnail_url, clothing.image.url)
+
+        self.assertEqual(thumbnails.generate_thumbnails(clothing), ['image', 'label_image'])
+        clothing.save()
+        clothing.refresh_from_db()
+        self.assertTrue(clothing.thumbnail_url.endswith('.webp'))
+        self.assertIn('/thumbnails/128/', clothing.thumbnail_small_url)
+        self.assertIn('/thumbnails/512/', clothing.label_thumbnail_url)
+
+        items = ClothingRecommender().format_items([clothing])
+        self.assertEqual(items[0]['image_url'], clothing.thumbnail_url)
+        self.assertEqual(items[0]['label_image_original'], clothing.label_image.url)
+
+        paths = [os.path.join(self.media_root, name)
+                 for sizes in clothing.renditions.values() for name in sizes.values()]
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+        clothing.delete()
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+
+    def test_delete_all_removes_thumbnails(self):
+        paths = []
+        for _ in range(2):
+            clothing = self.make_clothing()
+            thumbnails.generate_thumbnails(clothing)
+            clothing.save()
+            paths += [os.path.join(self.media_root, name)
+                      for sizes in clothing.renditions.values() for name in sizes.values()]
+        self.assertTrue(all(os.path.exists(path) for path in paths))
+
+        response = self.client.post(reverse('delete_all_clothing'))
+        self.assertEqual(response.json()['deleted_count'], 2)
+        self.assertFalse(any(os.path.exists(path) for path in paths))
+
+    def test_command_fills_missing_thumbnails(self):
+        done = self.make_clothing()
+        thumbnails.generate_thumbnails(done)
+        done.save()
+        missing = self.make_clothing()
+        broken = self.make_clothing(b'not an image')
+
+        out, err = io.StringIO(), io.StringIO()
+        call_command('generate_thumbnails', stdout=out, stderr=err)
+
+        missing.refresh_from_db()
+        broken.refresh_from_db()
+        self.assertEqual(set(missing.renditions), {'image', 'label_image'})
+        # 衣物图片无法解码：只有标签有缩略图，页面继续显示原图
+        self.assertEqual(set(broken.renditions), {'label_image'})
+        self.assertEqual(broken.thumbnail_url, broken.image.url)
+        self.assertIn('Generated thumbnails for 2 of 2 records, 1 failed', out.getvalue())
+        self.assertIn(f'record {broken.id}', err.getvalue())
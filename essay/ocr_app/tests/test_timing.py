@@ -0,0 +1,68 @@
+import threading
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from ocr_app.services import timing
+
+
+class TimingTests(SimpleTestCase):
+    def setUp(self):
+        timing.reset_timings()
+        self.addCleanup(timing.reset_timings)
+
+    def test_context_manager_and_decorator_feed_histograms(self):
+        @timing.timed('test.decorated')
+        def work(value):
+            return value * 2
+
+        with timing.timed('test.block'):
+            pass
+        self.assertEqual(work(2), 4)
+        self.assertEqual(work(3), 6)
+
+        stats = timing.timing_stats()
+        self.assertEqual(stats['test.block']['count'], 1)
+        self.assertEqual(stats['test.decorated']['count'], 2)
+        self.assertEqual(sum(stats['test.decorated']['buckets'].values()), 2)
+
+    def test_quantiles_from_buckets(self):
+        for ms in [3] * 90 + [400] * 10:
+            timing.record('test.stage', ms / 1000)
+
+        stats = timing.timing_stats()['test.stage']
+        self.assertEqual(stats['p50_ms'], 5)
+        self.assertEqual(stats['p99_ms'], 400)
+        self.assertEqual(stats['max_ms'], 400)
+
+    def test_request_collection_and_header(self):
+        with timing.collect_request_timings() as timings:
+            timing.record('ocr.detect', 0.010)
+            timing.record('ocr.detect', 0.020)
+            timing.record('db.save', 0.001)
+        timing.record('outside', 0.001)
+
+        self.assertEqual([stage for stage, _ in timings], ['ocr.detect', 'ocr.detect', 'db.save'])
+        self.assertEqual(
+            timing.server_timing_header(timings, total_ms=50),
+            'ocr.detect;dur=30.0;desc="x2", db.save;dur=1.0, total;dur=50.0',
+        )
+
+    def test_concurrent_records(self):
+        def worker():
+            for _ in range(1000):
+                timing.record('test.threads', 0.001)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(timing.timing_stats()['test.threads']['count'], 4000)
+
+    def test_server_timing_header_and_metrics_view(self):
+        response = self.client.get(reverse('metrics_timings'))
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+        stats = self.client.get(reverse('metrics_timings')).json()['stages']
+        self.assertEqual(stats['view.metrics_timings']['count'], 1)
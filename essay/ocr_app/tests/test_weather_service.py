@@ -0,0 +1,148 @@
+import asyncio
+import time
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from ocr_app.models import WeatherData
+from ocr_app.services import weather_service
+from ocr_app.services.stub_weather import StubWeatherServer
+from ocr_app.services.weather_service import WeatherService
+
+
+class StubServerMixin:
+    server_options = {}
+
+    def setUp(self):
+        self.server = StubWeatherServer(temperature=12, **self.server_options).start()
+        self.addCleanup(self.server.stop)
+        api = override_settings(WEATHER_API_URL=self.server.url, WEATHER_CACHE_TTL=600, WEATHER_STALE_TTL=3600)
+        api.enable()
+        self.addCleanup(api.disable)
+        weather_service.clear_cache()
+        self.addCleanup(weather_service.clear_cache)
+
+    def age_cache(self, city, seconds):
+        key = weather_service.normalize_city(city)
+        fetched_at, result = weather_service._cache[key]
+        weather_service._cache[key] = (fetched_at - seconds, result)
+
+
+class WeatherServiceTests(StubServerMixin, TestCase):
+    def test_fetch_then_cached_by_normalized_city(self):
+        service = WeatherService(api_key='test')
+        result = service.get_weather_by_city('Tokyo')
+        self.assertEqual(result['weather']['temperature'], 12)
+        self.assertEqual(result['weather']['condition'], 'Clouds')
+
+        self.server.temperature = 30
+        self.assertEqual(WeatherService(api_key='test').get_weather_by_city('  TOKYO ')['weather']['temperature'], 12)
+        self.assertEqual(self.server.requests, ['tokyo'])
+        self.assertTrue(WeatherData.objects.filter(city='tokyo', temperature=12).exists())
+
+    def test_second_tier_serves_other_processes(self):
+        WeatherData.objects.create(city='osaka', temperature=21, humidity=40, condition='Clear')
+        result = WeatherService(api_key='test').get_weather_by_city('Osaka')
+        self.assertEqual(result['weather'], {'temperature': 21, 'condition': 'Clear', 'humidity': 40})
+        self.assertEqual(self.server.request_count, 0)
+
+        # 太旧的读数不使用
+        WeatherData.objects.filter(city='osaka').update(timestamp=timezone.now() - timedelta(hours=2))
+        weather_service.clear_cache()
+        self.assertEqual(WeatherService(api_key='test').get_weather_by_city('Osaka')['weather']['temperature'], 12)
+        self.assertEqual(self.server.request_count, 1)
+        # 新读数覆盖旧记录，每个城市只有一条
+        reading = WeatherData.objects.get(city='osaka')
+        self.assertEqual(reading.temperature, 12)
+        self.assertGreater(reading.timestamp, timezone.now() - timedelta(minutes=1))
+
+    def test_errors_are_not_cached(self):
+        self.server.status = 500
+        self.assertIn('error', WeatherService(api_key='test').get_weather_by_city('Nagoya'))
+        self.server.status = 200
+        self.assertEqual(WeatherService(api_key='test').get_weather_by_city('Nagoya')['weather']['temperature'], 12)
+        self.assertEqual(self.server.request_count, 2)
+
+    def test_error_does_not_expose_api_key(self):
+        self.server.status = 500
+        service = WeatherService(api_key='secret-key')
+        with self.assertLogs('ocr_app.services.weather_service', 'ERROR') as logs:
+            sync_error = service.get_weather_by_city('Nagoya')['error']
+            async_error = async_to_sync(service.aget_weather_by_city)('Nagano')['error']
+        for message in (sync_error, async_error, *logs.output):
+            self.assertIn('appid=***', message)
+            self.assertNotIn('secret-key', message)
+
+    @override_settings(WEATHER_READ_TIMEOUT=0.1)
+    def test_slow_upstream_times_out(self):
+        self.server.delay = 1
+        start = time.monotonic()
+        result = WeatherService(api_key='test').get_weather_by_city('Sapporo')
+        self.assertIn('error', result)
+        self.assertLess(time.monotonic() - start, 0.8)
+
+
+class StaleWhileRevalidateTests(StubServerMixin, TransactionTestCase):
+    def test_stale_result_is_returned_while_refreshing(self):
+        service = WeatherService(api_key='test')
+        service.get_weather_by_city('Kyoto')
+        self.age_cache('Kyoto', 601)
+        self.server.temperature = 25
+        self.server.delay = 0.3
+
+        start = time.monotonic()
+        self.assertEqual(service.get_weather_by_city('Kyoto')['weather']['temperature'], 12)
+        self.assertEqual(service.get_weather_by_city('Kyoto')['weather']['temperature'], 12)
+        self.assertLess(time.monotonic() - start, 0.25)
+
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and 'kyoto' in weather_service._refreshing:
+            time.sleep(0.05)
+        self.assertEqual(service.get_weather_by_city('Kyoto')['weather']['temperature'], 25)
+        # 同一城市只刷新一次
+        self.assertEqual(self.server.request_count, 2)
+        # 刷新更新已有的记录，不新增
+        reading = WeatherData.objects.get(city='kyoto')
+        self.assertEqual(reading.temperature, 25)
+
+    def test_expired_beyond_stale_window_fetches_synchronously(self):
+        service = WeatherService(api_key='test')
+        service.get_weather_by_city('Kobe')
+        self.age_cache('Kobe', 600 + 3600 + 1)
+        WeatherData.objects.all().delete()
+        self.server.temperature = 5
+        self.assertEqual(service.get_weather_by_city('Kobe')['weather']['temperature'], 5)
+
+
+class AsyncWeatherServiceTests(StubServerMixin, TestCase):
+    server_options = {'delay': 0.3}
+
+    async def fetch_cities(self, *cities):
+        service = WeatherService(api_key='test')
+        return await asyncio.gather(*(service.aget_weather_by_city(city) for city in cities))
+
+    async def test_concurrent_fetches_do_not_block_each_other(self):
+        start = time.monotonic()
+        results = await self.fetch_cities('Tokyo', 'Osaka', 'Kyoto', 'Nara', 'Kobe')
+        self.assertLess(time.monotonic() - start, 0.3 * 3)
+        self.assertEqual([r['weather']['temperature'] for r in results], [12] * 5)
+        self.assertEqual(await WeatherData.objects.acount(), 5)
+
+        # 与同步版本共用缓存
+        self.assertEqual(WeatherService(api_key='test').get_weather_by_city('tokyo')['weather']['temperature'], 12)
+        self.assertEqual(self.server.request_count, 5)
+
+    async def test_without_httpx_falls_back_to_thread_pool(self):
+        with mock.patch.object(weather_service, 'httpx', None):
+            start = time.monotonic()
+            results = await self.fetch_cities('Sendai', 'Fukuoka', 'Naha')
+        self.assertLess(time.monotonic() - start, 0.3 * 2)
+        self.assertTrue(all(r['weather']['condition'] == 'Clouds' for r in results))
+
+    @override_settings(WEATHER_READ_TIMEOUT=0.1)
+    async def test_timeout_returns_error(self):
+        result, = await self.fetch_cities('Sapporo')
+        self.assertIn('error', result)
@@ -5,14 +5,20 @@ from .views import (
     QueryView, ViewUploadData,
     ManualInputView, ImageCheckView, ImportExistingImagesView,
     SaveLabelTextView, delete_clothing, delete_all_clothing,
-    save_materials, update_category
+    save_materials, update_category, health_ready,
+    ingest_batch_status, metrics, metrics_timings,
+    clothing_list_json, AsyncQueryView, batch_query
 )
 
 urlpatterns = [
     path('', HomeView.as_view(), name='home'),
     path('upload/', BatchUploadView.as_view(), name='batch_upload'),
+    path('upload/status/<int:batch_id>/', ingest_batch_status, name='ingest_batch_status'),
     path('clothing_list/', ClothingListView.as_view(), name='clothing_list'),
+    path('clothing_list/json/', clothing_list_json, name='clothing_list_json'),
     path('query/', QueryView.as_view(), name='query'),
+    path('query/async/', AsyncQueryView.as_view(), name='query_async'),
+    path('query/batch/', batch_query, name='query_batch'),
     path('view_data/', ViewUploadData.as_view(), name='view_data'),
     path('manual_input/<int:clothing_id>/', ManualInputView.as_view(), name='manual_input'),
     path('image_check/', ImageCheckView.as_view(), name='image_check'),
@@ -22,4 +28,7 @@ urlpatterns = [
     path('delete-all/', delete_all_clothing, name='delete_all_clothing'),
     path('save-materials/', save_materials, name='save_materials'),
     path('update_category/<int:clothing_id>/', update_category, name='update_category'),
+    path('health/ready/', health_ready, name='health_ready'),
+    path('metrics/', metrics, name='metrics'),
+    path('metrics/timings/', metrics_timings, name='metrics_timings'),
 ]
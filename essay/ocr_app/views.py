@@ -1,6 +1,7 @@
 from django.shortcuts import render, redirect
+from django.urls import reverse
 from django.views import View
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.contrib import messages
 from django.conf import settings
@@ -8,6 +9,8 @@ from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from PIL import Image
+from asgiref.sync import sync_to_async
+import asyncio
 import io
 import os
 import json
@@ -15,12 +18,16 @@ import logging
 from django.views.decorators.http import require_http_methods
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
-import tempfile
 
-from .services.ocr_processor import OCRProcessor
-from .services.image_classifier import ImageClassifier
-from .services.weather_service import WeatherService
+from .services.engine_registry import get_classifier_registry, model_registries
+from .services import metrics as metrics_service
+from .services import recommendation_cache, thumbnails
+from .services.ingest import batch_status, enqueue_batch, run_pending_jobs
+from .services.pagination import InvalidCursor, paginate
+from .services.timing import timing_stats
+from .services.weather_service import WeatherService, normalize_city
 from .services.recommender import ClothingRecommender
+from .services.suitability import wardrobe_matrix
 from .models import ClothingImage
 
 import os
@@ -35,15 +42,16 @@ class HomeView(View):
 
 class BatchUploadView(View):
     def get(self, request):
-        return render(request, 'ocr_app/upload.html')
+        # 上传后跳转回本页面并带上批次号，页面轮询处理进度
+        batch_id = request.GET.get('batch', '')
+        context = {'batch_id': int(batch_id)} if batch_id.isdigit() else {}
+        return render(request, 'ocr_app/upload.html', context)
 
     def post(self, request):
-        print("\n=== Upload Processing Debug ===")
         clothing_images = request.FILES.getlist('clothing_images[]')
         label_images = request.FILES.getlist('label_images[]')
-        
-        print(f"Number of clothing images: {len(clothing_images)}")
-        print(f"Number of label images: {len(label_images)}")
+        logger.debug("Upload received: clothing_images=%d label_images=%d",
+                     len(clothing_images), len(label_images))
         
         if not clothing_images or not label_images:
             messages.error(request, 'Please upload both clothing and label images.')
@@ -53,73 +61,19 @@ class BatchUploadView(View):
             messages.error(request, 'Number of clothing images and label images must match.')
             return redirect('batch_upload')
         
-        success_count = 0
-        failed_items = []
-        
-        # Initialize classifiers
-        classifier = ImageClassifier()
-        
-        for i, (clothing_image, label_image) in enumerate(zip(clothing_images, label_images)):
-            try:
-                print(f"\nProcessing item {i+1}:")
-                print(f"Clothing image: {clothing_image.name}")
-                print(f"Label image: {label_image.name}")
-                
-                clothing = ClothingImage()
-                clothing.image = clothing_image
-                clothing.label_image = label_image
-                
-                # Classify the clothing image
-                print("Starting image classification...")
-                category_result = classifier.classify_image(clothing_image)
-                category_name = category_result['category'] if isinstance(category_result, dict) else category_result
-                clothing.category = category_name
-                print(f"Classification result: {category_name}")
-                
-                # Process the label image with OCR
-                print("Starting OCR processing...")
-                ocr_result = process_label_image(label_image)
-                
-                if not ocr_result:
-                    print(f"OCR processing failed for {label_image.name}")
-                    # Still save the item even if OCR fails, so user can input text manually
-                    clothing.recognized_text = ""
-                    clothing.materials = []
-                else:
-                    # Store OCR recognized text
-                    recognized_text = " ".join(ocr_result.get('recognized_texts', []))
-                    print(f"Recognized text: {recognized_text}")
-                    clothing.recognized_text = recognized_text
-                    
-                    # Store materials - 使用完整的材料信息
-                    materials = ocr_result.get('materials', [])
-                    print(f"Raw materials from OCR: {materials}")
-                    
-                    # 直接保存完整的材料信息（包括百分比）
-                    clothing.materials = materials
-                    print(f"Final materials to save: {clothing.materials}")
-                
-                print("Saving clothing record...")
-                clothing.save()
-                print(f"Successfully saved clothing record {clothing.id}")
-                success_count += 1
-                
-            except Exception as e:
-                print(f"Error processing item {i+1}: {str(e)}")
-                import traceback
-                print(f"Traceback: {traceback.format_exc()}")
-                failed_items.append(label_image.name)
-                continue
+        # 只保存文件并排队，分类和OCR由 run_ingest_workers 在后台完成
+        batch = enqueue_batch(zip(clothing_images, label_images))
         
-        print(f"\nProcessing complete. Success: {success_count}, Failed: {len(failed_items)}")
+        if getattr(settings, 'INGEST_INLINE', False):
+            # 没有运行worker的开发环境中直接在请求内处理
+            run_pending_jobs(batch=batch)
         
-        # Show summary message
-        if success_count > 0:
-            messages.success(request, 'Upload successful.')
-        else:
-            messages.error(request, 'No items were successfully processed.')
+        status_url = reverse('ingest_batch_status', args=[batch.id])
+        if 'application/json' in request.headers.get('Accept', ''):
+            return JsonResponse({'batch_id': batch.id, 'status_url': status_url}, status=202)
         
-        return redirect('clothing_list')
+        messages.success(request, f'Upload received. Processing {len(clothing_images)} items...')
+        return redirect(f"{reverse('batch_upload')}?batch={batch.id}")
 
     def convert_to_jpg(self, image_file):
         """将图片转换为JPG格式"""
@@ -167,6 +121,104 @@ from ocr_app.models import ClothingImage
 from ocr_app.services.weather_service import WeatherService
 from ocr_app.services.recommender import ClothingRecommender
 
+def weather_summary(weather_data):
+    return {
+        'temperature': weather_data['weather'].get('temperature'),
+        'humidity': weather_data['weather'].get('humidity'),
+        'condition': weather_data['weather'].get('condition')
+    }
+
+
+def recommended_items(categories):
+    """推荐类别中的衣物，新的在前：一次按类别过滤的查询
+
+    (category, created_at) 复合索引中每个类别的衣物已经按时间排好，按顺序读取、够用就停止；
+    不依赖数据库的统计信息"""
+    return (ClothingImage.objects
+            .filter(category__in=categories)
+            .only(*ClothingRecommender.ITEM_FIELDS))
+
+
+def newest_items(category_lists):
+    """每组推荐类别中最新的衣物（各取 RECOMMENDATION_MAX_ITEMS 条，0 表示不限）
+
+    所有组的类别合在一起只查询一次，按时间顺序读取并在内存中分给每一组，所有组都取够后停止读取"""
+    limit = getattr(settings, 'RECOMMENDATION_MAX_ITEMS', 100)
+    wanted = [set(categories) for categories in category_lists]
+    picked = [[] for _ in wanted]
+    unfilled = set(range(len(wanted)))
+    for item in recommended_items(set().union(*wanted)).iterator(chunk_size=limit or 2000):
+        for index in list(unfilled):
+            if item.category in wanted[index]:
+                picked[index].append(item)
+                if len(picked[index]) == limit:
+                    unfilled.discard(index)
+        if not unfilled:
+            break
+    return picked
+
+
+def rank_by_suitability():
+    """RECOMMENDATION_RANKING='suitability' 时按材料对天气的适合程度挑选衣物，否则取最新的"""
+    return getattr(settings, 'RECOMMENDATION_RANKING', 'newest') == 'suitability'
+
+
+def load_wardrobe():
+    """(衣柜版本, 衣柜特征矩阵)；只有按材料打分时才加载矩阵，否则为 None
+
+    异步视图在等待天气时调用，结果传给 recommendations_for"""
+    version = recommendation_cache.wardrobe_version()
+    return version, wardrobe_matrix(version) if rank_by_suitability() else None
+
+
+def recommendations_for(recommender, advices, version=None, matrix=None):
+    """每个天气建议推荐的衣物（格式化后的列表，与 advices 的顺序相同）
+
+    结果按衣柜版本、挑选方式、推荐类别和天气分档缓存，命中时不访问衣物表；
+    未命中的一起计算：按材料打分时共用一次衣柜特征矩阵，按最新挑选时所有类别一次查询取出；
+    version 和 matrix 是调用方已经用 load_wardrobe 读取的"""
+    ranked = rank_by_suitability()
+    if ranked:
+        ranking, size = 'suitability', getattr(settings, 'RECOMMENDATION_TOP_K', 10)
+    else:
+        ranking, size = 'newest', getattr(settings, 'RECOMMENDATION_MAX_ITEMS', 100)
+    if version is None:
+        version = recommendation_cache.wardrobe_version()
+    # 同一档的天气打分完全相同；按最新挑选时与天气无关
+    weathers = [recommendation_cache.bucketed_weather(advice) if ranked else None for advice in advices]
+    keys = [recommendation_cache.cache_key(version, ranking, advice['categories'], size, weather)
+            for advice, weather in zip(advices, weathers)]
+    results = recommendation_cache.get_many(list(dict.fromkeys(keys)))
+
+    misses = {}
+    for key, advice, weather in zip(keys, advices, weathers):
+        if key not in results:
+            misses.setdefault(key, (advice, weather))
+    if ranked and misses:
+        if matrix is None:
+            matrix = wardrobe_matrix(version)
+        rankings = [recommender.rank_top_items(weather, advice['categories'], size, matrix)
+                    for advice, weather in misses.values()]
+        for key, items in zip(misses, recommender.load_ranked(*rankings)):
+            results[key] = recommender.format_items(items)
+    elif misses:
+        items = newest_items([advice['categories'] for advice, _ in misses.values()])
+        for key, group in zip(misses, items):
+            results[key] = recommender.format_items(group)
+    recommendation_cache.set_many({key: results[key] for key in misses})
+    return [results[key] for key in keys]
+
+
+def query_context(city, weather_info, advice, recommendations):
+    logger.debug("Recommended %d items for city=%s", len(recommendations), city)
+    return {
+        'city': city,
+        'weather': weather_info,
+        'recommendations': recommendations,
+        'recommendation_text': advice['text']
+    }
+
+
 class QueryView(View):
     def get(self, request):
         return render(request, 'ocr_app/query.html')
@@ -182,76 +234,143 @@ class QueryView(View):
         if not weather_data or 'error' in weather_data:
             return render(request, 'ocr_app/query.html', {'error': 'Unable to get weather information'})
 
-        # Prepare weather data
-        weather_info = {
-            'temperature': weather_data['weather'].get('temperature'),
-            'humidity': weather_data['weather'].get('humidity'),
-            'condition': weather_data['weather'].get('condition')
-        }
+        # 推荐器只给出目标类别，衣物用一次按类别过滤的查询取出（相同天气档的结果有缓存）
+        weather_info = weather_summary(weather_data)
+        recommender = ClothingRecommender()
+        advice = recommender.get_advice(weather_info)
+        recommendations, = recommendations_for(recommender, [advice])
+        return render(request, 'ocr_app/query.html', query_context(city, weather_info, advice, recommendations))
 
-        # Get all clothing items
-        clothing_items = ClothingImage.objects.all()
-        
-        # Initialize recommender
+
+class AsyncQueryView(View):
+    """QueryView 的异步版本（ASGI 下使用）：等待天气接口时不占用线程"""
+
+    async def get(self, request):
+        return render(request, 'ocr_app/query.html')
+
+    async def post(self, request):
+        city = request.POST.get('city', '').strip()
+        if not city:
+            return render(request, 'ocr_app/query.html', {'error': 'Please enter a city name'})
+
+        # 等待天气的同时读取衣柜版本（按材料打分时还有特征矩阵）
+        weather_service = WeatherService(api_key=settings.WEATHER_API_KEY)
+        weather_data, wardrobe = await asyncio.gather(
+            weather_service.aget_weather_by_city(city),
+            sync_to_async(load_wardrobe)(),
+        )
+
+        if not weather_data or 'error' in weather_data:
+            return render(request, 'ocr_app/query.html', {'error': 'Unable to get weather information'})
+
+        weather_info = weather_summary(weather_data)
         recommender = ClothingRecommender()
-        
-        # Get recommendations
-        recommendation_result = recommender.get_recommendation(clothing_items, weather_info)
-        
-        # Update the items to include image URLs
-        for item in recommendation_result['items']:
-            clothing = ClothingImage.objects.get(id=item['id'])
-            item['image_url'] = clothing.image.url if clothing.image else None
-            # 添加调试信息
-            print(f"\nProcessing item {item['id']}:")
-            print(f"Label image exists: {bool(clothing.label_image)}")
-            if clothing.label_image:
-                print(f"Label image URL: {clothing.label_image.url}")
-            item['label_image'] = clothing.label_image.url if clothing.label_image else None
-        
-        # Prepare template context
-        context = {
-            'city': city,
+        advice = recommender.get_advice(weather_info)
+        recommendations, = await sync_to_async(recommendations_for)(recommender, [advice], *wardrobe)
+        return render(request, 'ocr_app/query.html', query_context(city, weather_info, advice, recommendations))
+
+@require_http_methods(["POST"])
+async def batch_query(request):
+    """多个城市的推荐（JSON）：{"cities": ["Tokyo", "Osaka", ...]}
+
+    所有城市的天气同时请求（相同的城市只请求一次），耗时大约是一次天气请求的时间，与城市数量无关；
+    等待天气时读取衣柜版本（和特征矩阵）。推荐的衣物先查缓存，未命中的城市一起计算（见 recommendations_for）"""
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid JSON'}, status=400)
+    cities = data.get('cities') if isinstance(data, dict) else None
+    if not isinstance(cities, list) or not all(isinstance(city, str) for city in cities):
+        return JsonResponse({'status': 'error', 'message': 'cities must be a list of city names'}, status=400)
+    cities = [city.strip() for city in cities if city.strip()]
+    if not cities:
+        return JsonResponse({'status': 'error', 'message': 'Please enter a city name'}, status=400)
+    max_cities = getattr(settings, 'BATCH_QUERY_MAX_CITIES', 20)
+    if len(cities) > max_cities:
+        return JsonResponse({'status': 'error', 'message': f'At most {max_cities} cities per request'},
+                            status=400)
+
+    # 按规范化的城市名去重，保持第一次出现的写法
+    unique = {}
+    for city in cities:
+        unique.setdefault(normalize_city(city), city)
+
+    weather_service = WeatherService(api_key=settings.WEATHER_API_KEY)
+    wardrobe, *weather_results = await asyncio.gather(
+        sync_to_async(load_wardrobe)(),
+        *(weather_service.aget_weather_by_city(city) for city in unique.values())
+    )
+
+    recommender = ClothingRecommender()
+    results, advices = {}, {}
+    for key, weather_data in zip(unique, weather_results):
+        if not weather_data or 'error' in weather_data:
+            results[key] = {'error': 'Unable to get weather information'}
+            continue
+        weather_info = weather_summary(weather_data)
+        advice = advices[key] = recommender.get_advice(weather_info)
+        results[key] = {
             'weather': weather_info,
-            'recommendations': recommendation_result['items'],
-            'recommendation_text': recommendation_result['text']
+            'recommendation_text': advice['text'],
+            'categories': advice['categories'],
         }
-        
-        # 添加调试信息
-        print("\nRecommendation items:")
-        for item in recommendation_result['items']:
-            print(f"Item {item['id']}:")
-            print(f"Image URL: {item.get('image_url')}")
-            print(f"Label Image: {item.get('label_image')}")
-        
-        return render(request, 'ocr_app/query.html', context)
+    if advices:
+        recommendations = await sync_to_async(recommendations_for)(recommender, list(advices.values()), *wardrobe)
+        for key, items in zip(advices, recommendations):
+            results[key]['recommendations'] = items
+    logger.debug("Batch query: %d cities, %d unique", len(cities), len(unique))
+
+    # 按请求的顺序返回，重复的城市共用同一个结果
+    return JsonResponse({
+        'results': [{'city': city, **results[normalize_city(city)]} for city in cities],
+    })
 
 from django.views.generic import ListView
+from django.http import Http404
+from django.utils.http import urlencode
 from ocr_app.models import ClothingImage
 
+# 列表页显示的字段；classification_confidence、image_hash 等不取出
+CLOTHING_LIST_FIELDS = ('id', 'image', 'label_image', 'renditions', 'category', 'materials', 'recognized_text',
+                        'created_at')
+
+
+def keyset_page(request, queryset):
+    """按 ?cursor= 取一页（按创建时间倒序），游标无效时返回404"""
+    try:
+        return paginate(queryset, request.GET.get('cursor') or None)
+    except InvalidCursor:
+        raise Http404('Invalid cursor')
+
+
+def page_links(request, page, **params):
+    """分页导航用的链接：下一页，以及不在第一页时回到第一页"""
+    return {
+        'page': page,
+        'next_url': f'{request.path}?{urlencode({**params, "cursor": page.next_cursor})}' if page.has_next else None,
+        'first_url': (f'{request.path}?{urlencode(params)}' if params else request.path)
+                     if request.GET.get('cursor') else None,
+    }
+
+
 class ClothingListView(ListView):
     model = ClothingImage
     template_name = 'ocr_app/clothing_list.html'
     context_object_name = 'clothing_images'
     
     def get_queryset(self):
-        queryset = ClothingImage.objects.all()
-        print("\n=== ClothingListView Debug ===")
-        print(f"Total records: {queryset.count()}")
-        
-        for item in queryset:
-            print(f"\nRecord {item.id}:")
-            print(f"Category: {item.category}")
-            print(f"Materials: {item.materials}")
-            print(f"OCR Text: {item.recognized_text}")
-            print(f"Label Image: {'Yes' if item.label_image else 'No'}")
-            print(f"Clothing Image: {'Yes' if item.image else 'No'}")
-            print(f"OCR Text Type: {type(item.recognized_text)}")
-            print(f"Materials Type: {type(item.materials)}")
-            if item.materials:
-                print(f"Materials Content: {item.materials}")
-            if item.recognized_text:
-                print(f"OCR Text Content: {item.recognized_text}")
+        # 识别文本在卡片的 Details 中可以编辑，所以列表页也一起取出
+        self.page = keyset_page(self.request, ClothingImage.objects.only(*CLOTHING_LIST_FIELDS))
+        queryset = self.page.items
+        # 逐条记录的调试输出只在 DEBUG 级别开启时才遍历（按 LOG_DEBUG_SAMPLE_RATE 抽样），
+        # 否则不产生额外的字符串格式化
+        if logger.isEnabledFor(logging.DEBUG):
+            for item in queryset:
+                logger.debug(
+                    "Clothing record id=%s category=%s materials=%s label_image=%s image=%s text=%r",
+                    item.id, item.category, item.materials,
+                    bool(item.label_image), bool(item.image), item.recognized_text,
+                )
         
         return queryset
 
@@ -261,11 +380,44 @@ class ClothingListView(ListView):
             'MEDIA_URL': settings.MEDIA_URL,
             'MEDIA_ROOT': settings.MEDIA_ROOT,
             'debug_mode': settings.DEBUG,
+            **page_links(self.request, self.page),
         })
-        print("\n=== Context Debug ===")
-        print(f"Number of items in context: {len(context['clothing_images'])}")
         return context
 
+
+def clothing_list_json(request):
+    """衣物列表的JSON版本（游标分页），供无限滚动使用；?fields=text 时附带识别文本"""
+    include_text = 'text' in request.GET.get('fields', '').split(',')
+    fields = [f for f in CLOTHING_LIST_FIELDS if include_text or f != 'recognized_text']
+    try:
+        page = paginate(ClothingImage.objects.only(*fields), request.GET.get('cursor') or None)
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    items = []
+    for clothing in page.items:
+        item = {
+            'id': clothing.id,
+            'category': clothing.category,
+            'materials': clothing.materials or [],
+            'image_url': clothing.image.url if clothing.image else None,
+            'label_image_url': clothing.label_image.url if clothing.label_image else None,
+            'thumbnail_url': clothing.thumbnail_url if clothing.image else None,
+            'thumbnail_small_url': clothing.thumbnail_small_url if clothing.image else None,
+            'label_thumbnail_url': clothing.label_thumbnail_url if clothing.label_image else None,
+            'created_at': clothing.created_at.isoformat(),
+        }
+        if include_text:
+            item['recognized_text'] = clothing.recognized_text
+        items.append(item)
+
+    params = {'fields': 'text'} if include_text else {}
+    return JsonResponse({
+        'items': items,
+        'next_cursor': page.next_cursor,
+        'next_url': page_links(request, page, **params)['next_url'],
+    })
+
 from django.views.generic import ListView
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views import View
@@ -279,10 +431,14 @@ from django.utils.decorators import method_decorator
 class ViewUploadData(View):
     """显示上传数据并支持删除操作"""
     def get(self, request):
-        # 清理孤立的媒体文件
-        self.cleanup_media_files()
+        # 清理孤立的媒体文件（需要遍历所有记录的文件名，只在打开第一页时做）
+        if not request.GET.get('cursor'):
+            self.cleanup_media_files()
+        # 页面上不显示识别文本
+        page = keyset_page(request, ClothingImage.objects.defer('recognized_text'))
         return render(request, 'ocr_app/view_upload_data.html', {
-            'clothing_images': ClothingImage.objects.all()
+            'clothing_images': page.items,
+            **page_links(request, page),
         })
 
     def cleanup_media_files(self):
@@ -301,7 +457,7 @@ class ViewUploadData(View):
                 file_path = os.path.join('clothing_images', file)
                 if file_path not in db_clothing_files:
                     os.remove(os.path.join(clothing_dir, file))
-                    print(f"Removed orphaned file: {file}")
+                    logger.info("Removed orphaned file %s", file_path)
 
         # 清理标签图片目录
         if os.path.exists(label_dir):
@@ -309,7 +465,7 @@ class ViewUploadData(View):
                 file_path = os.path.join('label_images', file)
                 if file_path not in db_label_files:
                     os.remove(os.path.join(label_dir, file))
-                    print(f"Removed orphaned file: {file}")
+                    logger.info("Removed orphaned file %s", file_path)
 
     def post(self, request):
         """处理删除请求"""
@@ -334,7 +490,7 @@ class ViewUploadData(View):
                 'message': 'Clothing item not found'
             })
         except Exception as e:
-            print(f"Error deleting item: {str(e)}")  # 添加错误日志
+            logger.exception("Error deleting clothing item")
             return JsonResponse({
                 'success': False, 
                 'message': str(e)
@@ -344,15 +500,15 @@ def test_classifier(request):
     """测试分类器是否正常工作"""
     if request.method == 'POST' and request.FILES.get('image'):
         try:
-            classifier = ImageClassifier()
-            result = classifier.classify_image(request.FILES['image'])
-            print(f"Classification result: {result}")
+            with get_classifier_registry().acquire() as classifier:
+                result = classifier.classify_image(request.FILES['image'])
+            logger.debug("Test classification result: %s", result)
             return JsonResponse({
                 'success': True,
                 'prediction': result
             })
         except Exception as e:
-            print(f"Test classifier error: {str(e)}")
+            logger.exception("Test classifier error")
             return JsonResponse({
                 'success': False,
                 'error': str(e)
@@ -362,6 +518,35 @@ def test_classifier(request):
         'error': 'No image provided'
     })
 
+def health_ready(request):
+    """就绪检查：OCR和分类模型是否已在本进程加载（不会触发加载）"""
+    registries = model_registries()
+    models = {name: registry.stats() for name, registry in registries.items()}
+    ready = all(registry.loaded for registry in registries.values())
+    return JsonResponse({
+        'ready': ready,
+        'models': models
+    }, status=200 if ready else 503)
+
+def ingest_batch_status(request, batch_id):
+    """上传批次中每一项的处理状态（JSON）"""
+    status = batch_status(batch_id)
+    if status is None:
+        return JsonResponse({'error': 'Batch not found'}, status=404)
+    status['clothing_list_url'] = reverse('clothing_list')
+    return JsonResponse(status)
+
+def metrics_timings(request):
+    """本进程各阶段耗时直方图（JSON）"""
+    return JsonResponse({
+        'pid': os.getpid(),
+        'stages': timing_stats(),
+    })
+
+def metrics(request):
+    """Prometheus 文本格式的指标；设置 METRICS_MULTIPROCESS_DIR 时汇总所有进程"""
+    return HttpResponse(metrics_service.render(), content_type=metrics_service.CONTENT_TYPE)
+
 class ManualInputView(View):
     def get(self, request, clothing_id):
         try:
@@ -382,7 +567,7 @@ class ManualInputView(View):
             clothing.materials = materials
             clothing.save()
             
-            print(f"Manually saved materials: {materials}")  # 添加调试信息
+            logger.debug("Manually saved materials for clothing=%s: %s", clothing_id, materials)
             
             return JsonResponse({'success': True})
         except ClothingImage.DoesNotExist:
@@ -391,7 +576,7 @@ class ManualInputView(View):
                 'error': 'Clothing not found'
             })
         except Exception as e:
-            print(f"Error in manual input: {str(e)}")  # 添加错误日志
+            logger.exception("Error in manual input")
             return JsonResponse({
                 'success': False, 
                 'error': str(e)
@@ -406,11 +591,12 @@ def ensure_media_dirs():
     for directory in [media_root, clothing_dir, label_dir]:
         if not os.path.exists(directory):
             os.makedirs(directory)
-            print(f"Created directory: {directory}")
+            logger.info("Created directory %s", directory)
 
 class ImageCheckView(View):
     def get(self, request):
-        images = ClothingImage.objects.all()
+        page = keyset_page(request, ClothingImage.objects.only('id', 'image', 'label_image', 'renditions', 'created_at'))
+        images = page.items
         media_root = settings.MEDIA_ROOT
         clothing_dir = os.path.join(media_root, 'clothing_images')
         label_dir = os.path.join(media_root, 'label_images')
@@ -428,6 +614,7 @@ class ImageCheckView(View):
             'clothing_files': clothing_files,
             'label_files': label_files,
             'media_root': media_root,
+            **page_links(request, page),
         }
         
         return render(request, 'ocr_app/image_check.html', context)
@@ -440,6 +627,7 @@ class ImportExistingImagesView(View):
         
         imported = 0
         errors = []
+        new_items = []
         
         # 获取所有衣物图片
         if os.path.exists(clothing_dir):
@@ -453,9 +641,27 @@ class ImportExistingImagesView(View):
                             clothing = ClothingImage(image=image_path)
                             clothing.save()
                             imported += 1
+                            new_items.append((filename, clothing))
                         except Exception as e:
                             errors.append(f"Error importing {filename}: {str(e)}")
         
+        # 新导入的图片一起批量分类
+        if new_items:
+            try:
+                paths = [os.path.join(clothing_dir, filename) for filename, _ in new_items]
+                with get_classifier_registry().acquire() as classifier:
+                    results = classifier.classify_images(paths)
+                for (filename, clothing), result in zip(new_items, results):
+                    if result is None:
+                        errors.append(f"Error classifying {filename}")
+                        continue
+                    clothing.category = result['category']
+                    clothing.classification_confidence = result['confidence']
+                    clothing.image_hash = result['image_hash']
+                    clothing.save(update_fields=['category', 'classification_confidence', 'image_hash'])
+            except Exception as e:
+                errors.append(f"Error classifying imported images: {str(e)}")
+        
         return JsonResponse({
             'success': True,
             'imported': imported,
@@ -489,132 +695,48 @@ class SaveLabelTextView(View):
 @require_POST
 def delete_clothing(request, clothing_id):
     try:
-        print(f"\n=== Delete Clothing Debug ===")
-        print(f"Attempting to delete clothing ID: {clothing_id}")
-        
         clothing = ClothingImage.objects.get(id=clothing_id)
         
         # 安全删除图片文件
         if clothing.image:
             try:
                 if os.path.exists(clothing.image.path):
-                    print(f"Deleting clothing image: {clothing.image.path}")
                     os.remove(clothing.image.path)
                 else:
-                    print(f"Warning: Clothing image file not found: {clothing.image.path}")
-            except Exception as e:
-                print(f"Error deleting clothing image: {str(e)}")
+                    logger.warning("Clothing image file not found: %s", clothing.image.path)
+            except Exception:
+                logger.exception("Error deleting clothing image of clothing=%s", clothing_id)
         
         if clothing.label_image:
             try:
                 if os.path.exists(clothing.label_image.path):
-                    print(f"Deleting label image: {clothing.label_image.path}")
                     os.remove(clothing.label_image.path)
                 else:
-                    print(f"Warning: Label image file not found: {clothing.label_image.path}")
-            except Exception as e:
-                print(f"Error deleting label image: {str(e)}")
+                    logger.warning("Label image file not found: %s", clothing.label_image.path)
+            except Exception:
+                logger.exception("Error deleting label image of clothing=%s", clothing_id)
         
         # 删除数据库记录
         clothing.delete()
-        print("Successfully deleted clothing record from database")
+        logger.info("Deleted clothing=%s", clothing_id)
         
         return JsonResponse({
             'status': 'success',
             'message': '衣類が正常に削除されました。'
         })
     except ClothingImage.DoesNotExist:
-        print(f"Error: Clothing item not found - ID: {clothing_id}")
+        logger.warning("Clothing not found: id=%s", clothing_id)
         return JsonResponse({
             'status': 'error',
             'message': '衣類が見つかりませんでした。'
         }, status=404)
     except Exception as e:
-        print(f"Unexpected error while deleting clothing: {str(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Unexpected error while deleting clothing=%s", clothing_id)
         return JsonResponse({
             'status': 'error',
             'message': str(e)
         }, status=500)
 
-def process_label_image(label_image):
-    """Process the label image with OCR"""
-    try:
-        print(f"\nProcessing label image: {label_image.name}")
-        
-        # 使用 PIL 打开图像
-        img = Image.open(label_image)
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        # 使用临时文件
-        with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as temp_file:
-            temp_path = temp_file.name
-            img.save(temp_path, 'JPEG', quality=95)
-        
-        try:
-            # Process with OCR
-            ocr_processor = OCRProcessor()
-            result = ocr_processor.process_image(temp_path)
-            
-            if result and result.get('status') == 'success':
-                print(f"Raw OCR Result: {result}")
-                
-                # 提取识别的文本
-                recognized_texts = [text_info['text'] for text_info in result.get('detected_texts', [])]
-                print(f"Extracted texts: {recognized_texts}")
-                
-                # 从文本中提取材料信息
-                materials = []
-                
-                # 首先尝试从OCR结果的materials字段获取材料信息
-                if 'materials' in result:
-                    print(f"Processing materials from OCR result: {result['materials']}")
-                    for material_data in result['materials']:
-                        if isinstance(material_data, dict):
-                            material_name = material_data.get('material', '')
-                            if material_name and material_name not in materials:
-                                materials.append(material_name)
-                                print(f"Added material: {material_name}")
-                
-                # 如果OCR结果中没有足够的材料信息，从recognized_text中提取
-                full_text = " ".join(recognized_texts)
-                print(f"Attempting to extract materials from full text: {full_text}")
-                
-                # 使用OCRProcessor的extract_material_and_percentage方法提取材料
-                ocr_processor = OCRProcessor()
-                extracted_materials = ocr_processor.extract_material_and_percentage(full_text)
-                
-                # 合并提取到的材料
-                for material in extracted_materials:
-                    if material not in materials:
-                        materials.append(material)
-                        print(f"Added material from text analysis: {material}")
-                
-                print(f"Final materials list: {materials}")
-                
-                return {
-                    'recognized_texts': recognized_texts,
-                    'materials': materials
-                }
-            else:
-                print("Warning: No text recognized in the label image")
-                print(f"OCR Result: {result}")
-                return None
-                
-        finally:
-            # 清理临时文件
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-                print(f"Cleaned up temporary file: {temp_path}")
-            
-    except Exception as e:
-        print(f"Error processing label image: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return None
-
 @require_http_methods(["POST"])
 def delete_all_clothing(request):
     """Delete all clothing items"""
@@ -625,6 +747,10 @@ def delete_all_clothing(request):
         # 记录删除的数量
         deleted_count = clothing_items.count()
         
+        # 批量删除不经过 ClothingImage.delete，缩略图要单独删除
+        for clothing in clothing_items.only('id', 'renditions').iterator():
+            thumbnails.delete_thumbnails(clothing)
+
         # 删除所有记录
         clothing_items.delete()
         
@@ -673,20 +799,13 @@ def save_materials(request):
 def update_category(request, clothing_id):
     """Update clothing category view function"""
     try:
-        print("\n=== Category Update Debug ===")
-        print(f"Received request for clothing ID: {clothing_id}")
-        print(f"Request method: {request.method}")
-        print(f"Request headers: {request.headers}")
-        
         # Parse JSON data from request body
         data = json.loads(request.body)
         new_category = data.get('category')
         
-        print(f"Parsed request data: {data}")
-        print(f"New category: {new_category}")
+        logger.debug("Category update request: clothing=%s category=%s", clothing_id, new_category)
         
         if not new_category:
-            print("Error: No category specified")
             return JsonResponse({
                 'status': 'error',
                 'message': 'No category specified'
@@ -695,10 +814,8 @@ def update_category(request, clothing_id):
         # Get clothing object first to check if it exists
         try:
             clothing = ClothingImage.objects.get(id=clothing_id)
-            print(f"Found clothing item: {clothing.id}")
-            print(f"Current category: {clothing.category}")
         except ClothingImage.DoesNotExist:
-            print(f"Error: Clothing item not found - ID: {clothing_id}")
+            logger.warning("Clothing not found: id=%s", clothing_id)
             return JsonResponse({
                 'status': 'error',
                 'message': 'Clothing item not found'
@@ -707,7 +824,7 @@ def update_category(request, clothing_id):
         # Validate category
         valid_categories = ['tshirt', 'pant', 'longsleeve', 'shortpant']
         if new_category not in valid_categories:
-            print(f"Error: Invalid category - {new_category}")
+            logger.warning("Invalid category %r for clothing=%s", new_category, clothing_id)
             return JsonResponse({
                 'status': 'error',
                 'message': f'Invalid category: {new_category}'
@@ -717,7 +834,7 @@ def update_category(request, clothing_id):
         clothing.category = new_category
         clothing.save()
         
-        print(f"Successfully updated category to: {new_category}")
+        logger.info("Updated category of clothing=%s to %s", clothing_id, new_category)
         
         return JsonResponse({
             'status': 'success',
@@ -725,16 +842,14 @@ def update_category(request, clothing_id):
         })
         
     except json.JSONDecodeError as e:
-        print(f"Error: Invalid JSON data - {str(e)}")
+        logger.warning("Invalid JSON in category update: %s", e)
         return JsonResponse({
             'status': 'error',
             'message': 'Invalid JSON data'
         }, status=400)
         
     except Exception as e:
-        print(f"Unexpected error: {str(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Unexpected error while updating category of clothing=%s", clothing_id)
         return JsonResponse({
             'status': 'error',
             'message': str(e)